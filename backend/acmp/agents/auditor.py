@@ -1,19 +1,32 @@
 # acmp/agents/auditor.py
 
+import asyncio
 import json
-import re
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import os
-from dotenv import load_dotenv
 # from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
-from ..state import TransformationPlan
-from langchain_groq import ChatGroq
-load_dotenv()
+from langchain_core.utils.json import parse_partial_json
+from pydantic import TypeAdapter, ValidationError
 
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    # api_key= os.getenv("GROQ_API_KEY")
-)
+from ..state import LegacyPattern, TransformationPlan
+from ..utils.chunker import map_parallel, split_state
+from ..utils.llm_cache import acached_invoke, cached_invoke
+from ..utils.llm_client import get_llm
+from ..utils.metrics import record_audit_plan
+
+# Bump whenever the prompt templates below change, so cached completions are invalidated.
+PROMPT_VERSION = "3"
+
+# Ask the provider for a JSON object (response_format) instead of free text ("on"/"off").
+JSON_MODE = os.getenv("ACMP_AUDITOR_JSON_MODE", "on").lower() != "off"
+
+# Immediate re-asks, with the validation error, when a plan does not validate.
+MAX_REASKS = int(os.getenv("ACMP_AUDITOR_REASKS", "1"))
+
+# A completion that has not opened its JSON object after this many characters is abandoned.
+_MAX_PREAMBLE = 400
+
+_field_adapters = {name: TypeAdapter(field.annotation) for name, field in TransformationPlan.model_fields.items()}
 
 # llm = HuggingFaceEndpoint(
 #     repo_id="meta-llama/Llama-3.1-8B-Instruct",
@@ -24,24 +37,105 @@ llm = ChatGroq(
 # )
 # model=ChatHuggingFace(llm=llm)
 
+def balanced_spans(text: str, opening: str = "{", closing: str = "}"):
+    """Candidate top-level {...} (or [...]) spans of `text`, brackets inside JSON strings ignored."""
+    start = text.find(opening)
+    while start != -1:
+        depth, in_string, escaped = 0, False, False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == opening:
+                depth += 1
+            elif ch == closing:
+                depth -= 1
+                if depth == 0:
+                    yield text[start:i + 1]
+                    break
+        start = text.find(opening, start + 1)
+
+
 def extract_json(text: str) -> dict:
     """
     Extracts first JSON object from model output safely.
     """
+    for candidate in balanced_spans(text or ""):
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return {}
+
+
+def partial_plan_ok(text: str) -> bool:
+    """
+    Whether a streaming completion can still become a valid plan: the fields
+    present so far must have the right types (the last element of a list may
+    still be incomplete). Used to stop reading a hopeless completion early.
+    """
+    start = text.find("{")
+    if start == -1:
+        return len(text) < _MAX_PREAMBLE
     try:
-        match = re.search(r"\{.*\}", text, re.DOTALL)
-        if match:
-            return json.loads(match.group())
-        return {}
-    except Exception:
-        return {}
+        data = parse_partial_json(text[start:])
+    except ValueError:
+        data = None  # not JSON from this brace on; a later object may still be
+    if data is None:
+        return True
+    if not isinstance(data, dict):
+        return False
+    for name, value in data.items():
+        adapter = _field_adapters.get(name)
+        if adapter is None:
+            continue
+        if isinstance(value, list):
+            value = value[:-1]
+        try:
+            adapter.validate_python(value)
+        except ValidationError:
+            return False
+    return True
 
 
-def auditor_node(state: Dict[str, Any]) -> Dict[str, Any]:
+def _validate(text: str) -> Tuple[Optional[TransformationPlan], Optional[str]]:
+    """The plan in a completion, or None and a description of what is wrong with it."""
+    data = extract_json(text)
+    if not data:
+        return None, "the answer did not contain a JSON object"
+    try:
+        return TransformationPlan(**data), None
+    except ValidationError as e:
+        problems = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()[:5]
+        )
+        return None, f"the JSON object did not match the required structure ({problems})"
+
+
+def _build_prompt(state: Dict[str, Any], code: Optional[str] = None) -> str:
 
     language = state.get("language") or "python"
     framework = state.get("framework") or None
 
+    prefilled = state.get("prefilled_patterns") or []
+    prefilled_instructions = ""
+    if prefilled:
+        found = "\n".join(f"- {p.pattern}: {p.recommended_fix}" for p in prefilled)
+        prefilled_instructions = f"""
+A rule-based pass already rewrote the mechanical Python 2 constructs marked "already applied"
+and found the others below. Do not list the applied ones again; focus on what remains:
+{found}
+"""
+
     framework_instructions = ""
     if framework and framework.lower() != "none":
         framework_instructions = f'  "framework": "{framework}",\n  "framework_version": "latest-stable-framework-version",\n'
@@ -66,30 +160,119 @@ You are a code modernization expert.
 - Only aim is to convert the outdated syntax to modern equivalent so that it works correctly on the specified latest stable versions.
 - Do NOT add explanation text.
 - Do NOT wrap in markdown.
-
+{prefilled_instructions}
 Code:
-{state["original_code"]}
+{(state.get("preprocessed_code") or state["original_code"]) if code is None else code}
 """
-    # print(model.invoke("Hi there i need your help"))
+    return prompt
 
-    response = llm.invoke(prompt)
 
-    raw_output = response.content.strip()
+def _reask_prompt(prompt: str, text: str, problem: str) -> str:
+    answer = text.strip()
+    if len(answer) > 1500:
+        answer = answer[:1500] + "\n[...]"
+    return f"""{prompt}
+Your previous answer could not be used: {problem}.
 
-    extracted = extract_json(raw_output)
+Previous answer:
+{answer}
 
-    try:
-        structured_output = TransformationPlan(**extracted)
-    except Exception:
-        structured_output = TransformationPlan(
-            language=language,
-            language_version=None,
-            framework=framework if framework and framework.lower() != "none" else None,
-            framework_version=None,
-            legacy_patterns=[],
-            # security_issues=[],
-            modernization_steps=["Manual review required (validation failed)."],
-        )
+Return ONLY the corrected JSON object with the structure above.
+"""
+
+
+def _auditor_llm() -> Any:
+    llm = get_llm("auditor")
+    if JSON_MODE and hasattr(llm, "bind"):
+        return llm.bind(response_format={"type": "json_object"})
+    return llm
+
+
+def _template_version() -> str:
+    return f"{PROMPT_VERSION}-json" if JSON_MODE else PROMPT_VERSION
+
+
+def _audit(prompt: str) -> Optional[TransformationPlan]:
+    """
+    One plan request, streamed and checked as it arrives; a completion that
+    cannot become a valid plan is re-asked at once with what was wrong.
+    """
+    ask = prompt
+    for attempt in range(MAX_REASKS + 1):
+        response = cached_invoke(_auditor_llm(), ask, template_version=_template_version(), check=partial_plan_ok)
+        plan, problem = _validate(response.content)
+        if plan is not None:
+            record_audit_plan("valid" if attempt == 0 else "reasked")
+            return plan
+        ask = _reask_prompt(prompt, response.content, problem)
+    record_audit_plan("fallback")
+    return None
+
+
+async def _aaudit(prompt: str) -> Optional[TransformationPlan]:
+    """Async variant of _audit."""
+    ask = prompt
+    for attempt in range(MAX_REASKS + 1):
+        response = await acached_invoke(_auditor_llm(), ask, template_version=_template_version(), check=partial_plan_ok)
+        plan, problem = _validate(response.content)
+        if plan is not None:
+            record_audit_plan("valid" if attempt == 0 else "reasked")
+            return plan
+        ask = _reask_prompt(prompt, response.content, problem)
+    record_audit_plan("fallback")
+    return None
+
+
+def _chunk_prompts(state: Dict[str, Any]) -> Optional[List[str]]:
+    """One audit prompt per chunk (with the module context) for large files, else None."""
+    source = split_state(state)
+    if source is None:
+        return None
+    return [
+        _build_prompt(state, f"{source.context}\n\n{chunk.code}" if source.context else chunk.code)
+        for chunk in source.chunks
+    ]
+
+
+def _fallback_plan(state: Dict[str, Any]) -> TransformationPlan:
+    language = state.get("language") or "python"
+    framework = state.get("framework") or None
+    return TransformationPlan(
+        language=language,
+        language_version=None,
+        framework=framework if framework and framework.lower() != "none" else None,
+        framework_version=None,
+        legacy_patterns=[],
+        # security_issues=[],
+        modernization_steps=["Manual review required (validation failed)."],
+    )
+
+
+def _merge_plans(plans: List[TransformationPlan]) -> TransformationPlan:
+    """
+    Combines the per-chunk plans of one file: target versions come from the
+    first chunk, patterns and steps are the ordered union of all chunks.
+    """
+    patterns: Dict[str, LegacyPattern] = {}
+    steps: Dict[str, None] = {}
+    for plan in plans:
+        for pattern in plan.legacy_patterns:
+            patterns.setdefault(pattern.pattern, pattern)
+        steps.update(dict.fromkeys(plan.modernization_steps))
+
+    return plans[0].model_copy(update={
+        "legacy_patterns": list(patterns.values()),
+        "modernization_steps": list(steps),
+    })
+
+
+def _apply_plan(state: Dict[str, Any], structured_output: Optional[TransformationPlan]) -> Dict[str, Any]:
+
+    language = state.get("language") or "python"
+    framework = state.get("framework") or None
+
+    if structured_output is None:
+        structured_output = _fallback_plan(state)
     # print(f"AUDITOR {state['itr']}\n",structured_output)
     state["transformation_plan"] = structured_output
 
@@ -100,3 +283,36 @@ Code:
     state["framework_version"] = structured_output.framework_version
 
     return state
+
+
+def apply_plans(state: Dict[str, Any], plans: List[TransformationPlan]) -> Dict[str, Any]:
+    """Merges the plans found for one file (plus the pre-auditor's patterns) into the state."""
+    plan = _merge_plans(plans) if plans else _fallback_plan(state)
+
+    # patterns found by the pre-auditor are part of the plan whatever the model said
+    prefilled = state.get("prefilled_patterns") or []
+    if prefilled:
+        plan = _merge_plans([plan.model_copy(update={"legacy_patterns": list(prefilled)}), plan])
+    return _apply_plan(state, plan)
+
+
+def auditor_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    if state.get("transformation_plan") is not None:
+        return state  # already planned (batched audit, see batch_auditor.py)
+
+    prompts = _chunk_prompts(state) or [_build_prompt(state)]
+    # print(model.invoke("Hi there i need your help"))
+
+    plans = map_parallel(_audit, prompts)
+
+    return apply_plans(state, [plan for plan in plans if plan is not None])
+
+
+async def aauditor_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async auditor used by graph.astream / graph.ainvoke."""
+    if state.get("transformation_plan") is not None:
+        return state
+
+    prompts = _chunk_prompts(state) or [_build_prompt(state)]
+    plans = await asyncio.gather(*(_aaudit(prompt) for prompt in prompts))
+    return apply_plans(state, [plan for plan in plans if plan is not None])
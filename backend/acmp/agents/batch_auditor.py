@@ -0,0 +1,195 @@
+# acmp/agents/batch_auditor.py
+
+import asyncio
+import json
+import os
+from typing import Dict, Any, List, Tuple
+
+from pydantic import ValidationError
+
+from ..state import TransformationPlan
+from ..utils.chunker import map_parallel, split_state
+from ..utils.llm_cache import acached_invoke, cached_invoke
+from ..utils.llm_client import get_llm
+from ..utils.rate_limit import estimate_tokens
+from .auditor import aauditor_node, apply_plans, auditor_node, balanced_spans
+from .preauditor import preauditor_node
+
+# Bump whenever the prompt template below changes, so cached completions are invalidated.
+PROMPT_VERSION = "1"
+
+# Files up to SMALL_FILE_TOKENS are packed together, BATCH_MAX_FILES at most
+# and BATCH_TOKEN_BUDGET of source per request; larger ones are audited alone.
+BATCH_TOKEN_BUDGET = int(os.getenv("ACMP_AUDIT_BATCH_TOKENS", "6000"))
+BATCH_MAX_FILES = int(os.getenv("ACMP_AUDIT_BATCH_FILES", "8"))
+SMALL_FILE_TOKENS = int(os.getenv("ACMP_AUDIT_SMALL_FILE_TOKENS", "1500"))
+
+
+def _source(state: Dict[str, Any]) -> str:
+    return state.get("preprocessed_code") or state["original_code"]
+
+
+def _target(state: Dict[str, Any]) -> Tuple[str, str]:
+    return (state.get("language") or "python", state.get("framework") or "None")
+
+
+def pack_batches(states: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Groups the small, not yet planned files into batches (same target
+    language/framework per batch, in input order). Files left out are
+    audited by the graph as usual.
+    """
+    open_batches: Dict[Tuple[str, str], Tuple[List[Dict[str, Any]], int]] = {}
+    batches: List[List[Dict[str, Any]]] = []
+
+    for state in states:
+        if state.get("transformation_plan") is not None or state.get("current_code"):
+            continue
+        tokens = estimate_tokens(_source(state))
+        if tokens > SMALL_FILE_TOKENS or split_state(state) is not None:
+            continue
+
+        target = _target(state)
+        batch, used = open_batches.get(target, ([], 0))
+        if batch and (used + tokens > BATCH_TOKEN_BUDGET or len(batch) >= BATCH_MAX_FILES):
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(state)
+        open_batches[target] = (batch, used + tokens)
+
+    batches.extend(batch for batch, _ in open_batches.values() if batch)
+    return [batch for batch in batches if len(batch) > 1]
+
+
+def _build_prompt(batch: List[Dict[str, Any]]) -> str:
+    language, framework = _target(batch[0])
+    has_framework = framework.lower() != "none"
+
+    framework_instructions = ""
+    if has_framework:
+        framework_instructions = f'    "framework": "{framework}",\n    "framework_version": "latest-stable-framework-version",\n'
+
+    files = []
+    for number, state in enumerate(batch, start=1):
+        prefilled = state.get("prefilled_patterns") or []
+        notes = ""
+        if prefilled:
+            found = "\n".join(f"- {p.pattern}: {p.recommended_fix}" for p in prefilled)
+            notes = f"""A rule-based pass already rewrote the constructs marked "already applied" and found the others below.
+Do not list the applied ones again; focus on what remains:
+{found}
+"""
+        name = os.path.basename(state.get("file_path") or "")
+        files.append(f"=== File {number}: {name} ===\n{notes}Code:\n{_source(state)}\n")
+
+    prompt = f"""
+Return ONLY a valid JSON array with exactly one object per file below, in the same order:
+[
+  {{
+    "file": <file number>,
+    "language": "{language}",
+    "language_version": "latest-stable-language-version",
+{framework_instructions}    "legacy_patterns": [
+      {{"pattern": "...", "recommended_fix": "..."}}
+    ],
+    "modernization_steps": [
+      "..."
+    ]
+  }}
+]
+
+You are a code modernization expert. Audit each file on its own.
+- Use the latest stable version of the specified language{" and framework" if has_framework else ""}.
+- Focus on modernising the syntax and replacing deprecated APIs with their modern equivalents.
+- Do not change or optimize the logic and behaviour.
+- Only aim is to convert the outdated syntax to modern equivalent so that it works correctly on the specified latest stable versions.
+- Do NOT add explanation text.
+- Do NOT wrap in markdown.
+
+{chr(10).join(files)}"""
+    return prompt
+
+
+def _extract_array(text: str) -> List[Any]:
+    """First JSON array in model output; stray brackets around it are skipped."""
+    for candidate in balanced_spans(text or "", "[", "]"):
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(data, list):
+            return data
+    return []
+
+
+def parse_batch(text: str, batch: List[Dict[str, Any]]) -> Dict[int, TransformationPlan]:
+    """
+    Valid plans by position in `batch`. Objects are matched by their "file"
+    number, or by position when the model left the numbers out.
+    """
+    items = [item for item in _extract_array(text) if isinstance(item, dict)]
+    plans: Dict[int, TransformationPlan] = {}
+
+    for position, item in enumerate(items):
+        number = item.pop("file", None)
+        if isinstance(number, (int, str)) and str(number).isdigit() and 1 <= int(number) <= len(batch):
+            index = int(number) - 1
+        elif number is None and len(items) == len(batch):
+            index = position
+        else:
+            continue
+        try:
+            plans.setdefault(index, TransformationPlan(**item))
+        except (ValidationError, TypeError):
+            pass  # invalid plan: this file falls back to its own audit
+    return plans
+
+
+def audit_batch(batch: List[Dict[str, Any]]) -> int:
+    """Audits a batch with one request; returns how many files fell back to a request of their own."""
+    response = cached_invoke(get_llm("auditor"), _build_prompt(batch), template_version=PROMPT_VERSION)
+    plans = parse_batch(response.content, batch)
+    for index, state in enumerate(batch):
+        if index in plans:
+            apply_plans(state, [plans[index]])
+        else:
+            auditor_node(state)
+    return len(batch) - len(plans)
+
+
+async def aaudit_batch(batch: List[Dict[str, Any]]) -> int:
+    """Async variant of audit_batch."""
+    response = await acached_invoke(get_llm("auditor"), _build_prompt(batch), template_version=PROMPT_VERSION)
+    plans = parse_batch(response.content, batch)
+    fallbacks = [state for index, state in enumerate(batch) if index not in plans]
+    for index, plan in plans.items():
+        apply_plans(batch[index], [plan])
+    await asyncio.gather(*(aauditor_node(state) for state in fallbacks))
+    return len(fallbacks)
+
+
+def _prepare(states: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    for state in states:
+        preauditor_node(state)  # rule-based rewrites first: the batch audits what is left
+    return pack_batches(states)
+
+
+def _stats(batches: List[List[Dict[str, Any]]], fallbacks: List[int]) -> Dict[str, int]:
+    files = sum(len(batch) for batch in batches)
+    return {"files": files, "requests": len(batches) + sum(fallbacks), "fallbacks": sum(fallbacks)}
+
+
+def audit_in_batches(states: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Pre-pass over initial graph states: small files get their
+    transformation plan from batched requests, so the graph's auditor skips
+    them. Returns {"files", "requests", "fallbacks"} for the batched files.
+    """
+    batches = _prepare(states)
+    return _stats(batches, map_parallel(audit_batch, batches))
+
+
+async def aaudit_in_batches(states: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Async variant of audit_in_batches."""
+    batches = _prepare(states)
+    return _stats(batches, list(await asyncio.gather(*(aaudit_batch(batch) for batch in batches))))
@@ -1,20 +1,17 @@
 # acmp/agents/engineer.py
+import asyncio
 import os
 from typing import Dict, Any
 import json
 
-from dotenv import load_dotenv
 # from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
 
+from ..utils.chunker import Chunk, ChunkedSource, map_parallel, reassemble, split_state
 from ..utils.helper import extract_code_block
-from langchain_groq import ChatGroq
-load_dotenv()
-
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    # api_key= os.getenv("GROQ_API_KEY")
-)
+from ..utils.llm_cache import acached_invoke, cached_invoke
+from ..utils.llm_client import get_llm
 
+PROMPT_VERSION = "1"  # part of the LLM cache key
 
 
 # llm = HuggingFaceEndpoint(
@@ -27,17 +24,9 @@ llm = ChatGroq(
 # model=ChatHuggingFace(llm=llm)
 
 
-def engineer_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Refactors legacy code into modern, secure, optimized version
-    using the TransformationPlan.
-    """
-
+def _version_info(state: Dict[str, Any]) -> str:
     transformation_plan = state["transformation_plan"]
 
-    # Convert structured plan to JSON string for prompt clarity
-    plan_json = json.dumps(transformation_plan.model_dump(), indent=2)
-
     language = state.get("language", "python")
     language_version = state.get("language_version") or transformation_plan.language_version or "latest"
     framework = state.get("framework") or transformation_plan.framework
@@ -50,6 +39,16 @@ def engineer_node(state: Dict[str, Any]) -> Dict[str, Any]:
         version_info += f" with {framework}"
         if framework_version:
             version_info += f" {framework_version}"
+    return version_info
+
+
+def _build_prompt(state: Dict[str, Any]) -> str:
+    transformation_plan = state["transformation_plan"]
+
+    # Convert structured plan to JSON string for prompt clarity
+    plan_json = json.dumps(transformation_plan.model_dump(), indent=2)
+
+    version_info = _version_info(state)
 
     prompt = f"""
 You are a senior software engineer modernizing legacy code.
@@ -72,11 +71,90 @@ Rules:
 - Just provide the new code and no other extra things, not even a single word.
 
 Original Code:
-{state["original_code"]}
+{state.get("preprocessed_code") or state["original_code"]}
+"""
+    return prompt
+
+
+def _build_chunk_prompt(state: Dict[str, Any], source: ChunkedSource, chunk: Chunk) -> str:
+    plan_json = json.dumps(state["transformation_plan"].model_dump(), indent=2)
+    version_info = _version_info(state)
+
+    prompt = f"""
+You are a senior software engineer modernizing legacy code.
+
+Target Language and Framework: {version_info}
+
+Follow this transformation plan strictly:
+
+{plan_json}
+
+You are given section {chunk.index + 1} of {len(source.chunks)} of a larger file (original lines {chunk.start_line}+).
+The other sections are modernized separately and concatenated with yours in order.
+
+Module context (imports and globals of the whole file, for reference only):
+{source.context or "(none)"}
+
+Rules:
+- Rewrite ONLY this section; do not repeat the module context or code from other sections.
+- Keep every top-level name defined in this section, with the same name and signature.
+- If this section needs an import the module context lacks, put it at the very top of your output.
+- Preserve original logic and functionality.
+- Do NOT change behavior.
+- Fix legacy syntax and replace deprecated APIs/functions with their modern equivalents for {version_info}.
+- Output ONLY valid executable code for {version_info}.
+- Do NOT add explanations.
+- Do NOT wrap in markdown.
+- Do not provide language labels.
+
+Section Code:
+{chunk.code}
 """
+    return prompt
+
+
+def _chunk_llm(index: int) -> Any:
+    # Tags token events with the chunk they belong to (see app/services.py).
+    llm = get_llm("engineer")
+    return llm.with_config(metadata={"acmp_chunk": index}) if hasattr(llm, "with_config") else llm
 
-    response = llm.invoke(prompt)
+
+def engineer_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Refactors legacy code into modern, secure, optimized version
+    using the TransformationPlan.
+
+    Large Python files are split at top-level definitions and the chunks
+    are modernized in parallel, then reassembled for the tester.
+    """
+
+    source = split_state(state)
+    if source is not None:
+        parts = map_parallel(
+            lambda chunk: cached_invoke(_chunk_llm(chunk.index), _build_chunk_prompt(state, source, chunk), template_version=PROMPT_VERSION),
+            source.chunks,
+        )
+        state["current_code"] = reassemble([extract_code_block(r.content.strip()) for r in parts])
+        return state
+
+    response = cached_invoke(get_llm("engineer"), _build_prompt(state), template_version=PROMPT_VERSION)
     # print(f"ENGINEER {state['itr']}: \n", extract_code_block(response.content.strip()))
     state["current_code"] = extract_code_block(response.content.strip())
 
     return state
+
+
+async def aengineer_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of engineer_node."""
+    source = split_state(state)
+    if source is not None:
+        parts = await asyncio.gather(*(
+            acached_invoke(_chunk_llm(chunk.index), _build_chunk_prompt(state, source, chunk), template_version=PROMPT_VERSION)
+            for chunk in source.chunks
+        ))
+        state["current_code"] = reassemble([extract_code_block(r.content.strip()) for r in parts])
+        return state
+
+    response = await acached_invoke(get_llm("engineer"), _build_prompt(state), template_version=PROMPT_VERSION)
+    state["current_code"] = extract_code_block(response.content.strip())
+    return state
@@ -1,17 +1,22 @@
 # acmp/agents/optimizer.py
 import os
-from typing import Dict, Any
-from dotenv import load_dotenv
+from typing import Dict, Any, List, Optional
 # from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
 
 from ..utils.helper import extract_code_block
-from langchain_groq import ChatGroq
-load_dotenv()
+from ..utils.llm_cache import acached_invoke, cached_invoke
+from ..utils.llm_client import get_llm
+from ..utils.metrics import record_patch
+from ..utils.patching import Window, apply_edits, error_lines, excerpt, parse_edits, windows_around
+from ..utils.sandbox import acheck_syntax, check_syntax
 
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    # api_key= os.getenv("GROQ_API_KEY")
-)
+PROMPT_VERSION = "2"  # bump when the prompts below change
+
+# Files of at least PATCH_MIN_LINES lines whose error names a line get
+# SEARCH/REPLACE edits around it instead of a regenerated file ("off" disables).
+PATCH_MODE = os.getenv("ACMP_OPTIMIZER_PATCH", "on").lower() != "off"
+PATCH_MIN_LINES = int(os.getenv("ACMP_PATCH_MIN_LINES", "80"))
+PATCH_CONTEXT = int(os.getenv("ACMP_PATCH_CONTEXT_LINES", "15"))
 
 
 # llm = HuggingFaceEndpoint(
@@ -24,15 +29,7 @@ llm = ChatGroq(
 # model=ChatHuggingFace(llm=llm)
 
 
-def optimizer_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Fixes failing code using error logs.
-    Increments retry counter.
-    """
-
-    if not state.get("error_logs"):
-        return state
-
+def _version_info(state: Dict[str, Any]) -> str:
     language = state.get("language", "python")
     language_version = state.get("language_version") or "latest"
     framework = state.get("framework") or None
@@ -45,6 +42,11 @@ def optimizer_node(state: Dict[str, Any]) -> Dict[str, Any]:
         version_info += f" with {framework}"
         if framework_version:
             version_info += f" {framework_version}"
+    return version_info
+
+
+def _build_prompt(state: Dict[str, Any]) -> str:
+    version_info = _version_info(state)
 
     prompt = f"""
 You are a debugging expert.
@@ -69,10 +71,117 @@ ERROR:
 Failing Code:
 {state["current_code"]}
 """
+    return prompt
+
+
+def _patch_windows(code: str, state: Dict[str, Any]) -> Optional[List[Window]]:
+    """Regions of a large file named by the error report, or None to regenerate the whole file."""
+    line_count = len(code.splitlines())
+    if not PATCH_MODE or line_count < PATCH_MIN_LINES:
+        return None
+    lines = error_lines(state["error_logs"], line_count)
+    return windows_around(lines, line_count, PATCH_CONTEXT) if lines else None
+
+
+def _build_patch_prompt(state: Dict[str, Any], code: str, windows: List[Window]) -> str:
+    version_info = _version_info(state)
+
+    prompt = f"""
+You are a debugging expert.
+
+Target Language and Framework: {version_info}
+
+A {len(code.splitlines())}-line file failed with this error:
+
+ERROR:
+{state["error_logs"]}
+
+The lines around the error are below, each prefixed with its line number and "| ".
+
+- Fix the issue causing the error with the smallest possible edits.
+- Preserve original logic and functionality.
+- Do NOT change behavior.
+- Answer ONLY with one or more edit blocks in exactly this format:
+<<<<<<< SEARCH
+lines copied exactly from the code, without the line number prefixes
+=======
+the replacement lines
+>>>>>>> REPLACE
+- Each SEARCH part must match exactly one place in the file; include enough surrounding lines to make it unique.
+- Do NOT add explanations.
+- Do NOT wrap in markdown.
+
+Failing Region:
+{excerpt(code, windows)}
+"""
+    return prompt
+
+
+def _patched(code: str, text: str) -> Optional[str]:
+    """The code with the edits of a patch completion applied, or None when they do not apply."""
+    patched = apply_edits(code, parse_edits(text))
+    if patched is None or patched == code:
+        record_patch("no_match")
+        return None
+    return patched
+
+
+def _accept(syntax_error: Any) -> bool:
+    """Keeps a patch that still parses (syntax_error from sandbox.check_syntax)."""
+    record_patch("applied" if syntax_error is None else "invalid")
+    return syntax_error is None
 
-    response = llm.invoke(prompt)
+
+def optimizer_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fixes failing code using error logs.
+    Increments retry counter.
+
+    For large files with a located error the model is asked for
+    SEARCH/REPLACE edits of the region around it; the edits are applied
+    locally and syntax checked, and the whole file is regenerated when
+    they do not apply or break the syntax.
+    """
+
+    if not state.get("error_logs"):
+        return state
+
+    code = extract_code_block(state["current_code"])
+    windows = _patch_windows(code, state)
+    if windows is not None:
+        response = cached_invoke(get_llm("optimizer"), _build_patch_prompt(state, code, windows), template_version=PROMPT_VERSION)
+        patched = _patched(code, response.content)
+        if patched is not None and _accept(check_syntax(patched, state.get("language", "python"))):
+            state["current_code"] = patched
+            state["itr"] += 1
+            return state
+
+    response = cached_invoke(get_llm("optimizer"), _build_prompt(state), template_version=PROMPT_VERSION)
     # print(f"OPTIMIZER {state['itr']}\n", response.content.strip())
     state["current_code"] = extract_code_block(response.content.strip())
     state["itr"] += 1
 
     return state
+
+
+async def aoptimizer_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of optimizer_node."""
+
+    if not state.get("error_logs"):
+        return state
+
+    code = extract_code_block(state["current_code"])
+    windows = _patch_windows(code, state)
+    if windows is not None:
+        response = await acached_invoke(get_llm("optimizer"), _build_patch_prompt(state, code, windows), template_version=PROMPT_VERSION)
+        patched = _patched(code, response.content)
+        if patched is not None and _accept(await acheck_syntax(patched, state.get("language", "python"))):
+            state["current_code"] = patched
+            state["itr"] += 1
+            return state
+
+    response = await acached_invoke(get_llm("optimizer"), _build_prompt(state), template_version=PROMPT_VERSION)
+    state["current_code"] = extract_code_block(response.content.strip())
+    state["itr"] += 1
+
+    return state
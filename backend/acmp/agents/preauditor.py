@@ -0,0 +1,67 @@
+# acmp/agents/preauditor.py
+
+from typing import Dict, Any, List
+
+from ..state import LegacyPattern, TransformationPlan
+from ..utils.helper import is_python_file
+from ..utils.legacy_rules import Finding, apply_rules, summarize_findings
+
+
+def _patterns(findings: List[Finding], applied: bool) -> List[LegacyPattern]:
+    by_rule = {f.rule.name: f.rule for f in findings}
+    lines: Dict[str, List[int]] = {}
+    for f in findings:
+        lines.setdefault(f.rule.name, []).append(f.line)
+
+    patterns = []
+    for name, rule in by_rule.items():
+        where = ", ".join(str(n) for n in sorted(set(lines[name]))[:10])
+        fix = f"{rule.recommended_fix} (already applied)" if applied else rule.recommended_fix
+        patterns.append(LegacyPattern(pattern=f"{rule.pattern} (lines {where})", recommended_fix=fix))
+    return patterns
+
+
+def preauditor_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rule-based first pass over Python files (see utils/legacy_rules.py).
+
+    Deterministic rewrites are applied locally. When the rules rewrote
+    something and nothing is left that needs an LLM (no detect-only
+    findings and the result compiles as Python 3), the rewritten code goes
+    straight to the tester. Otherwise, including files the rules found
+    nothing in, the auditor receives the (rewritten) code and the
+    pre-filled patterns.
+    """
+    if not is_python_file(state) or state.get("transformation_plan") is not None:
+        return state  # not Python, or already handled by a batched pre-pass
+
+    result = apply_rules(state["original_code"], state.get("file_path") or "<string>")
+    applied = _patterns(result.applied, applied=True)
+    remaining = _patterns(result.remaining, applied=False)
+
+    if result.applied and not result.remaining and result.syntax_error is None:
+        counts = summarize_findings(result.applied)
+        state["language"] = "python"
+        state["transformation_plan"] = TransformationPlan(
+            language="python",
+            legacy_patterns=applied,
+            modernization_steps=[f"Rule-based rewrite: {name} x{n}" for name, n in counts.items()],
+        )
+        state["current_code"] = result.code
+        return state
+
+    if result.syntax_error is not None and not result.remaining:
+        after = " left after rule-based rewrites" if result.applied else ""
+        remaining.append(LegacyPattern(
+            pattern=f"Python 3 syntax error{after}: {result.syntax_error}",
+            recommended_fix="Port the remaining Python 2 construct.",
+        ))
+
+    state["preprocessed_code"] = result.code if result.applied else None
+    state["prefilled_patterns"] = applied + remaining
+    return state
+
+
+async def apreauditor_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of preauditor_node (pure CPU, runs inline)."""
+    return preauditor_node(state)
@@ -1,14 +1,84 @@
 # acmp/agents/tester.py
 
-from typing import Dict, Any
-from ..utils.sandbox import run_code
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+from ..utils.differential import arun_baseline, compare, needs_baseline, run_baseline
+from ..utils.sandbox import TIMEOUT_MESSAGE, ExecutionResult, acheck_syntax, aexecute, check_syntax, execute, verdict
 from ..utils.helper import extract_code_block
+from ..utils.metrics import record_calls_saved
+from ..utils.test_memo import code_hash, error_signature, memo_key, test_memo
+
+# Optimizer laps allowed after the first test (checked by graph.retry).
+MAX_ITERATION = 3
+
+
+def _record_outcome(state: Dict[str, Any], code: str, success: bool, error: Optional[str], memo_hit: bool) -> Dict[str, Any]:
+    """
+    Stores the test verdict and decides whether another optimizer lap is
+    worth it: when the code is identical to an earlier attempt, or the error
+    signature matches the previous attempt's, the optimizer is not making
+    progress and the run stops (state["stop_reason"]). Skipped work is
+    added up in state["calls_saved"].
+    """
+    state["error_logs"] = None if success else error
+    saved = dict(state.get("calls_saved") or {"llm_calls": 0, "sandbox_runs": 0})
+    if memo_hit:
+        saved["sandbox_runs"] += 1
+        record_calls_saved("memo_hit", 0, 1)
+
+    attempts = list(state.get("test_attempts") or [])
+    attempt = {"code_hash": code_hash(code), "signature": error_signature(state["error_logs"])}
+
+    if state["error_logs"] not in (None, TIMEOUT_MESSAGE):
+        reason = None
+        if any(a["code_hash"] == attempt["code_hash"] for a in attempts):
+            reason = "repeated_code"
+        elif attempts and attempts[-1]["signature"] == attempt["signature"]:
+            reason = "repeated_error"
+
+        laps = MAX_ITERATION - state.get("itr", 0)
+        if reason and laps > 0:
+            # each skipped lap is one optimizer call and one sandbox run
+            state["stop_reason"] = reason
+            saved["llm_calls"] += laps
+            saved["sandbox_runs"] += laps
+            record_calls_saved(reason, laps, laps)
+
+    state["test_attempts"] = attempts + [attempt]
+    state["calls_saved"] = saved
+    return state
+
+
+def _judge(state: Dict[str, Any], code: str, key: str, result: ExecutionResult, memo_hit: bool) -> Dict[str, Any]:
+    """Pass/fail of a run, including the differential check against the original."""
+    if not memo_hit and not result.timed_out and not (result.error or "").startswith("Sandbox error:"):
+        # timeouts and sandbox failures say more about the machine than the code
+        test_memo.put(key, result)
+
+    # usage of the run that produced this verdict (an earlier one on a memo hit)
+    state["execution_stats"] = {**(result.usage or {}), "memo_hit": memo_hit}
+
+    success, error = verdict(result)
+    if success:
+        mismatch = compare(state.get("baseline"), result)
+        if mismatch is not None:
+            success, error = False, mismatch
+    return _record_outcome(state, code, success, error, memo_hit)
 
 
 def tester_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Executes the current_code inside sandbox.
     Updates error_log depending on result.
+
+    Code that does not parse fails on a syntax-only check (see
+    sandbox.check_syntax) without being run. On the first full test of a
+    run the original code is executed alongside it, and its fingerprint
+    (exit code, stdout, stderr error class) is kept in state["baseline"]; a
+    modernized program that exits 0 but behaves differently fails the test
+    (see utils/differential.py).
     """
 
     code = extract_code_block(state.get("current_code"))
@@ -20,11 +90,63 @@ def tester_node(state: Dict[str, Any]) -> Dict[str, Any]:
     language = state.get("language", "python")
     framework = state.get("framework")
 
-    success, error = run_code(code, language=language, framework=framework)
-    # print(f"TEST {state['itr']}\n", error)
-    if success:
-        state["error_logs"] = None
-    else:
-        state["error_logs"] = error
+    key = memo_key(code, language, framework)
+    result = test_memo.get(key)
+    memo_hit = result is not None
 
-    return state
+    if not memo_hit:
+        result = check_syntax(code, language)
+        if result is not None:
+            record_calls_saved("syntax_check", 0, 1)
+            return _judge(state, code, key, result, memo_hit)
+
+    if needs_baseline(state):
+        if memo_hit:
+            state["baseline"] = run_baseline(state)
+        else:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                baseline = pool.submit(contextvars.copy_context().run, run_baseline, state)
+                result = execute(code, language=language, framework=framework)
+                state["baseline"] = baseline.result()
+    elif not memo_hit:
+        result = execute(code, language=language, framework=framework)
+
+    return _judge(state, code, key, result, memo_hit)
+
+
+async def atester_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async tester: runs the sandbox without blocking the event loop.
+    """
+
+    code = extract_code_block(state.get("current_code"))
+
+    if not code:
+        state["error_logs"] = "No code to test."
+        return state
+
+    language = state.get("language", "python")
+    framework = state.get("framework")
+
+    key = memo_key(code, language, framework)
+    result = test_memo.get(key)
+    memo_hit = result is not None
+
+    if not memo_hit:
+        result = await acheck_syntax(code, language)
+        if result is not None:
+            record_calls_saved("syntax_check", 0, 1)
+            return _judge(state, code, key, result, memo_hit)
+
+    if needs_baseline(state):
+        if memo_hit:
+            state["baseline"] = await arun_baseline(state)
+        else:
+            result, state["baseline"] = await asyncio.gather(
+                aexecute(code, language=language, framework=framework),
+                arun_baseline(state),
+            )
+    elif not memo_hit:
+        result = await aexecute(code, language=language, framework=framework)
+
+    return _judge(state, code, key, result, memo_hit)
@@ -0,0 +1,224 @@
+# acmp/bench/pipeline.py
+#
+# Offline benchmark of the whole LangGraph pipeline. The Groq models are
+# replaced by a scripted (or replayed) stand-in, so the numbers measure
+# orchestration, parsing and sandbox overhead rather than the provider.
+#
+#   cd backend
+#   python -m acmp.bench.pipeline                          # acmp/dummy_test
+#   python -m acmp.bench.pipeline --files 200 --lines 300 --fail-rate 0.3 --workers 8
+#   python -m acmp.bench.pipeline --json out.json --compare baseline.json
+#   python -m acmp.bench.pipeline --record run.jsonl        # real Groq calls, saved for --replay
+
+import argparse
+import asyncio
+import hashlib
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from acmp.bench.fake_llm import LLMRecorder, ScriptedLLM, install_llm, pipeline_responder, replay_llm
+from acmp.utils.checkpoint import ainvoke_resumable, new_run_id
+from acmp.utils.llm_client import get_llm, set_llm
+from acmp.utils import llm_cache
+from acmp.utils.file_loader import read_file, scan_directory
+
+
+DUMMY_DIR = Path(__file__).resolve().parent.parent / "dummy_test"
+
+_SYNTHETIC_FUNCTION = '''
+def handler_{i}(data, key):
+    if data.has_key(key):
+        print "found", key, data[key]
+    else:
+        print "missing %s" % key
+    try:
+        value = int(data.get(key, 0))
+    except ValueError, e:
+        print "bad value", e
+        value = 0
+    return value * {i}
+'''
+
+
+# Python 2 code the rule-based pre-auditor can detect but not rewrite.
+_NEEDS_LLM = "TOTAL = reduce(lambda a, b: a + b, [1, 2, 3])\n"
+
+
+def make_synthetic_corpus(directory: Path, files: int, lines: int, llm_share: float = 1.0) -> List[str]:
+    """
+    Writes `files` Python 2 style modules of roughly `lines` lines each. A
+    `llm_share` fraction of them contains a construct only the LLM can port;
+    the rest are fully handled by the rule-based pre-auditor.
+    """
+    paths = []
+    per_function = _SYNTHETIC_FUNCTION.count("\n")
+    for n in range(files):
+        body = "".join(_SYNTHETIC_FUNCTION.format(i=i) for i in range(max(1, lines // per_function)))
+        extra = _NEEDS_LLM if n % 100 < llm_share * 100 else ""
+        path = directory / f"module_{n:04d}.py"
+        path.write_text(f"# synthetic legacy module {n}\nimport os\n{extra}{body}", encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def initial_state(file_path: str) -> Dict[str, Any]:
+    return {
+        "file_path": file_path,
+        "original_code": read_file(file_path),
+        "language": "python",
+        "framework": None,
+        "language_version": None,
+        "framework_version": None,
+        "preprocessed_code": None,
+        "prefilled_patterns": None,
+        "transformation_plan": None,
+        "current_code": None,
+        "error_logs": None,
+        "itr": 0,
+        "test_attempts": [],
+        "stop_reason": None,
+        "calls_saved": None,
+        "baseline": None,
+        "execution_stats": None,
+        "routing": [],
+        "run_metrics": [],
+    }
+
+
+async def run(graph: Any, paths: List[str], workers: int) -> List[Dict[str, Any]]:
+    """Runs every file, recording end-to-end latency next to the final state."""
+    semaphore = asyncio.Semaphore(workers)
+
+    async def one(path: str) -> Dict[str, Any]:
+        async with semaphore:
+            started = time.perf_counter()
+            result = await ainvoke_resumable(graph, initial_state(path), new_run_id())
+            result["e2e_time"] = time.perf_counter() - started
+            return result
+
+    return await asyncio.gather(*(one(p) for p in paths))
+
+
+def report(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    per_node: Dict[str, List[float]] = {}
+    for result in results:
+        for sample in result.get("run_metrics") or []:
+            per_node.setdefault(sample["node"], []).append(sample["wall_time"])
+
+    e2e = [r["e2e_time"] for r in results]
+    return {
+        "files": len(results),
+        "elapsed": elapsed,
+        "files_per_second": len(results) / elapsed if elapsed else 0.0,
+        "succeeded": sum(1 for r in results if r.get("error_logs") is None),
+        "retries": sum(r.get("itr", 0) for r in results),
+        "early_stops": sum(1 for r in results if r.get("stop_reason")),
+        "llm_calls_saved": sum((r.get("calls_saved") or {}).get("llm_calls", 0) for r in results),
+        "sandbox_runs_saved": sum((r.get("calls_saved") or {}).get("sandbox_runs", 0) for r in results),
+        "e2e": {"p50": percentile(e2e, 50), "p95": percentile(e2e, 95), "mean": statistics.mean(e2e) if e2e else 0.0},
+        "nodes": {
+            node: {"count": len(t), "p50": percentile(t, 50), "p95": percentile(t, 95)}
+            for node, t in sorted(per_node.items())
+        },
+    }
+
+
+def print_report(stats: Dict[str, Any]) -> None:
+    print(
+        f"{stats['files']} files in {stats['elapsed']:.2f}s -> {stats['files_per_second']:.2f} files/s "
+        f"({stats['succeeded']} succeeded, {stats['retries']} optimizer retries)"
+    )
+    if stats.get("early_stops"):
+        print(
+            f"early stops: {stats['early_stops']} "
+            f"(saved {stats['llm_calls_saved']} LLM calls, {stats['sandbox_runs_saved']} sandbox runs)"
+        )
+    print(f"{'stage':<10} {'count':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for node, s in stats["nodes"].items():
+        print(f"{node:<10} {s['count']:>6} {s['p50'] * 1000:9.2f} {s['p95'] * 1000:9.2f}")
+    print(f"{'e2e':<10} {stats['files']:>6} {stats['e2e']['p50'] * 1000:9.2f} {stats['e2e']['p95'] * 1000:9.2f}")
+
+
+def compare(stats: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Names of the p95 latencies / throughput that regressed by more than `tolerance`."""
+    regressions = []
+    for node, s in stats["nodes"].items():
+        base = baseline.get("nodes", {}).get(node)
+        if base and s["p95"] > base["p95"] * (1 + tolerance):
+            regressions.append(f"{node} p95 {base['p95'] * 1000:.2f}ms -> {s['p95'] * 1000:.2f}ms")
+    if stats["files_per_second"] < baseline.get("files_per_second", 0) * (1 - tolerance):
+        regressions.append(f"throughput {baseline['files_per_second']:.2f} -> {stats['files_per_second']:.2f} files/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark with a fake LLM.")
+    parser.add_argument("--files", type=int, default=0, help="synthetic files to generate (0 = use acmp/dummy_test)")
+    parser.add_argument("--lines", type=int, default=120, help="approximate lines per synthetic file")
+    parser.add_argument("--llm-share", type=float, default=1.0, help="fraction of synthetic files the rule-based pass cannot finish")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of files whose first attempts fail")
+    parser.add_argument("--fail-attempts", type=int, default=2, help="failing attempts for those files (drives retries)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated LLM latency per call, seconds")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="simulated decode time per output token, seconds")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--replay", help="JSONL recording to answer from instead of the scripted responder")
+    parser.add_argument("--record", help="call the real models and save their completions to this JSONL file")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--compare", help="baseline report; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    def fail_attempts(original: str) -> int:
+        bucket = int(hashlib.sha256(original.encode("utf-8")).hexdigest(), 16) % 1000
+        return args.fail_attempts if bucket < args.fail_rate * 1000 else 0
+
+    if args.record:
+        for node in ("auditor", "engineer", "optimizer"):
+            set_llm(LLMRecorder(get_llm(node), args.record), node)
+    elif args.replay:
+        install_llm(replay_llm(args.replay, args.latency, args.token_latency))
+    else:
+        install_llm(ScriptedLLM(
+            responder=pipeline_responder(fail_attempts), latency=args.latency, token_latency=args.token_latency
+        ))
+    llm_cache.CACHE_ENABLED = False  # every run must exercise the full path
+
+    from acmp.graph import graph
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.files:
+            paths = make_synthetic_corpus(Path(tmp), args.files, args.lines, args.llm_share)
+        else:
+            paths = list(scan_directory(str(DUMMY_DIR)))
+
+        started = time.perf_counter()
+        results = asyncio.run(run(graph, paths, args.workers))
+        stats = report(results, time.perf_counter() - started)
+
+    print_report(stats)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(stats, indent=2), encoding="utf-8")
+
+    if args.compare:
+        regressions = compare(stats, json.loads(Path(args.compare).read_text(encoding="utf-8")), args.tolerance)
+        for line in regressions:
+            print("REGRESSION:", line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
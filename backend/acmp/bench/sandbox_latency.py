@@ -0,0 +1,57 @@
+# acmp/bench/sandbox_latency.py
+#
+# Per-test latency of the Python sandbox: fresh interpreter per run vs the
+# warm interpreter pool.
+#
+#   cd backend && python -m acmp.bench.sandbox_latency --runs 50
+
+import argparse
+import statistics
+import time
+
+from acmp.utils import sandbox
+
+
+SAMPLES = {
+    "hello": "print('hello')",
+    "stdlib": "import json, re, collections\nprint(json.dumps(collections.Counter(re.findall(r'\\w', 'abcab'))))",
+    "failing": "def f():\n    raise ValueError('boom')\nf()",
+}
+
+
+def measure(code: str, runs: int, pool_size: int) -> list:
+    sandbox.PYTHON_POOL_SIZE = pool_size
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        sandbox.run_code(code, language="python")
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+
+    # Warm the pool up so worker startup is not billed to the first sample.
+    measure("pass", 1, args.pool_size)
+
+    print(f"{'sample':<10} {'mode':<7} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for name, code in SAMPLES.items():
+        for mode, size in (("spawn", 0), ("pool", args.pool_size)):
+            t = measure(code, args.runs, size)
+            print(
+                f"{name:<10} {mode:<7} {percentile(t, 50) * 1000:8.1f} "
+                f"{percentile(t, 95) * 1000:8.1f} {statistics.mean(t) * 1000:8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
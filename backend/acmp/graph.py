@@ -1,11 +1,15 @@
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import START, END, StateGraph
 from acmp.state import AgentState
-from acmp.agents.auditor import auditor_node
-from acmp.agents.engineer import engineer_node
-from acmp.agents.tester import tester_node
-from acmp.agents.optimiser import optimizer_node
+from acmp.agents.preauditor import preauditor_node, apreauditor_node
+from acmp.agents.auditor import auditor_node, aauditor_node
+from acmp.agents.engineer import engineer_node, aengineer_node
+from acmp.agents.tester import MAX_ITERATION, tester_node, atester_node
+from acmp.agents.optimiser import optimizer_node, aoptimizer_node
+from acmp.utils.checkpoint import get_checkpointer
+from acmp.utils.metrics import instrument_node
+from acmp.utils.model_router import routed_node
 
-MAX_ITERATION = 3
 
 def retry(state):
     """
@@ -20,6 +24,10 @@ def retry(state):
     
     if error is None or error == timeout_msg:
         return END
+
+    # The tester saw the optimizer repeat itself (same code or same error)
+    if state.get("stop_reason"):
+        return END
         
     # If there are real errors, check the iteration count
     if state.get("itr", 0) < MAX_ITERATION:
@@ -27,17 +35,37 @@ def retry(state):
         
     return END
 
+def after_preaudit(state):
+    """
+    Skips the LLM stages when the rule-based pass already produced the code.
+    """
+    if state.get("current_code"):
+        return "tester"
+    return "auditor"
+
+def _node(name, func, afunc):
+    """
+    Instrumented, model-routed node with a sync implementation for
+    invoke/stream and an async one for ainvoke/astream.
+    """
+    return RunnableLambda(
+        routed_node(name, instrument_node(name, func)), afunc=routed_node(name, instrument_node(name, afunc)), name=name
+    )
+
+
 #Building graph
 builder = StateGraph(AgentState)
 
 #adding nodes:
-builder.add_node("auditor", auditor_node)
-builder.add_node("engineer", engineer_node)
-builder.add_node("tester", tester_node)
-builder.add_node("optimizer", optimizer_node)
+builder.add_node("preauditor", _node("preauditor", preauditor_node, apreauditor_node))
+builder.add_node("auditor", _node("auditor", auditor_node, aauditor_node))
+builder.add_node("engineer", _node("engineer", engineer_node, aengineer_node))
+builder.add_node("tester", _node("tester", tester_node, atester_node))
+builder.add_node("optimizer", _node("optimizer", optimizer_node, aoptimizer_node))
 
-builder.set_entry_point("auditor")
+builder.set_entry_point("preauditor")
 
+builder.add_conditional_edges("preauditor", after_preaudit)
 builder.add_edge("auditor", "engineer")
 builder.add_edge("engineer", "tester")
 
@@ -45,4 +73,6 @@ builder.add_conditional_edges("tester", retry)
 
 builder.add_edge("optimizer", "tester")
 
-graph = builder.compile()
\ No newline at end of file
+# State is checkpointed after every node (see utils/checkpoint.py): runs need a
+# run_config(run_id), and an interrupted run resumes from its last completed node.
+graph = builder.compile(checkpointer=get_checkpointer())
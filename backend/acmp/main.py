@@ -1,13 +1,48 @@
 # acmp/main.py
 
+import argparse
+import asyncio
+import time
 from pathlib import Path
 
 from graph import graph
+from batch import run_batch, format_progress
 from utils.file_loader import scan_directory, read_file, get_relative_path
+from acmp.agents import auditor, batch_auditor, engineer, optimiser
+from acmp.agents.preauditor import preauditor_node
+from acmp.utils.checkpoint import ainvoke_resumable, invoke_resumable
+from acmp.utils.dedup import DedupPlan, find_duplicates
+from acmp.utils.legacy_rules import RULES_VERSION
+from acmp.utils.llm_cache import cache_stats
+from acmp.utils.manifest import IN_PROGRESS, Manifest, hash_source
+from acmp.utils.rate_limit import configure_rate_limit
 
 
 INPUT_DIR = "dummy_test"
 OUTPUT_DIR = "modernized_code"
+DEFAULT_WORKERS = 4
+
+# Bump when the graph itself changes; prompt and rule versions are added below.
+PIPELINE_VERSION = "2"
+
+
+def pipeline_version() -> str:
+    """
+    Identifies everything that shapes the output, so manifest entries made
+    by an older pipeline are redone.
+    """
+    return (
+        f"{PIPELINE_VERSION}/auditor-{auditor.PROMPT_VERSION}.{batch_auditor.PROMPT_VERSION}/engineer-{engineer.PROMPT_VERSION}"
+        f"/optimizer-{optimiser.PROMPT_VERSION}/rules-{RULES_VERSION}"
+    )
+
+
+def run_id(file_path: str, root_path: str, source_hash: str) -> str:
+    """
+    Checkpoint run ID of a file: the same while its source and the pipeline
+    are unchanged, so rerunning after a crash resumes its interrupted run.
+    """
+    return hash_source(f"{get_relative_path(file_path, root_path)}\x00{source_hash}\x00{pipeline_version()}")
 
 
 def save_modernized_file(relative_path: str, code: str):
@@ -22,38 +57,296 @@ def save_modernized_file(relative_path: str, code: str):
         f.write(code)
 
 
-def process_file(file_path: str, root_path: str):
+def build_initial_state(file_path: str) -> dict:
     """
-    Runs full agent pipeline on a single file.
+    Initial graph state for one source file.
     """
-
-    print(f"\nProcessing: {file_path}")
-
-    state = {
+    return {
         "file_path": file_path,
         "original_code": read_file(file_path),
+        "preprocessed_code": None,
+        "prefilled_patterns": None,
         "transformation_plan": None,
         "current_code": None,
         "error_logs": None,
         "itr": 0,
+        "test_attempts": [],
+        "stop_reason": None,
+        "calls_saved": None,
+        "baseline": None,
+        "execution_stats": None,
+        "routing": [],
+        "run_metrics": [],
     }
-    print(f"INPUT CODE : \n",state["original_code"])
-    result = graph.invoke(state)
 
-    if result["error_logs"] in [None, "Execution timed out (possible infinite loop)."]:
-        relative_path = get_relative_path(file_path, root_path)
+
+def handle_result(file_path: str, root_path: str, result: dict, manifest: Manifest = None, source_hash: str = None) -> bool:
+    """
+    Saves a successful result; returns whether the file was modernized.
+    """
+    relative_path = get_relative_path(file_path, root_path)
+    ok = result["error_logs"] in [None, "Execution timed out (possible infinite loop)."]
+
+    if ok:
         save_modernized_file(relative_path, result["current_code"])
         print("Modernized successfully")
     else:
         print("Failed after retries")
         print("Final Error:", result["error_logs"])
+    if result.get("stop_reason"):
+        saved = result.get("calls_saved") or {}
+        print(f"Stopped early ({result['stop_reason']}): saved {saved.get('llm_calls', 0)} LLM calls, "
+              f"{saved.get('sandbox_runs', 0)} sandbox runs")
+
+    # recorded after the output file is written, so "success" implies it exists
+    if manifest is not None:
+        manifest.record_result(relative_path, source_hash, pipeline_version(), result, ok)
+    return ok
+
+
+def audit_small_files(file_paths: list) -> dict:
+    """
+    Builds the initial states and plans the small files with batched
+    auditor requests (see agents/batch_auditor.py); returns {path: state}.
+    """
+    states = {file_path: build_initial_state(file_path) for file_path in file_paths}
+    stats = batch_auditor.audit_in_batches(list(states.values()))
+    if stats["files"]:
+        print(
+            f"Batched audit: {stats['files']} small files planned with {stats['requests']} requests "
+            f"({stats['fallbacks']} fell back to a request of their own)"
+        )
+    return states
+
+
+def process_file(file_path: str, root_path: str, manifest: Manifest = None, source_hash: str = None, state: dict = None):
+    """
+    Runs full agent pipeline on a single file.
+    """
+
+    print(f"\nProcessing: {file_path}")
+
+    state = state or build_initial_state(file_path)
+    print(f"INPUT CODE : \n",state["original_code"])
+    if manifest is not None:
+        manifest.mark_started(get_relative_path(file_path, root_path), source_hash, pipeline_version())
+    result = invoke_resumable(graph, state, run_id(file_path, root_path, source_hash or hash_source(state["original_code"])))
+
+    handle_result(file_path, root_path, result, manifest, source_hash)
+    return result
+
+
+def process_batch(file_paths: list, root_path: str, workers: int, manifest: Manifest = None, hashes: dict = None,
+                  states: dict = None) -> dict:
+    """
+    Runs the pipeline over all files concurrently, reporting progress in order;
+    returns {path: final state} for the files that did not raise.
+    """
+    return asyncio.run(aprocess_batch(file_paths, root_path, workers, manifest, hashes, states))
+
+
+async def aprocess_batch(file_paths: list, root_path: str, workers: int, manifest: Manifest = None, hashes: dict = None,
+                         states: dict = None) -> dict:
+    """process_batch inside the running event loop."""
+    started = time.perf_counter()
+    total = len(file_paths)
+    succeeded = 0
+    hashes = hashes or {}
+    states = states or {}
+    results = {}
+
+    def build_state(file_path):
+        if manifest is not None:
+            manifest.mark_started(get_relative_path(file_path, root_path), hashes.get(file_path), pipeline_version())
+        return states.pop(file_path, None) or build_initial_state(file_path)
+
+    def on_result(index, file_path, result, error):
+        nonlocal succeeded
+        print(f"\n{format_progress(index, total, started)} {file_path}")
+        if error is not None:
+            print("Pipeline error:", error)
+            if manifest is not None:
+                manifest.record_result(get_relative_path(file_path, root_path), hashes.get(file_path),
+                                       pipeline_version(), None, False, error=str(error))
+            return
+        results[file_path] = result
+        if handle_result(file_path, root_path, result, manifest, hashes.get(file_path)):
+            succeeded += 1
+
+    def invoke(state):
+        file_path = state["file_path"]
+        return ainvoke_resumable(graph, state, run_id(file_path, root_path, hashes.get(file_path) or hash_source(state["original_code"])))
+
+    await run_batch(graph, file_paths, build_state, on_result, workers=workers, invoke=invoke)
+
+    elapsed = time.perf_counter() - started
+    print(f"\n{succeeded}/{total} files modernized in {elapsed:.1f}s with {workers} workers")
+    return results
+
+
+def _run_sequential(file_paths: list, root_path: str, manifest: Manifest, hashes: dict, states: dict) -> dict:
+    return {
+        file_path: process_file(file_path, root_path, manifest, hashes[file_path], states.pop(file_path, None))
+        for file_path in file_paths
+    }
+
+
+def run_files(file_paths: list, root_path: str, workers: int, manifest: Manifest, hashes: dict, states: dict) -> dict:
+    """Sequential or concurrent run over `file_paths`; returns {path: final state}."""
+    if not file_paths:
+        return {}
+    if workers <= 1:
+        return _run_sequential(file_paths, root_path, manifest, hashes, states)
+    return process_batch(file_paths, root_path, workers, manifest, hashes, states)
+
+
+async def arun_files(file_paths: list, root_path: str, workers: int, manifest: Manifest, hashes: dict, states: dict) -> dict:
+    """run_files inside the running event loop (a sequential run blocks it, nothing else is scheduled)."""
+    if not file_paths:
+        return {}
+    if workers <= 1:
+        return _run_sequential(file_paths, root_path, manifest, hashes, states)
+    return await aprocess_batch(file_paths, root_path, workers, manifest, hashes, states)
+
+
+def _llm_calls(result: dict, node: str = None) -> int:
+    return sum(s["llm_calls"] for s in result.get("run_metrics") or [] if node is None or s["node"] == node)
+
+
+def _audit_calls(result: dict) -> int:
+    """Auditor requests behind a result (a batched audit counts as one, a rule-only run as none)."""
+    if not _llm_calls(result):
+        return 0
+    return max(1, _llm_calls(result, "auditor"))
+
+
+def find_duplicate_files(file_paths: list) -> DedupPlan:
+    plan = find_duplicates(file_paths, read_file)
+    if plan.skipped or plan.near:
+        print(f"Dedup: {plan.skipped} exact copies fanned out, {len(plan.near)} near-duplicates reuse a plan")
+    return plan
+
+
+def plan_near_duplicates(plan: DedupPlan, results: dict) -> dict:
+    """
+    Initial states of the near-duplicates, carrying their representative's
+    transformation plan so the graph skips the auditor; returns {path: state}.
+    """
+    states = {}
+    for file_path, representative in plan.near.items():
+        state = preauditor_node(build_initial_state(file_path))
+        rep_plan = (results.get(representative) or {}).get("transformation_plan")
+        if state.get("transformation_plan") is None and rep_plan is not None:
+            auditor.apply_plans(state, [rep_plan])
+        states[file_path] = state
+    return states
+
+
+def run_deduplicated(file_paths: list, root_path: str, workers: int, manifest: Manifest, hashes: dict,
+                     batch_audit: bool = True) -> int:
+    """
+    Runs the representatives first, then the near-duplicates with the
+    representatives' plans, and writes the exact copies from their
+    representative's result. Returns the number of LLM calls avoided.
+
+    Both phases share one event loop, so the second reuses the async HTTP
+    connections the first one opened.
+    """
+    return asyncio.run(arun_deduplicated(file_paths, root_path, workers, manifest, hashes, batch_audit))
+
+
+async def arun_deduplicated(file_paths: list, root_path: str, workers: int, manifest: Manifest, hashes: dict,
+                            batch_audit: bool = True) -> int:
+    """run_deduplicated inside the running event loop."""
+    plan = find_duplicate_files(file_paths)
+    copies = {copy: rep for rep, group in plan.exact.items() for copy in group}
+    representatives = [f for f in file_paths if f not in copies and f not in plan.near]
+
+    states = audit_small_files(representatives) if batch_audit else {}
+    results = await arun_files(representatives, root_path, workers, manifest, hashes, states)
+
+    near = [f for f in file_paths if f in plan.near]
+    near_states = plan_near_duplicates(plan, results)
+    avoided = sum(
+        _audit_calls(results[plan.near[f]]) for f in near
+        if plan.near[f] in results and near_states[f].get("current_code") is None
+    )
+    results.update(await arun_files(near, root_path, workers, manifest, hashes, near_states))
+
+    for copy, representative in copies.items():
+        print(f"\nCopy of {representative}: {copy}")
+        result = results.get(representative)
+        if result is None:
+            print("Representative failed, copy not written")
+            manifest.record_result(get_relative_path(copy, root_path), hashes[copy], pipeline_version(),
+                                   None, False, error=f"representative {representative} failed")
+            continue
+        handle_result(copy, root_path, result, manifest, hashes[copy])
+        avoided += _llm_calls(result) - _llm_calls(result, "auditor") + _audit_calls(result)
+    return avoided
+
+
+def plan_run(file_paths: list, root_path: str, manifest: Manifest, force: bool = False):
+    """
+    Splits the input into files to process and files the manifest says are
+    already done; returns (pending paths, {path: source hash}).
+    """
+    version = pipeline_version()
+    pending, hashes = [], {}
+    skipped = resumed = 0
+
+    for file_path in file_paths:
+        relative_path = get_relative_path(file_path, root_path)
+        hashes[file_path] = hash_source(read_file(file_path))
+        if not force and manifest.is_done(relative_path, hashes[file_path], version):
+            skipped += 1
+            continue
+        if manifest.status(relative_path) == IN_PROGRESS:
+            resumed += 1
+        pending.append(file_path)
+
+    print(f"{len(pending)} files to process ({resumed} interrupted last time), {skipped} unchanged and skipped")
+    return pending, hashes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Modernize every supported file under a directory.")
+    parser.add_argument("--input", default=INPUT_DIR, help="legacy source directory")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="files processed concurrently (1 = sequential)")
+    parser.add_argument("--rpm", type=float, default=None, help="Groq requests per minute limit")
+    parser.add_argument("--tpm", type=float, default=None, help="Groq tokens per minute limit")
+    parser.add_argument("--force", action="store_true", help="reprocess files the manifest marks as done")
+    parser.add_argument("--no-audit-batching", action="store_true", help="audit every file with a request of its own")
+    parser.add_argument("--no-dedup", action="store_true", help="process duplicated and near-duplicate files independently")
+    return parser.parse_args()
 
 
 def main():
-    root_path = INPUT_DIR
+    args = parse_args()
+    root_path = args.input
+
+    if args.rpm or args.tpm:
+        configure_rate_limit("groq", requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+
+    manifest = Manifest(OUTPUT_DIR)
+    file_paths, hashes = plan_run(list(scan_directory(root_path)), root_path, manifest, force=args.force)
+
+    if args.no_dedup:
+        states = {} if args.no_audit_batching else audit_small_files(file_paths)
+        run_files(file_paths, root_path, args.workers, manifest, hashes, states)
+        avoided = None
+    else:
+        avoided = run_deduplicated(file_paths, root_path, args.workers, manifest, hashes,
+                                   batch_audit=not args.no_audit_batching)
+    manifest.compact()
 
-    for file_path in scan_directory(root_path):
-        process_file(file_path, root_path)
+    stats = cache_stats()
+    print(
+        f"\nLLM cache: {stats['hits']} hits / {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%}), ~{stats['saved_seconds']:.1f}s saved"
+    )
+    if avoided is not None:
+        print(f"Dedup: ~{avoided} LLM calls avoided")
 
 
 if __name__ == "__main__":
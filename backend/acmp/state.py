@@ -36,6 +36,10 @@ class AgentState(TypedDict):
     language_version: Optional[str]
     framework_version: Optional[str]
 
+    #pre-auditor output (rule-based rewrites, see utils/legacy_rules.py):
+    preprocessed_code : Optional[str]
+    prefilled_patterns : Optional[List[LegacyPattern]]
+
     #auditor_output:
     transformation_plan : Optional[TransformationPlan]
 
@@ -48,5 +52,22 @@ class AgentState(TypedDict):
     #iterations:
     itr : int
 
+    #tester memo / early stop (see agents/tester.py):
+    test_attempts : Optional[List[dict]]
+    stop_reason : Optional[str]
+    calls_saved : Optional[dict]
+
+    #fingerprint of the original program's run (see utils/differential.py):
+    baseline : Optional[dict]
+
+    #wall/user/sys time and peak RSS of the last sandbox run of current_code:
+    execution_stats : Optional[dict]
+
+    #model routing decisions that led to LLM calls (see utils/model_router.py):
+    routing : Optional[List[dict]]
+
+    #per-node timing / token / sandbox samples (see utils/metrics.py):
+    run_metrics : Optional[List[dict]]
+
     #final flag:
     # is_valid : bool
\ No newline at end of file
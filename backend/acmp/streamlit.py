@@ -91,6 +91,7 @@ from pathlib import Path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
 
 from graph import graph
+from acmp.utils.checkpoint import finish_run, new_run_id, run_config
 from utils.file_loader import scan_directory, read_file, get_relative_path
 from main import save_modernized_file
 
@@ -155,20 +156,24 @@ if st.button("Run Pipeline", type="primary"):
 
             # 3. Stream the Graph to Sync UI with Nodes
             # 'updates' mode gives us the node name as it completes
-            for chunk in graph.stream(state, stream_mode="updates"):
-                for node_name, output in chunk.items():
-                    # Update the animation block in-place
-                    with step_placeholder.container():
-                        render_steps(st, active_step=node_name)
+            run_id = new_run_id()
+            try:
+                for chunk in graph.stream(state, run_config(run_id), stream_mode="updates"):
+                    for node_name, output in chunk.items():
+                        # Update the animation block in-place
+                        with step_placeholder.container():
+                            render_steps(st, active_step=node_name)
                     
-                    # Update the code display if the engineer or optimizer produced code
-                    if "current_code" in output and output["current_code"]:
-                        with output_placeholder.container():
-                            st.markdown("**Current Modernized Code**")
-                            st.code(output["current_code"], language="python")
+                        # Update the code display if the engineer or optimizer produced code
+                        if "current_code" in output and output["current_code"]:
+                            with output_placeholder.container():
+                                st.markdown("**Current Modernized Code**")
+                                st.code(output["current_code"], language="python")
                     
-                    # Store latest result for the save button
-                    final_result = output 
+                        # Store latest result for the save button
+                        final_result = output 
+            finally:
+                finish_run(graph, run_id)  # the checkpoints are only needed while it runs
 
             # 4. Final Result & Corrected Save Functionality
             # After the loop, the placeholder shows the final state
@@ -0,0 +1,122 @@
+# acmp/utils/build_cache.py
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+
+BUILD_CACHE_DIR = os.getenv("ACMP_BUILD_CACHE_DIR", str(Path.home() / ".cache" / "acmp" / "builds"))
+BUILD_CACHE_MAX_BYTES = int(os.getenv("ACMP_BUILD_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+_MARKER = "build.json"
+
+
+class BuildEntry(NamedTuple):
+    path: str             # directory holding the source and the compiled artifacts
+    ok: bool              # whether compilation succeeded
+    error: Optional[str]  # compiler output when it did not
+
+
+def make_build_key(language: str, build_cmd: list, source_name: str, code: str) -> str:
+    """Content hash of everything that determines the compiler's output."""
+    h = hashlib.sha256()
+    for part in (language, json.dumps(build_cmd), source_name, code):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class BuildCache:
+    """
+    Content-addressed store of compiled programs.
+
+    Every entry is a directory named after its build key. Builds happen in a
+    scratch directory next to the entries and are renamed into place, so a
+    half-written entry is never visible. Compile failures are cached too:
+    identical sources fail identically. Entries are evicted least recently
+    used first once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, directory: str = BUILD_CACHE_DIR, max_bytes: int = BUILD_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def lookup(self, key: str) -> Optional[BuildEntry]:
+        path = self.directory / key
+        try:
+            with open(path / _MARKER, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            self.stats["misses"] += 1
+            return None
+        os.utime(path / _MARKER)  # LRU bookkeeping
+        self.stats["hits"] += 1
+        return BuildEntry(str(path), meta["ok"], meta.get("error"))
+
+    def new_workdir(self) -> str:
+        """Scratch directory to compile into; hand it to commit() or discard()."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return tempfile.mkdtemp(prefix=".build-", dir=self.directory)
+
+    def discard(self, workdir: str) -> None:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    def commit(self, key: str, workdir: str, ok: bool, error: Optional[str] = None) -> BuildEntry:
+        with open(os.path.join(workdir, _MARKER), "w", encoding="utf-8") as f:
+            json.dump({"ok": ok, "error": error, "created_at": time.time()}, f)
+
+        final = self.directory / key
+        try:
+            os.rename(workdir, final)
+        except OSError:
+            # Another run built the same source first; keep theirs.
+            self.discard(workdir)
+            entry = self.lookup(key)
+            if entry is not None:
+                return entry
+            raise
+
+        self._evict(keep=key)
+        return BuildEntry(str(final), ok, error)
+
+    def _evict(self, keep: str) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.directory.iterdir():
+                marker = path / _MARKER
+                if not marker.exists():
+                    continue
+                size = sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+                entries.append((marker.stat().st_mtime, path, size))
+                total += size
+
+            for _, path, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path.name == keep:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                self.stats["evictions"] += 1
+                total -= size
+
+
+_cache: Optional[BuildCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_build_cache() -> BuildCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = BuildCache()
+    return _cache
@@ -0,0 +1,330 @@
+# acmp/utils/checkpoint.py
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_serializable_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from .metrics import record_resume
+
+
+# Graph state is saved after every node ("on"/"off"), so an interrupted run
+# continues from its last completed node instead of paying for its LLM calls again.
+CHECKPOINTS = os.getenv("ACMP_CHECKPOINTS", "on").lower() != "off"
+CHECKPOINT_DB = os.getenv("ACMP_CHECKPOINT_DB", str(Path.home() / ".cache" / "acmp" / "checkpoints.sqlite3"))
+
+# Finished runs drop their checkpoints at once; an interrupted run can be
+# resumed for this many seconds after its last checkpoint (0 = forever).
+CHECKPOINT_RETENTION = float(os.getenv("ACMP_CHECKPOINT_RETENTION", str(7 * 24 * 3600)))
+CLEANUP_INTERVAL = 3600.0  # seconds between expiry sweeps of one process
+
+# Pydantic models stored in the graph state (msgpack refuses unknown types).
+_STATE_TYPES = [("acmp.state", "TransformationPlan"), ("acmp.state", "LegacyPattern")]
+
+_SELECT = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata FROM checkpoints"
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver):
+    """
+    LangGraph checkpoint saver backed by a local SQLite file.
+
+    Checkpoints and the pending writes of their tasks are stored per thread
+    (one thread per pipeline run). Threads whose latest checkpoint is older
+    than `retention` seconds are deleted by cleanup(), which also runs once
+    an hour while checkpoints are written.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_DB, retention: float = CHECKPOINT_RETENTION):
+        super().__init__(serde=JsonPlusSerializer(allowed_msgpack_modules=_STATE_TYPES))
+        self.path = Path(path)
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._cleaned_at = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    parent_checkpoint_id TEXT,
+                    type TEXT,
+                    checkpoint BLOB,
+                    metadata TEXT,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+                );
+                CREATE TABLE IF NOT EXISTS writes (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    task_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    channel TEXT NOT NULL,
+                    type TEXT,
+                    value BLOB,
+                    task_path TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                );
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    # --- reads ---------------------------------------------------------------
+
+    def _writes(self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[Tuple[str, str, Any]]:
+        rows = conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in rows]
+
+    def _tuple(self, conn: sqlite3.Connection, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata = row
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=json.loads(metadata),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+            pending_writes=self._writes(conn, thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        args = [configurable["thread_id"], configurable.get("checkpoint_ns", "")]
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            query = f"{_SELECT} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+            args.append(checkpoint_id)
+        else:
+            query = f"{_SELECT} WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(query, args).fetchone()
+            return self._tuple(conn, row) if row is not None else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        clauses, args = [], []
+        if config:
+            configurable = config["configurable"]
+            clauses.append("thread_id = ?")
+            args.append(configurable["thread_id"])
+            if configurable.get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                args.append(configurable["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                args.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            clauses.append("checkpoint_id < ?")
+            args.append(get_checkpoint_id(before))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        found: List[CheckpointTuple] = []
+        with self._lock:
+            conn = self._connect()
+            for row in conn.execute(f"{_SELECT}{where} ORDER BY checkpoint_id DESC", args).fetchall():
+                if limit is not None and len(found) >= limit:
+                    break
+                if filter and not all(json.loads(row[6]).get(k) == v for k, v in filter.items()):
+                    continue
+                found.append(self._tuple(conn, row))
+        yield from found
+
+    # --- writes --------------------------------------------------------------
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        meta = json.dumps(get_serializable_checkpoint_metadata(config, metadata), default=str)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint["id"], configurable.get("checkpoint_id"),
+                     type_, blob, meta, time.time()),
+                )
+            if time.time() - self._cleaned_at > CLEANUP_INTERVAL:
+                self._cleanup(conn, self.retention)
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        configurable = config["configurable"]
+        key = (configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"])
+        # special channels (errors, interrupts) overwrite; regular writes are kept from the first attempt
+        verb = "REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "IGNORE"
+        rows = [
+            (*key, task_id, WRITES_IDX_MAP.get(channel, idx), channel, *self.serde.dumps_typed(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(f"INSERT OR {verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    def _cleanup(self, conn: sqlite3.Connection, max_age: float) -> int:
+        self._cleaned_at = time.time()
+        if max_age <= 0:
+            return 0
+        with conn:
+            expired = [
+                thread_id for (thread_id,) in conn.execute(
+                    "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?",
+                    (time.time() - max_age,),
+                ).fetchall()
+            ]
+            for thread_id in expired:
+                conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+        return len(expired)
+
+    def cleanup(self, max_age: Optional[float] = None) -> int:
+        """Deletes runs not checkpointed for `max_age` seconds (default: the retention); returns how many."""
+        with self._lock:
+            return self._cleanup(self._connect(), self.retention if max_age is None else max_age)
+
+    # --- async (same store, off the event loop) ------------------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        found = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in found:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+_checkpointer: Optional[SQLiteCheckpointer] = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> Optional[SQLiteCheckpointer]:
+    """The process-wide checkpointer (None when ACMP_CHECKPOINTS=off)."""
+    global _checkpointer
+    if not CHECKPOINTS:
+        return None
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                _checkpointer = SQLiteCheckpointer()
+    return _checkpointer
+
+
+# --- running the graph by run ID ---------------------------------------------
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+def run_config(run_id: str) -> Dict[str, Any]:
+    """Graph config of one pipeline run; the run ID is its checkpoint thread."""
+    return {"configurable": {"thread_id": run_id}}
+
+
+def _start_input(snapshot: Any, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if snapshot.next:
+        record_resume(snapshot.next[0])
+        return None  # LangGraph continues from the last checkpoint
+    return state
+
+
+def start_input(graph: Any, state: Dict[str, Any], run_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Input for running `run_id`: None when the run stopped before the end
+    (the graph then resumes after its last completed node), else `state`.
+    Checkpoints left by an earlier, finished run with that ID are dropped.
+    """
+    if graph.checkpointer is None:
+        return state
+    snapshot = graph.get_state(run_config(run_id))
+    if snapshot.values and not snapshot.next:
+        graph.checkpointer.delete_thread(run_id)
+    return _start_input(snapshot, state)
+
+
+async def astart_input(graph: Any, state: Dict[str, Any], run_id: str) -> Optional[Dict[str, Any]]:
+    """Async variant of start_input."""
+    if graph.checkpointer is None:
+        return state
+    snapshot = await graph.aget_state(run_config(run_id))
+    if snapshot.values and not snapshot.next:
+        await graph.checkpointer.adelete_thread(run_id)
+    return _start_input(snapshot, state)
+
+
+def finish_run(graph: Any, run_id: str) -> None:
+    """Drops the checkpoints of a run that reached the end."""
+    if graph.checkpointer is not None:
+        graph.checkpointer.delete_thread(run_id)
+
+
+async def afinish_run(graph: Any, run_id: str) -> None:
+    """Async variant of finish_run."""
+    if graph.checkpointer is not None:
+        await graph.checkpointer.adelete_thread(run_id)
+
+
+def invoke_resumable(graph: Any, state: Dict[str, Any], run_id: str) -> Dict[str, Any]:
+    """graph.invoke that resumes `run_id` if it was interrupted."""
+    result = graph.invoke(start_input(graph, state, run_id), run_config(run_id))
+    finish_run(graph, run_id)
+    return result
+
+
+async def ainvoke_resumable(graph: Any, state: Dict[str, Any], run_id: str) -> Dict[str, Any]:
+    """Async variant of invoke_resumable."""
+    result = await graph.ainvoke(await astart_input(graph, state, run_id), run_config(run_id))
+    await afinish_run(graph, run_id)
+    return result
@@ -0,0 +1,148 @@
+# acmp/utils/chunker.py
+
+import ast
+import contextvars
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from .helper import is_python_file
+
+
+# Python sources longer than this (in lines) are modernized chunk by chunk.
+CHUNK_LINES = int(os.getenv("ACMP_CHUNK_LINES", "250"))
+
+# Chunks of one file sent to the LLM at the same time by the sync nodes.
+CHUNK_WORKERS = int(os.getenv("ACMP_CHUNK_WORKERS", "8"))
+
+# Top-level lines that start a new statement in code `ast` cannot parse
+# (typically Python 2): definitions, decorators and the main guard.
+_TOP_LEVEL_RE = re.compile(r"^(?:def |class |async def |@|if __name__)")
+_IMPORT_RE = re.compile(r"^(?:import \S|from \S+ import )")
+_GLOBAL_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*\s*=[^=]")
+
+
+class Chunk(NamedTuple):
+    index: int
+    start_line: int  # 1-based line of the original file the chunk starts at
+    code: str
+
+
+class ChunkedSource(NamedTuple):
+    context: str        # imports and module globals, shown to every chunk
+    chunks: List[Chunk]
+
+
+def _statement_starts(code: str, lines: List[str]) -> List[int]:
+    """0-based line numbers where a top-level statement (or its decorators) begins."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return [i for i, line in enumerate(lines) if _TOP_LEVEL_RE.match(line)]
+
+    starts = []
+    for node in tree.body:
+        decorators = getattr(node, "decorator_list", None) or []
+        starts.append(min([node.lineno] + [d.lineno for d in decorators]) - 1)
+    return starts
+
+
+def _attach_comments(starts: List[int], lines: List[str]) -> List[int]:
+    """Moves each boundary above the comment block that documents the statement."""
+    moved = []
+    for start in starts:
+        while start > 0 and lines[start - 1].startswith("#"):
+            start -= 1
+        moved.append(start)
+    return moved
+
+
+def _module_context(code: str, lines: List[str]) -> str:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return "\n".join(line for line in lines if _IMPORT_RE.match(line) or _GLOBAL_RE.match(line))
+
+    parts = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.Assign, ast.AnnAssign)):
+            if node.end_lineno - node.lineno < 5:  # skip large literal tables
+                parts.append("\n".join(lines[node.lineno - 1:node.end_lineno]))
+    return "\n".join(parts)
+
+
+def split_source(code: str, max_lines: int = CHUNK_LINES) -> Optional[ChunkedSource]:
+    """
+    Splits a Python module at top-level statements into chunks of at most
+    `max_lines` lines (a single larger definition becomes its own chunk).
+
+    Returns None when the file is small enough to be handled whole or has no
+    usable boundaries. Falls back to a column-0 scan when the source does not
+    parse, which is the common case for Python 2 input.
+    """
+    lines = code.splitlines()
+    if len(lines) <= max_lines:
+        return None
+
+    starts = sorted(set(_attach_comments(_statement_starts(code, lines), lines)) | {0})
+    starts.append(len(lines))
+
+    chunks: List[Chunk] = []
+    begin = 0
+    for prev, nxt in zip(starts, starts[1:]):
+        if nxt - begin > max_lines and prev > begin:
+            chunks.append(Chunk(len(chunks), begin + 1, "\n".join(lines[begin:prev])))
+            begin = prev
+    chunks.append(Chunk(len(chunks), begin + 1, "\n".join(lines[begin:])))
+
+    if len(chunks) < 2:
+        return None
+    return ChunkedSource(_module_context(code, lines), chunks)
+
+
+def reassemble(parts: List[str]) -> str:
+    """
+    Joins modernized chunks in order. Imports a later chunk introduced at its
+    top are hoisted into the first chunk's import block (minus duplicates).
+    """
+    head = parts[0].strip("\n").splitlines()
+    known = {line.strip() for line in head}
+    hoisted: List[str] = []
+    bodies = []
+
+    for part in parts[1:]:
+        lines = part.strip("\n").splitlines()
+        i = 0
+        while i < len(lines) and (_IMPORT_RE.match(lines[i]) or not lines[i].strip()):
+            line = lines[i].strip()
+            if line and line not in known:
+                known.add(line)
+                hoisted.append(line)
+            i += 1
+        bodies.append("\n".join(lines[i:]))
+
+    if hoisted:
+        last_import = max((i for i, line in enumerate(head) if _IMPORT_RE.match(line)), default=-1)
+        head[last_import + 1:last_import + 1] = hoisted
+
+    return "\n\n\n".join(["\n".join(head)] + [b for b in bodies if b]) + "\n"
+
+
+def split_state(state: Dict[str, Any]) -> Optional[ChunkedSource]:
+    """split_source() for the file in a graph state, if it is a Python file."""
+    if not is_python_file(state):
+        return None
+    return split_source(state.get("preprocessed_code") or state["original_code"])
+
+
+def map_parallel(func: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+    """
+    Calls `func` on every item from a thread pool, keeping input order. Each
+    call runs in a copy of the caller's context so node metrics still apply.
+    """
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(len(items), CHUNK_WORKERS)) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, func, item) for item in items]
+        return [f.result() for f in futures]
@@ -0,0 +1,117 @@
+# acmp/utils/dedup.py
+
+import hashlib
+import io
+import os
+import re
+import tokenize
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from .manifest import hash_source
+
+
+# Jaccard similarity (estimated from MinHash signatures) above which two
+# files count as near-duplicates.
+NEAR_DUP_THRESHOLD = float(os.getenv("ACMP_NEAR_DUP_THRESHOLD", "0.85"))
+
+SHINGLE_SIZE = 5      # tokens per shingle
+NUM_PERM = 64         # MinHash signature length
+BANDS = 16            # LSH bands of NUM_PERM // BANDS rows: candidates from ~0.5 similarity up
+
+_MERSENNE = (1 << 61) - 1
+_SEEDS = [
+    (int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE | 1,
+     int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE)
+    for i in range(NUM_PERM)
+]
+
+_SKIP_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING}
+_FALLBACK_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def normalized_tokens(code: str) -> List[str]:
+    """Source tokens without comments and layout (regex split when it does not tokenize)."""
+    try:
+        return [
+            tok.string for tok in tokenize.generate_tokens(io.StringIO(code).readline)
+            if tok.type not in _SKIP_TOKENS and tok.string
+        ]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        code = re.sub(r"#[^\n]*", "", code)
+        return _FALLBACK_TOKEN_RE.findall(code)
+
+
+def minhash(tokens: List[str]) -> List[int]:
+    """MinHash signature of the token shingles (a * x + b mod 2^61-1 permutations)."""
+    if len(tokens) < SHINGLE_SIZE:
+        tokens = tokens + [""] * (SHINGLE_SIZE - len(tokens))
+    shingles = {
+        int.from_bytes(hashlib.blake2b("\x00".join(tokens[i:i + SHINGLE_SIZE]).encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+    return [min((a * x + b) % _MERSENNE for x in shingles) for a, b in _SEEDS]
+
+
+def similarity(left: List[int], right: List[int]) -> float:
+    return sum(1 for x, y in zip(left, right) if x == y) / NUM_PERM
+
+
+class DedupPlan(NamedTuple):
+    exact: Dict[str, List[str]]  # representative -> byte-identical copies (not processed themselves)
+    near: Dict[str, str]         # near-duplicate -> representative whose plan it reuses
+
+    @property
+    def skipped(self) -> int:
+        return sum(len(copies) for copies in self.exact.values())
+
+
+def find_duplicates(file_paths: Iterable[str], read: Callable[[str], str],
+                    threshold: float = NEAR_DUP_THRESHOLD) -> DedupPlan:
+    """
+    Groups files by content hash, then clusters the distinct contents with
+    MinHash + LSH banding. The first file of a group (in input order) is
+    its representative; every other file points at it.
+    """
+    by_hash: Dict[str, str] = {}
+    exact: Dict[str, List[str]] = {}
+    unique: List[str] = []
+    sources: Dict[str, str] = {}
+
+    for path in file_paths:
+        code = read(path)
+        digest = hash_source(code)
+        representative = by_hash.setdefault(digest, path)
+        if representative != path:
+            exact.setdefault(representative, []).append(path)
+            continue
+        unique.append(path)
+        sources[path] = code
+
+    near: Dict[str, str] = {}
+    if threshold > 1:
+        return DedupPlan(exact, near)
+
+    rows = NUM_PERM // BANDS
+    buckets: Dict[tuple, List[str]] = {}
+    signatures: Dict[str, List[int]] = {}
+
+    for path in unique:
+        signature = signatures[path] = minhash(normalized_tokens(sources.pop(path)))
+        keys = [(band, tuple(signature[band * rows:(band + 1) * rows])) for band in range(BANDS)]
+
+        best: Optional[str] = None
+        best_score = threshold
+        for key in keys:
+            for candidate in buckets.get(key, ()):
+                score = similarity(signature, signatures[candidate])
+                if score >= best_score:
+                    best, best_score = candidate, score
+
+        if best is not None:
+            near[path] = best
+            continue
+        # only representatives are indexed, so clusters do not chain
+        for key in keys:
+            buckets.setdefault(key, []).append(path)
+
+    return DedupPlan(exact, near)
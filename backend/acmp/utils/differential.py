@@ -0,0 +1,138 @@
+# acmp/utils/differential.py
+
+import difflib
+import hashlib
+import os
+import re
+import tempfile
+from typing import Any, Dict, NamedTuple, Optional
+
+from .sandbox import ExecutionResult, aexecute, execute
+from .test_memo import TestMemo
+
+
+# Compare the modernized program's behaviour with the original's ("on"/"off").
+DIFFERENTIAL = os.getenv("ACMP_DIFFERENTIAL", "on").lower() != "off"
+
+# Runtime for the original Python sources, e.g. a python2 binary; the
+# default interpreter is used when unset (Python 2-only sources then fail
+# to run and the comparison is skipped).
+BASELINE_PYTHON = os.getenv("ACMP_BASELINE_PYTHON") or None
+
+_TEMP_PATH_RE = re.compile(re.escape(tempfile.gettempdir()) + r"/[^\s\"',:]+")
+_ERROR_CLASS_RE = re.compile(r"^\s*([A-Za-z_][\w.]*(?:Error|Exception))\b", re.M)
+
+
+class Fingerprint(NamedTuple):
+    """What a program run looks like from the outside."""
+    usable: bool            # whether the run can serve as the reference
+    reason: Optional[str]   # why not, when it cannot
+    exit_code: Optional[int]
+    stdout: str
+    stderr_class: str       # error class names reported on stderr, e.g. "KeyError"
+
+
+def normalize_output(text: str) -> str:
+    text = _TEMP_PATH_RE.sub("<tmp>", text)
+    return "\n".join(line.rstrip() for line in text.splitlines()).rstrip("\n")
+
+
+def stderr_class(stderr: str) -> str:
+    return ",".join(sorted(set(name.rsplit(".", 1)[-1] for name in _ERROR_CLASS_RE.findall(stderr))))
+
+
+def fingerprint(result: ExecutionResult) -> Fingerprint:
+    """
+    Fingerprint of a run. Only programs that ran to completion and exited 0
+    are usable as a baseline: a crash of the legacy code under today's
+    runtime says nothing about the intended behaviour.
+    """
+    reason = None
+    if not result.supported:
+        reason = "the language cannot be executed here"
+    elif result.timed_out:
+        reason = "the original program timed out"
+    elif result.error is not None:
+        reason = "the original program did not run: " + (result.error.strip().splitlines() or [""])[0]
+    elif result.returncode != 0:
+        reason = f"the original program exited with code {result.returncode}"
+    return Fingerprint(
+        usable=reason is None,
+        reason=reason,
+        exit_code=result.returncode,
+        stdout=normalize_output(result.stdout),
+        stderr_class=stderr_class(result.stderr),
+    )
+
+
+# content hash of (original code, language, framework, runtime) -> Fingerprint
+baseline_cache = TestMemo()
+
+
+def _baseline_key(code: str, language: str, framework: Optional[str], interpreter: Optional[str]) -> str:
+    h = hashlib.sha256()
+    for part in (language, framework or "", interpreter or "", code):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _interpreter(language: str) -> Optional[str]:
+    return BASELINE_PYTHON if language.lower() == "python" else None
+
+
+def needs_baseline(state: Dict[str, Any]) -> bool:
+    """Whether the tester still has to fingerprint the original for this run."""
+    return DIFFERENTIAL and state.get("baseline") is None and bool(state.get("original_code"))
+
+
+def run_baseline(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Fingerprint of the original code, from the cache or a sandbox run."""
+    language = state.get("language") or "python"
+    interpreter = _interpreter(language)
+    key = _baseline_key(state["original_code"], language, state.get("framework"), interpreter)
+    cached = baseline_cache.get(key)
+    if cached is None:
+        cached = fingerprint(execute(state["original_code"], language, state.get("framework"), interpreter=interpreter))
+        baseline_cache.put(key, cached)
+    return cached._asdict()
+
+
+async def arun_baseline(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Non-blocking variant of run_baseline."""
+    language = state.get("language") or "python"
+    interpreter = _interpreter(language)
+    key = _baseline_key(state["original_code"], language, state.get("framework"), interpreter)
+    cached = baseline_cache.get(key)
+    if cached is None:
+        cached = fingerprint(await aexecute(state["original_code"], language, state.get("framework"), interpreter=interpreter))
+        baseline_cache.put(key, cached)
+    return cached._asdict()
+
+
+def compare(baseline: Optional[Dict[str, Any]], result: ExecutionResult) -> Optional[str]:
+    """
+    None when the modernized run matches the baseline (or there is no usable
+    baseline), otherwise an error report the optimizer can act on.
+    """
+    if not baseline or not baseline["usable"] or result.timed_out or not result.supported:
+        return None
+
+    new = fingerprint(result)
+    differences = []
+    if new.exit_code != baseline["exit_code"]:
+        differences.append(f"Exit code: original {baseline['exit_code']}, modernized {new.exit_code}.")
+    if new.stderr_class != baseline["stderr_class"]:
+        differences.append(
+            f"Errors reported on stderr: original {baseline['stderr_class'] or 'none'}, "
+            f"modernized {new.stderr_class or 'none'}."
+        )
+    if new.stdout != baseline["stdout"]:
+        expected = baseline["stdout"].splitlines()
+        actual = new.stdout.splitlines()
+        diff = list(difflib.unified_diff(expected, actual, "original stdout", "modernized stdout", n=1, lineterm=""))
+        differences.append("Standard output differs:\n" + "\n".join(diff[:40]))
+
+    if not differences:
+        return None
+    return "Behavior changed: the modernized program does not match the original.\n" + "\n".join(differences)
@@ -4,6 +4,11 @@ from typing import Generator
 
 
 SUPPORTED_EXTENSIONS = [".py"]
+LANGUAGE_BY_EXTENSION = {".py": "python"}
+
+
+def is_supported_file(file_path: str) -> bool:
+    return Path(file_path).suffix in SUPPORTED_EXTENSIONS
 
 
 def scan_directory(root_path: str) -> Generator[str, None, None]:
@@ -18,7 +23,7 @@ def scan_directory(root_path: str) -> Generator[str, None, None]:
         raise FileNotFoundError(f"Directory not found: {root_path}")
 
     for file_path in root.rglob("*"):
-        if file_path.is_file() and file_path.suffix in SUPPORTED_EXTENSIONS:
+        if file_path.is_file() and is_supported_file(file_path):
             yield str(file_path)
 
 
@@ -1,4 +1,5 @@
 import re
+from typing import Any, Dict
 
 def extract_code_block(text: str) -> str:
     """
@@ -55,3 +56,9 @@ def extract_code_block(text: str) -> str:
             s = rest.lstrip()
 
     return s.strip()
+
+
+def is_python_file(state: Dict[str, Any]) -> bool:
+    """Whether the graph state holds Python source (by language, else by file name)."""
+    language = (state.get("language") or "").lower()
+    return language == "python" or (not language and str(state.get("file_path", "")).endswith(".py"))
@@ -0,0 +1,267 @@
+# acmp/utils/interpreter_pool.py
+
+import atexit
+import json
+import os
+import queue
+import select
+import subprocess
+import threading
+from typing import Any, Dict, List, Optional
+
+
+# Source of the long-lived worker process. It imports the common stdlib
+# modules once, then forks a fresh child for every request so the
+# submitted code never shares state with previous runs. Requests and
+# replies are single JSON lines on the worker's stdin/stdout.
+_WORKER_SOURCE = r'''
+import builtins, json, os, resource, select, signal, sys, tempfile, time, traceback, types
+import collections, datetime, functools, itertools, math, random, re, typing
+
+MAX_OUTPUT = 1024 * 1024
+
+
+def _execute(path, source):
+    try:
+        code_obj = compile(source, path, "exec")
+    except SyntaxError as e:
+        traceback.print_exception(type(e), e, None)
+        return 1
+
+    # A real __main__ module, so pickle, typing.get_type_hints and friends
+    # find the script's classes in sys.modules like under `python file.py`.
+    module = types.ModuleType("__main__")
+    module.__dict__.update(__file__=path, __builtins__=builtins, __package__=None, __spec__=None)
+    previous = sys.modules.get("__main__")
+    sys.modules["__main__"] = module
+    try:
+        exec(code_obj, module.__dict__)
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException as e:
+        # Drop this frame so the traceback matches `python file.py`.
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        return 1
+    finally:
+        sys.modules["__main__"] = previous
+    return 0
+
+
+def _wait(pid, timeout):
+    """Reaps the child (killing its session on timeout); returns (status, rusage, timed_out)."""
+    deadline = time.monotonic() + timeout
+    pidfd = os.pidfd_open(pid) if hasattr(os, "pidfd_open") else None
+    try:
+        while True:
+            wpid, status, rusage = os.wait4(pid, os.WNOHANG)
+            if wpid:
+                return status, rusage, False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                _, status, rusage = os.wait4(pid, 0)
+                return status, rusage, True
+            if pidfd is not None:
+                select.select([pidfd], [], [], remaining)
+            else:
+                time.sleep(min(remaining, 0.002))
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+
+def _read(f):
+    f.seek(0)
+    return f.read(MAX_OUTPUT).decode("utf-8", errors="replace")
+
+
+def _run(source, timeout, limits, cgroup):
+    fd, path = tempfile.mkstemp(suffix=".py")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(source)
+    out = tempfile.TemporaryFile()
+    err = tempfile.TemporaryFile()
+    started = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.setsid()
+        # stdin is a pipe nobody writes to (the write end stays open in this
+        # process): a program waiting for input blocks until the timeout,
+        # as under `python file.py`, instead of reading EOF at once.
+        stdin_read, stdin_write = os.pipe()
+        os.dup2(stdin_read, 0)
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", closefd=False)
+        sys.stderr = open(2, "w", closefd=False)
+        sys.argv = [path]
+        sys.path[0] = os.path.dirname(path)
+        random.seed()
+        if cgroup:
+            with open(os.path.join(cgroup, "cgroup.procs"), "w") as f:
+                f.write(str(os.getpid()))
+        for name, soft, hard in limits:
+            resource.setrlimit(getattr(resource, name), (soft, hard))
+        # Leaving through SystemExit (not os._exit) runs atexit hooks and
+        # joins non-daemon threads, like a normal interpreter exit. Nothing
+        # between here and the top level may catch it.
+        raise SystemExit(_execute(path, source))
+
+    try:
+        status, rusage, timed_out = _wait(pid, timeout)
+        return {
+            "returncode": None if timed_out else os.waitstatus_to_exitcode(status),
+            "stdout": _read(out),
+            "stderr": _read(err),
+            "timed_out": timed_out,
+            "wall_time": time.perf_counter() - started,
+            "cpu_time": rusage.ru_utime + rusage.ru_stime,
+            "user_time": rusage.ru_utime,
+            "sys_time": rusage.ru_stime,
+            "max_rss_kb": rusage.ru_maxrss,
+        }
+    finally:
+        out.close()
+        err.close()
+        os.remove(path)
+
+
+print("ready", flush=True)
+for line in sys.stdin:
+    request = json.loads(line)
+    reply = _run(request["code"], request["timeout"], request.get("limits") or [], request.get("cgroup"))
+    sys.stdout.write(json.dumps(reply) + "\n")
+    sys.stdout.flush()
+'''
+
+
+class PoolUnavailable(Exception):
+    """Raised when a request could not be served by a warm worker."""
+
+
+class _Worker:
+    def __init__(self, python: str):
+        self.proc = subprocess.Popen(
+            [python, "-c", _WORKER_SOURCE],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+        )
+        self.ready = False
+
+    def _readline(self, timeout: float) -> str:
+        ready, _, _ = select.select([self.proc.stdout], [], [], timeout)
+        if not ready:
+            raise PoolUnavailable("Interpreter worker did not answer in time.")
+        line = self.proc.stdout.readline()
+        if not line:
+            raise PoolUnavailable("Interpreter worker exited unexpectedly.")
+        return line
+
+    def request(self, code: str, timeout: float, limits: Optional[list] = None, cgroup: Optional[str] = None) -> Dict[str, Any]:
+        if not self.ready:
+            if self._readline(30).strip() != "ready":
+                raise PoolUnavailable("Interpreter worker failed to start.")
+            self.ready = True
+        self.proc.stdin.write(json.dumps({"code": code, "timeout": timeout, "limits": limits or [], "cgroup": cgroup}) + "\n")
+        self.proc.stdin.flush()
+        return json.loads(self._readline(timeout + 10))
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def kill(self) -> None:
+        if self.alive():
+            self.proc.kill()
+        self.proc.wait()
+
+
+class InterpreterPool:
+    """
+    Fork-server pool of pre-started Python interpreters.
+
+    Each worker pays interpreter startup once; every submitted program then
+    runs in a child forked from the warm worker, in its own session, with
+    stdin an open pipe that never delivers input (a program waiting for
+    it times out, as it did when it inherited stdin) and stdout/stderr
+    captured. Timed-out children are killed together with anything they
+    spawned.
+    """
+
+    def __init__(self, size: int = 2, python: str = "python"):
+        self.size = size
+        self.python = python
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._add_worker()
+            self._started = True
+
+    def _add_worker(self) -> None:
+        worker = _Worker(self.python)
+        self._workers.append(worker)
+        self._idle.put(worker)
+
+    def run(self, code: str, timeout: float, limits: Optional[list] = None, cgroup: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Executes `code` in a fresh child of an idle worker, under `limits`
+        ([[RLIMIT name, soft, hard], ...], see resource_limits.rlimits) and
+        inside `cgroup` when given.
+
+        Returns a dict with returncode, stdout, stderr, timed_out, wall_time,
+        cpu_time, user_time, sys_time and max_rss_kb.
+        Raises PoolUnavailable if the worker broke; it is replaced before returning.
+        """
+        self.start()
+        worker = self._idle.get()
+        try:
+            return worker.request(code, timeout, limits, cgroup)
+        except (PoolUnavailable, OSError, ValueError) as e:
+            worker.kill()
+            with self._lock:
+                self._workers.remove(worker)
+                worker = _Worker(self.python)
+                self._workers.append(worker)
+            raise PoolUnavailable(str(e)) from e
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for worker in self._workers:
+                worker.kill()
+            self._workers.clear()
+            self._started = False
+            self._idle = queue.Queue()
+
+
+_pool: Optional[InterpreterPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_python_pool(size: int) -> InterpreterPool:
+    """Returns the process-wide pool, starting its workers on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = InterpreterPool(size=size)
+                atexit.register(_pool.shutdown)
+    return _pool
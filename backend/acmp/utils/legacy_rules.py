@@ -0,0 +1,879 @@
+# acmp/utils/legacy_rules.py
+#
+# Token-level rules for legacy Python that can be fixed (or at least found)
+# without an LLM. Python 2 sources do not parse with `ast`, but Python 3's
+# tokenizer reads them fine, so every rule works on the token stream and
+# emits text edits against the original source.
+
+import io
+import keyword
+import re
+import tokenize
+from tokenize import COMMENT, DEDENT, ENDMARKER, ERRORTOKEN, INDENT, NAME, NEWLINE, NL, NUMBER, OP, STRING, TokenInfo
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+
+class Edit(NamedTuple):
+    start: Tuple[int, int]  # (row, col) as reported by tokenize
+    end: Tuple[int, int]
+    text: str
+
+
+class Rule(NamedTuple):
+    name: str
+    pattern: str            # LegacyPattern.pattern
+    recommended_fix: str    # LegacyPattern.recommended_fix
+    rewrite: bool           # False: detect only, an LLM has to fix it
+    check: Callable[[List[TokenInfo], int], Optional[List[Edit]]]
+    ambiguous: bool = False  # also matches valid Python 3: reported only next to other findings
+
+
+class Finding(NamedTuple):
+    rule: Rule
+    line: int
+
+
+class RuleResult(NamedTuple):
+    code: str                # source with every applied rewrite
+    applied: List[Finding]
+    remaining: List[Finding]  # detect-only matches
+    syntax_error: Optional[str]  # Python 3 compile error left after rewriting
+
+
+RULES: List[Rule] = []
+
+# Bump when a rule's output changes (it is part of the manifest's pipeline version).
+RULES_VERSION = "4"
+
+
+def rule(name: str, pattern: str, recommended_fix: str, rewrite: bool = True, ambiguous: bool = False):
+    """
+    Registers a rule. The decorated function gets the token list and an index
+    and returns None when the rule does not match there, otherwise the edits
+    to apply (an empty list for detect-only rules).
+    """
+    def register(check):
+        RULES.append(Rule(name, pattern, recommended_fix, rewrite, check, ambiguous))
+        return check
+    return register
+
+
+# --- token helpers -----------------------------------------------------------
+
+class _Names(NamedTuple):
+    imported: Set[str]  # modules imported under their own name (`import string`)
+    bound: Set[str]     # every other name the file binds: parameters, targets, defs, `as`, from-imports
+
+
+class _Tokens(list):
+    """Token list that also keeps the source lines, so rules can copy spans of code."""
+
+    def __init__(self, toks: List[TokenInfo], lines: List[str]):
+        super().__init__(toks)
+        self.lines = lines
+        self._names: Optional[_Names] = None
+
+    @property
+    def names(self) -> _Names:
+        if self._names is None:
+            self._names = _scan_names(self)
+        return self._names
+
+
+_CLOSE = {")": "(", "]": "[", "}": "{"}
+_OPEN = {v: k for k, v in _CLOSE.items()}
+_TRIVIA = (NL, COMMENT)
+
+
+def _is(tok: TokenInfo, string: str) -> bool:
+    return tok.type in (OP, NAME) and tok.string == string
+
+
+def _prev(toks: List[TokenInfo], i: int) -> Optional[TokenInfo]:
+    i -= 1
+    while i >= 0 and toks[i].type in _TRIVIA:
+        i -= 1
+    return toks[i] if i >= 0 else None
+
+
+_COMPOUND_KEYWORDS = {"if", "elif", "else", "for", "while", "try", "except", "finally", "with", "def", "class", "async"}
+
+
+def _header_colon(toks: List[TokenInfo], colon: int) -> bool:
+    """
+    Whether the ':' at `colon` ends a compound statement header (`if x:`,
+    `else:`, ...) rather than a lambda, slice, dict entry or annotation.
+    """
+    depth = 0
+    j = colon - 1
+    while j >= 0 and toks[j].type not in (NEWLINE, INDENT, DEDENT):
+        tok = toks[j]
+        if tok.type == OP and tok.string in _CLOSE:
+            depth += 1
+        elif tok.type == OP and tok.string in _OPEN:
+            depth -= 1
+            if depth < 0:
+                return False  # inside brackets
+        elif depth == 0 and (_is(tok, ":") or _is(tok, ";") or _is_name(tok, ("lambda",))):
+            return False  # not the first colon of the statement, or a lambda's
+        j -= 1
+    first = toks[j + 1]
+    while first.type in _TRIVIA:
+        j += 1
+        first = toks[j + 1]
+    return first.type == NAME and first.string in _COMPOUND_KEYWORDS
+
+
+def _statement_start(toks: List[TokenInfo], i: int) -> bool:
+    """Whether toks[i] is the first token of a statement (of a logical line, after ';' or a header colon)."""
+    j = i - 1
+    while j >= 0 and toks[j].type in _TRIVIA:
+        j -= 1
+    if j < 0 or toks[j].type in (NEWLINE, INDENT, DEDENT) or _is(toks[j], ";"):
+        return True
+    return _is(toks[j], ":") and _header_colon(toks, j)
+
+
+def _statement_start_index(toks: List[TokenInfo], i: int) -> int:
+    while i > 0 and not _statement_start(toks, i):
+        i -= 1
+    return i
+
+
+def _is_name(tok: TokenInfo, names) -> bool:
+    return tok.type == NAME and tok.string in names
+
+
+def _not_attribute(toks: List[TokenInfo], i: int) -> bool:
+    prev = _prev(toks, i)
+    return not (prev is not None and (_is(prev, ".") or _is_name(prev, ("def", "class"))))
+
+
+def _match_close(toks: List[TokenInfo], i: int) -> Optional[int]:
+    depth = 0
+    for j in range(i, len(toks)):
+        if toks[j].type == OP and toks[j].string in _OPEN:
+            depth += 1
+        elif toks[j].type == OP and toks[j].string in _CLOSE:
+            depth -= 1
+            if depth == 0:
+                return j
+    return None
+
+
+def _match_open(toks: List[TokenInfo], i: int) -> Optional[int]:
+    depth = 0
+    for j in range(i, -1, -1):
+        if toks[j].type == OP and toks[j].string in _CLOSE:
+            depth += 1
+        elif toks[j].type == OP and toks[j].string in _OPEN:
+            depth -= 1
+            if depth == 0:
+                return j
+    return None
+
+
+def _statement_end(toks: List[TokenInfo], i: int) -> int:
+    """Index of the NEWLINE / ';' / ENDMARKER that ends the statement containing i."""
+    depth = 0
+    for j in range(i, len(toks)):
+        tok = toks[j]
+        if tok.type == OP and tok.string in _OPEN:
+            depth += 1
+        elif tok.type == OP and tok.string in _CLOSE:
+            depth -= 1
+        elif depth <= 0 and (tok.type in (NEWLINE, ENDMARKER) or _is(tok, ";")):
+            return j
+    return len(toks) - 1
+
+
+def _last_significant(toks: List[TokenInfo], start: int, end: int) -> int:
+    j = end - 1
+    while j >= start and toks[j].type in _TRIVIA:
+        j -= 1
+    return j
+
+
+def _top_level_commas(toks: List[TokenInfo], start: int, end: int) -> List[int]:
+    commas, depth = [], 0
+    for j in range(start, end):
+        tok = toks[j]
+        if tok.type == OP and tok.string in _OPEN:
+            depth += 1
+        elif tok.type == OP and tok.string in _CLOSE:
+            depth -= 1
+        elif depth == 0 and _is(tok, ","):
+            commas.append(j)
+    return commas
+
+
+def _text(source_lines: List[str], start: Tuple[int, int], end: Tuple[int, int]) -> str:
+    (srow, scol), (erow, ecol) = start, end
+    if srow == erow:
+        return source_lines[srow - 1][scol:ecol]
+    parts = [source_lines[srow - 1][scol:]] + source_lines[srow:erow - 1] + [source_lines[erow - 1][:ecol]]
+    return "".join(parts)
+
+
+def _span(toks: "_Tokens", start: int, end: int) -> str:
+    """Source text of toks[start:end] (end exclusive)."""
+    if start >= end:
+        return ""
+    return _text(toks.lines, toks[start].start, toks[end - 1].end)
+
+
+def _is_atom(toks: List[TokenInfo], start: int, end: int) -> bool:
+    """Whether toks[start:end] is a primary (name, literal, attribute, call, subscript)."""
+    depth = 0
+    for tok in toks[start:end]:
+        if tok.type == OP and tok.string in _OPEN:
+            depth += 1
+        elif tok.type == OP and tok.string in _CLOSE:
+            depth -= 1
+        elif depth == 0 and not (tok.type in (NAME, NUMBER, STRING) or _is(tok, ".")):
+            return False
+        elif depth == 0 and tok.type == NAME and keyword.iskeyword(tok.string):
+            return False
+    return True
+
+
+def _atom(toks: List[TokenInfo], start: int, end: int) -> str:
+    text = _span(toks, start, end)
+    return text if _is_atom(toks, start, end) else f"({text})"
+
+
+def _call_args(toks: List[TokenInfo], open_paren: int) -> Optional[Tuple[int, List[Tuple[int, int]]]]:
+    """(index of ')', [(start, end) token ranges of each argument]) of the call at `open_paren`."""
+    close = _match_close(toks, open_paren)
+    if close is None:
+        return None
+    bounds = [open_paren] + _top_level_commas(toks, open_paren + 1, close) + [close]
+    args = [(a + 1, b) for a, b in zip(bounds, bounds[1:]) if b > a + 1]
+    return close, args
+
+
+# --- name bindings -----------------------------------------------------------
+
+_AUGMENTED = {"+=", "-=", "*=", "/=", "//=", "%=", "**=", ">>=", "<<=", "&=", "^=", "|=", "@="}
+_TARGET_PREFIX = ("(", "[", ",", "*", "**")
+
+
+def _add_targets(toks: List[TokenInfo], start: int, end: int, bound: Set[str]) -> None:
+    """
+    Adds the names bound by the target list toks[start:end] (assignment
+    targets, for targets, parameters); attributes, subscripts and the
+    names inside default values, annotations or calls are not targets.
+    """
+    grouping: List[bool] = []  # per open bracket: a tuple/list of targets (not a call or subscript)
+    prev: Optional[TokenInfo] = None
+    for j in range(start, end):
+        tok = toks[j]
+        if tok.type in _TRIVIA:
+            continue
+        follows_target = prev is None or (prev.type == OP and prev.string in _TARGET_PREFIX)
+        if tok.type == OP and tok.string in _OPEN:
+            grouping.append(follows_target)
+        elif tok.type == OP and tok.string in _CLOSE:
+            if grouping:
+                grouping.pop()
+        elif tok.type == NAME and not keyword.iskeyword(tok.string) and follows_target and all(grouping):
+            nxt = toks[j + 1]
+            if not (nxt.type == OP and nxt.string in (".", "(", "[")):
+                bound.add(tok.string)
+        prev = tok
+
+
+def _until(toks: List[TokenInfo], start: int, stop: str) -> int:
+    """Index of the first `stop` token at the bracket depth of toks[start] (len(toks) if none)."""
+    depth = 0
+    for j in range(start, len(toks)):
+        tok = toks[j]
+        if tok.type == OP and tok.string in _OPEN:
+            depth += 1
+        elif tok.type == OP and tok.string in _CLOSE:
+            depth -= 1
+            if depth < 0:
+                break
+        elif depth == 0 and _is(tok, stop):
+            return j
+    return len(toks)
+
+
+def _import_names(toks: List[TokenInfo], start: int, end: int, imported: Set[str], bound: Set[str], plain: bool) -> None:
+    """Names bound by the `import` clause toks[start:end]; plain imports record the module itself."""
+    for item_start, item_end in zip([start] + [c + 1 for c in _top_level_commas(toks, start, end)],
+                                    _top_level_commas(toks, start, end) + [end]):
+        item = [t for t in toks[item_start:item_end] if t.type == NAME or _is(t, "*")]
+        if not item or _is(item[0], "*") or any(_is_name(t, ("as",)) for t in item):
+            continue  # aliases are bound through `as`
+        if plain:
+            imported.add(item[0].string)
+        else:
+            bound.add(item[0].string)
+
+
+def _scan_names(toks: List[TokenInfo]) -> _Names:
+    imported: Set[str] = set()
+    bound: Set[str] = set()
+    depth = 0
+    target_start = 0  # first token of the statement, or just after its last '='
+    for j, tok in enumerate(toks):
+        if tok.type == OP and tok.string in _OPEN:
+            depth += 1
+        elif tok.type == OP and tok.string in _CLOSE:
+            depth = max(0, depth - 1)
+        elif tok.type in (NEWLINE, INDENT, DEDENT) or (depth == 0 and _is(tok, ";")):
+            target_start = j + 1
+        elif depth == 0 and _is(tok, ":") and _header_colon(toks, j):
+            target_start = j + 1
+        elif depth == 0 and tok.type == OP and (tok.string == "=" or tok.string in _AUGMENTED):
+            _add_targets(toks, target_start, j, bound)
+            target_start = j + 1
+        elif tok.type == OP and tok.string == ":=":
+            _add_targets(toks, j - 1, j, bound)
+        elif _is_name(tok, ("def", "class")) and toks[j + 1].type == NAME:
+            bound.add(toks[j + 1].string)
+            if tok.string == "def" and _is(toks[j + 2], "("):
+                close = _match_close(toks, j + 2)
+                _add_targets(toks, j + 3, close if close is not None else j + 3, bound)
+        elif _is_name(tok, ("lambda",)):
+            _add_targets(toks, j + 1, _until(toks, j + 1, ":"), bound)
+        elif _is_name(tok, ("for",)):
+            _add_targets(toks, j + 1, _until(toks, j + 1, "in"), bound)
+        elif _is_name(tok, ("as",)) and toks[j + 1].type == NAME:
+            bound.add(toks[j + 1].string)
+        elif _is_name(tok, ("import",)):
+            first = toks[_statement_start_index(toks, j)]
+            _import_names(toks, j + 1, _statement_end(toks, j), imported, bound, plain=not _is_name(first, ("from",)))
+    return _Names(imported, bound)
+
+
+def _module_ref(toks: "_Tokens", i: int, module: str) -> bool:
+    """Whether toks[i] refers to the module `module`: imported by the file and not rebound by it."""
+    names = toks.names
+    return (
+        _is_name(toks[i], (module,)) and _not_attribute(toks, i)
+        and module in names.imported and module not in names.bound
+    )
+
+
+# --- rewrites ----------------------------------------------------------------
+
+@rule("print_statement", "print statement", "Call the print() function; `print x,` becomes print(x, end=\" \") and `print >>f, x` becomes print(x, file=f).")
+def _print_statement(toks, i):
+    tok = toks[i]
+    if not _is_name(tok, ("print",)) or not _statement_start(toks, i):
+        return None
+    end = _statement_end(toks, i + 1)
+    first = i + 1
+    if first < len(toks) and toks[first].type == OP and toks[first].string in ("(", "=", "."):
+        return None  # already a call (or not the statement)
+
+    last = _last_significant(toks, first, end)
+    if last < first:
+        return [Edit(tok.end, tok.end, "()")]
+
+    file_expr = None
+    if _is(toks[first], ">>"):
+        commas = _top_level_commas(toks, first + 1, last + 1)
+        if not commas:
+            return [Edit(tok.end, toks[last].end, f"(file={_span(toks, first + 1, last + 1)})")]
+        file_expr = _span(toks, first + 1, commas[0])
+        first = commas[0] + 1
+
+    trailing = _is(toks[last], ",")
+    closing = (f", file={file_expr}" if file_expr else "") + (', end=" "' if trailing else "") + ")"
+    edits = [Edit(tok.end, toks[first].start, "(")]
+    if trailing:
+        edits.append(Edit(toks[last].start, toks[last].end, closing))
+    else:
+        edits.append(Edit(toks[last].end, toks[last].end, closing))
+    return edits
+
+
+@rule("has_key", "dict.has_key()", "Use the `in` operator: `key in mapping`.")
+def _has_key(toks, i):
+    if not _is_name(toks[i], ("has_key",)) or i < 2 or not _is(toks[i - 1], ".") or not _is(toks[i + 1], "("):
+        return None
+    call = _call_args(toks, i + 1)
+    if call is None or len(call[1]) != 1:
+        return None
+    close, [(astart, aend)] = call
+
+    # walk back over the receiver: names, attribute dots, calls and subscripts
+    j, start = i - 2, None
+    while j >= 0:
+        tok = toks[j]
+        if tok.type == OP and tok.string in ")]":
+            j = _match_open(toks, j)
+            if j is None:
+                return None
+            start, j = j, j - 1
+            if j >= 0 and ((toks[j].type == NAME and not keyword.iskeyword(toks[j].string)) or (toks[j].type == OP and toks[j].string in ")]")):
+                continue
+            break
+        if tok.type == NAME and not keyword.iskeyword(tok.string) and tok.string not in ("print", "exec"):
+            start, j = j, j - 1
+            if j >= 0 and _is(toks[j], "."):
+                j -= 1
+                continue
+            break
+        return None
+    if start is None:
+        return None
+
+    text = f"{_atom(toks, astart, aend)} in {_span(toks, start, i - 1)}"
+    # `in` is a comparison: parenthesize unless both neighbours bind looser
+    before, after = _prev(toks, start), toks[close + 1]
+    bare = (before is None or before.type in (NEWLINE, INDENT, DEDENT) or (
+        before.string in ("if", "elif", "while", "not", "and", "or", "return", "assert", "=", "(", "[", ",", ":", "{")
+    )) and (after.type in (NEWLINE, NL, COMMENT, ENDMARKER) or (
+        after.string in ("and", "or", "if", "else", ")", "]", "}", ",", ":", ";")
+    ))
+    return [Edit(toks[start].start, toks[close].end, text if bare else f"({text})")]
+
+
+@rule("except_comma", "except X, e", "Use `except X as e`.")
+def _except_comma(toks, i):
+    if not _is_name(toks[i], ("except",)):
+        return None
+    end = _statement_end(toks, i)
+    colon = next((j for j in range(i + 1, end) if _is(toks[j], ":")), None)
+    if colon is None:
+        return None
+    commas = _top_level_commas(toks, i + 1, colon)
+    if len(commas) != 1 or toks[commas[0] + 1].type != NAME or commas[0] + 2 != colon:
+        return None
+    return [Edit(toks[commas[0]].start, toks[commas[0]].end, " as")]
+
+
+@rule("raise_comma", "raise E, message", "Raise an instance: `raise E(message)`.")
+def _raise_comma(toks, i):
+    if not _is_name(toks[i], ("raise",)):
+        return None
+    end = _statement_end(toks, i)
+    last = _last_significant(toks, i + 1, end)
+    commas = _top_level_commas(toks, i + 1, last + 1)
+    if len(commas) != 1:
+        return None  # three-argument form is handled by raise_traceback
+    c = commas[0]
+    return [Edit(toks[c].start, toks[c + 1].start, "("), Edit(toks[last].end, toks[last].end, ")")]
+
+
+_RENAMED_BUILTINS = {
+    "raw_input": "input",
+    "xrange": "range",
+    "unichr": "chr",
+    "basestring": "str",
+}
+_RENAMED_CALLS = {  # only renamed when called, the names are common variables too
+    "unicode": "str",
+    "long": "int",
+    "file": "open",
+}
+
+
+@rule("renamed_builtin", "Python 2 builtin (raw_input, xrange, unicode, long, unichr, basestring, file)", "Use the Python 3 builtin: input, range, str, int, chr, str, open.")
+def _renamed_builtin(toks, i):
+    tok = toks[i]
+    if tok.type != NAME or not _not_attribute(toks, i) or i + 1 >= len(toks) or _is(toks[i + 1], "="):
+        return None
+    if tok.string in toks.names.bound:
+        return None  # the file's own variable, parameter or function of that name
+    new = _RENAMED_BUILTINS.get(tok.string)
+    if new is None and tok.string in _RENAMED_CALLS and _is(toks[i + 1], "("):
+        new = _RENAMED_CALLS[tok.string]
+    return [Edit(tok.start, tok.end, new)] if new else None
+
+
+_RENAMED_METHODS = {"iteritems": "items", "iterkeys": "keys", "itervalues": "values"}
+
+
+@rule("dict_iter_methods", "dict.iteritems() / iterkeys() / itervalues()", "Use items() / keys() / values(), which return views in Python 3.")
+def _dict_iter_methods(toks, i):
+    tok = toks[i]
+    if tok.type != NAME or tok.string not in _RENAMED_METHODS or i == 0 or not _is(toks[i - 1], ".") or not _is(toks[i + 1], "("):
+        return None
+    return [Edit(tok.start, tok.end, _RENAMED_METHODS[tok.string])]
+
+
+_RENAMED_ATTRIBUTES = {
+    ("sys", "maxint"): "maxsize",
+    ("os", "getcwdu"): "getcwd",
+    ("string", "letters"): "ascii_letters",
+    ("string", "lowercase"): "ascii_lowercase",
+    ("string", "uppercase"): "ascii_uppercase",
+}
+
+
+@rule("renamed_module_attribute", "removed module attribute (sys.maxint, os.getcwdu, string.letters, ...)", "Use sys.maxsize, os.getcwd, string.ascii_letters / ascii_lowercase / ascii_uppercase.")
+def _renamed_module_attribute(toks, i):
+    if i < 2 or toks[i].type != NAME or not _is(toks[i - 1], "."):
+        return None
+    new = _RENAMED_ATTRIBUTES.get((toks[i - 2].string, toks[i].string))
+    if new is None or not _module_ref(toks, i - 2, toks[i - 2].string):
+        return None
+    return [Edit(toks[i].start, toks[i].end, new)]
+
+
+_STRING_METHODS = {
+    "upper", "lower", "strip", "lstrip", "rstrip", "split", "rsplit", "replace", "find", "rfind",
+    "index", "rindex", "count", "capitalize", "swapcase", "zfill", "center", "ljust", "rjust",
+    "expandtabs", "splitlines", "translate",
+}
+_STRING_CONVERSIONS = {"atoi": "int", "atol": "int", "atof": "float"}
+_STRING_MODULE_KEEP = {
+    "ascii_letters", "ascii_lowercase", "ascii_uppercase", "digits", "hexdigits", "octdigits",
+    "punctuation", "printable", "whitespace", "capwords", "Template", "Formatter",
+}
+
+
+def _string_call(toks, i):
+    """(method name, index of '(') for `string.<name>(` on the string module, else None."""
+    if not _module_ref(toks, i, "string") or i + 3 >= len(toks):
+        return None
+    if not _is(toks[i + 1], ".") or toks[i + 2].type != NAME or not _is(toks[i + 3], "("):
+        return None
+    return toks[i + 2].string, i + 3
+
+
+@rule("string_module_function", "string module function (string.upper(s), string.join(l, sep), string.atoi(s), ...)", "Call the str method instead: s.upper(), sep.join(l), int(s).")
+def _string_module_function(toks, i):
+    found = _string_call(toks, i)
+    if found is None:
+        return None
+    name, paren = found
+    call = _call_args(toks, paren)
+    if call is None or not call[1]:
+        return None
+    close, args = call
+    (rstart, rend), rest = args[0], args[1:]
+
+    if name in _STRING_CONVERSIONS:
+        text = f"{_STRING_CONVERSIONS[name]}({_span(toks, paren + 1, close)})"
+    elif name in ("join", "joinfields"):
+        if len(rest) > 1:
+            return None
+        sep = _atom(toks, *rest[0]) if rest else '" "'
+        text = f"{sep}.join({_span(toks, rstart, rend)})"
+    elif name in _STRING_METHODS:
+        text = f"{_atom(toks, rstart, rend)}.{name}({', '.join(_span(toks, a, b) for a, b in rest)})"
+    else:
+        return None
+    return [Edit(toks[i].start, toks[close].end, text)]
+
+
+@rule("long_literal", "long integer literal (10L)", "Drop the L suffix; int is unbounded.")
+def _long_literal(toks, i):
+    tok = toks[i]
+    if tok.type != NUMBER or i + 1 >= len(toks):
+        return None
+    nxt = toks[i + 1]
+    if nxt.type == NAME and nxt.string in ("L", "l") and nxt.start == tok.end:
+        return [Edit(nxt.start, nxt.end, "")]
+    return None
+
+
+@rule("octal_literal", "old octal literal (0777)", "Use the 0o prefix: 0o777.")
+def _octal_literal(toks, i):
+    tok = toks[i]
+    if tok.type != NUMBER or tok.string != "0" or i + 1 >= len(toks):
+        return None
+    nxt = toks[i + 1]
+    if nxt.type == NUMBER and nxt.start == tok.end and re.fullmatch(r"[0-7]+", nxt.string):
+        return [Edit(tok.end, tok.end, "o")]
+    return None
+
+
+@rule("not_equal_operator", "<> operator", "Use !=.")
+def _not_equal_operator(toks, i):
+    if _is(toks[i], "<") and i + 1 < len(toks) and _is(toks[i + 1], ">") and toks[i + 1].start == toks[i].end:
+        return [Edit(toks[i].start, toks[i + 1].end, "!=")]
+    return None
+
+
+_RENAMED_MODULES = {
+    "cPickle": "pickle",
+    "Queue": "queue",
+    "ConfigParser": "configparser",
+    "SocketServer": "socketserver",
+    "Tkinter": "tkinter",
+    "httplib": "http.client",
+    "urlparse": "urllib.parse",
+    "cStringIO": "io",
+    "StringIO": "io",
+    "__builtin__": "builtins",
+}
+
+
+@rule("renamed_module", "renamed standard library module (cPickle, Queue, ConfigParser, StringIO, ...)", "Import the Python 3 module (pickle, queue, configparser, io, ...); plain imports keep the old name as an alias.")
+def _renamed_module(toks, i):
+    tok = toks[i]
+    if tok.type != NAME or tok.string not in _RENAMED_MODULES or i == 0:
+        return None
+    new = _RENAMED_MODULES[tok.string]
+    prev = toks[i - 1]
+    nxt = toks[i + 1]
+    if _is(nxt, "."):
+        return None
+    if _is_name(prev, ("from",)) and _statement_start(toks, i - 1):
+        return [Edit(tok.start, tok.end, new)]
+    # `import a, Queue` / `import Queue as q`
+    j = i - 1
+    while j > 0 and (toks[j].type == NAME or _is(toks[j], ",") or _is(toks[j], ".")) and not _is_name(toks[j], ("import",)):
+        j -= 1
+    if _is_name(toks[j], ("import",)) and _statement_start(toks, j) and (prev is toks[j] or _is(prev, ",")):
+        return [Edit(tok.start, tok.end, new if _is_name(nxt, ("as",)) else f"{new} as {tok.string}")]
+    return None
+
+
+_FORMAT_SPEC = re.compile(r"%(.)")
+
+
+def _simple_dotted(toks, start, end) -> bool:
+    names = toks[start:end]
+    return bool(names) and all(
+        (t.type == NAME and not keyword.iskeyword(t.string)) if n % 2 == 0 else _is(t, ".")
+        for n, t in enumerate(names)
+    ) and len(names) % 2 == 1
+
+
+@rule("percent_format", "%-formatting with a tuple of names", "Use an f-string.")
+def _percent_format(toks, i):
+    tok = toks[i]
+    if tok.type != STRING or i + 2 >= len(toks) or not _is(toks[i + 1], "%") or not _is(toks[i + 2], "("):
+        return None
+    match = re.match(r"([A-Za-z]*)('''|\"\"\"|'|\")", tok.string)
+    prefix, quote = match.group(1), match.group(2)
+    if prefix.lower() not in ("", "u"):
+        return None
+    prev, nxt_i = _prev(toks, i), _match_close(toks, i + 2)
+    if nxt_i is None or (prev is not None and (prev.type == STRING or (prev.type == OP and prev.string in ("*", "/", "//", "%", "@", "**")))):
+        return None
+    after = toks[nxt_i + 1]
+    if after.type == STRING or (after.type == OP and after.string in ("*", "/", "//", "%", "@", "**", ".", "(", "[")):
+        return None
+
+    bounds = [i + 2] + _top_level_commas(toks, i + 3, nxt_i) + [nxt_i]
+    args = [(a + 1, b) for a, b in zip(bounds, bounds[1:]) if b > a + 1]
+    if not args or not all(_simple_dotted(toks, a, b) for a, b in args):
+        return None
+
+    body = tok.string[len(prefix) + len(quote):-len(quote)]
+    specs = _FORMAT_SPEC.findall(body)
+    if any(s not in "sr%" for s in specs) or sum(1 for s in specs if s != "%") != len(args):
+        return None
+
+    names = iter(_span(toks, a, b) for a, b in args)
+
+    def convert(m):
+        spec = m.group(1)
+        if spec == "%":
+            return "%"
+        name = next(names)
+        return "{" + name + ("!r}" if spec == "r" else "}")
+
+    escaped = body.replace("{", "{{").replace("}", "}}")
+    text = "f" + quote + _FORMAT_SPEC.sub(convert, escaped) + quote
+    return [Edit(tok.start, toks[nxt_i].end, text)]
+
+
+# --- detect only -------------------------------------------------------------
+
+@rule("backticks", "backtick repr (`x`)", "Use repr(x).", rewrite=False)
+def _backticks(toks, i):
+    return [] if toks[i].type == ERRORTOKEN and toks[i].string == "`" else None
+
+
+@rule("exec_statement", "exec statement", "Call exec() with explicit globals/locals.", rewrite=False)
+def _exec_statement(toks, i):
+    if _is_name(toks[i], ("exec",)) and _statement_start(toks, i) and not _is(toks[i + 1], "("):
+        return []
+    return None
+
+
+@rule("raise_traceback", "raise E, V, traceback", "Use raise E(V).with_traceback(tb).", rewrite=False)
+def _raise_traceback(toks, i):
+    if not _is_name(toks[i], ("raise",)):
+        return None
+    end = _statement_end(toks, i)
+    return [] if len(_top_level_commas(toks, i + 1, end)) == 2 else None
+
+
+_REMOVED_BUILTINS = {"reduce", "apply", "execfile", "cmp", "coerce", "intern", "buffer", "reload"}
+
+
+@rule("removed_builtin", "removed builtin (reduce, apply, execfile, cmp, ...)", "Use functools.reduce, f(*args), exec(open(f).read()), explicit comparisons, importlib.reload.", rewrite=False)
+def _removed_builtin(toks, i):
+    tok = toks[i]
+    if tok.type == NAME and tok.string in _REMOVED_BUILTINS and _not_attribute(toks, i) and _is(toks[i + 1], "("):
+        return []
+    return None
+
+
+@rule("input_eval", "Python 2 input() evaluates what the user types", "Use input() and convert explicitly (int(input()), ast.literal_eval, ...).", rewrite=False, ambiguous=True)
+def _input_eval(toks, i):
+    if _is_name(toks[i], ("input",)) and _not_attribute(toks, i) and _is(toks[i + 1], "("):
+        return []
+    return None
+
+
+@rule("cmp_argument", "sort / sorted with cmp=", "Use key= (functools.cmp_to_key for comparison functions).", rewrite=False)
+def _cmp_argument(toks, i):
+    if _is_name(toks[i], ("cmp",)) and i + 1 < len(toks) and _is(toks[i + 1], "=") and i > 0 and (_is(toks[i - 1], ",") or _is(toks[i - 1], "(")):
+        return []
+    return None
+
+
+@rule("next_method", "iterator .next() method", "Use the next() builtin.", rewrite=False)
+def _next_method(toks, i):
+    if _is_name(toks[i], ("next",)) and i > 0 and _is(toks[i - 1], ".") and _is(toks[i + 1], "(") and _is(toks[i + 2], ")"):
+        return []
+    return None
+
+
+@rule("metaclass_attribute", "__metaclass__ class attribute", "Pass metaclass= in the class statement.", rewrite=False)
+def _metaclass_attribute(toks, i):
+    return [] if _is_name(toks[i], ("__metaclass__",)) and _statement_start(toks, i) else None
+
+
+_REMOVED_MODULES = {"urllib2", "imp", "asyncore", "asynchat", "distutils", "commands", "md5", "sha", "sets", "HTMLParser", "cookielib", "Cookie", "htmlentitydefs", "thread"}
+
+
+@rule("removed_module", "removed or split standard library module (urllib2, imp, commands, distutils, ...)", "Port to the replacement module (urllib.request, importlib, subprocess, setuptools, ...).", rewrite=False)
+def _removed_module(toks, i):
+    tok = toks[i]
+    if tok.type != NAME or tok.string not in _REMOVED_MODULES or i == 0:
+        return None
+    prev = _prev(toks, i)
+    if prev is not None and _is_name(prev, ("import", "from")) and _statement_start(toks, i - 1):
+        return []
+    if prev is not None and _is(prev, ",") and _is_name(toks[_statement_start_index(toks, i)], ("import",)):
+        return []
+    return None
+
+
+_URLLIB_MOVED = {"urlopen", "urlencode", "quote", "quote_plus", "unquote", "unquote_plus", "urlretrieve", "pathname2url"}
+
+
+@rule("urllib_functions", "urllib functions moved to urllib.request / urllib.parse", "Use urllib.request.urlopen, urllib.parse.urlencode / quote / unquote.", rewrite=False)
+def _urllib_functions(toks, i):
+    if _is_name(toks[i], ("urllib",)) and _not_attribute(toks, i) and _is(toks[i + 1], ".") and _is_name(toks[i + 2], _URLLIB_MOVED):
+        return []
+    return None
+
+
+@rule("string_module_other", "other removed string module function (string.maketrans, string.joinfields, ...)", "Use the str / bytes method equivalent.", rewrite=False)
+def _string_module_other(toks, i):
+    if not _module_ref(toks, i, "string") or not _is(toks[i + 1], ".") or toks[i + 2].type != NAME:
+        return None
+    name = toks[i + 2].string
+    if name in _STRING_MODULE_KEEP or ("string", name) in _RENAMED_ATTRIBUTES:
+        return None
+    if name in _STRING_METHODS or name in _STRING_CONVERSIONS or name in ("join", "joinfields"):
+        return None  # left over only when string_module_function could not rewrite it
+    return []
+
+
+# --- driver ------------------------------------------------------------------
+
+def _tokens(code: str) -> Optional[_Tokens]:
+    try:
+        return _Tokens(list(tokenize.generate_tokens(io.StringIO(code).readline)), code.splitlines(keepends=True))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+
+
+def _apply_edits(code: str, edits: List[Edit]) -> str:
+    lines = code.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    def offset(pos):
+        row, col = pos
+        return offsets[row - 1] + col if row - 1 < len(offsets) else len(code)
+
+    out, cursor = [], 0
+    for edit in edits:
+        start, end = offset(edit.start), offset(edit.end)
+        out.append(code[cursor:start])
+        out.append(edit.text)
+        cursor = end
+    out.append(code[cursor:])
+    return "".join(out)
+
+
+def _rewrite_pass(code: str, toks: List[TokenInfo], rules: List[Rule]) -> Tuple[str, List[Finding]]:
+    """Applies every non-overlapping rewrite found in one scan; overlapping ones wait for the next pass."""
+    candidates: List[Tuple[Rule, int, List[Edit]]] = []
+    for i in range(len(toks)):
+        for r in rules:
+            edits = r.check(toks, i)
+            if edits:
+                candidates.append((r, toks[i].start[0], sorted(edits)))
+
+    accepted: List[Edit] = []
+    findings: List[Finding] = []
+    taken: List[Tuple[Tuple[int, int], Tuple[int, int]]] = []
+    for r, line, edits in candidates:
+        if any(e.start < end and start < e.end for e in edits for start, end in taken):
+            continue
+        taken.extend((e.start, e.end) for e in edits)
+        accepted.extend(edits)
+        findings.append(Finding(r, line))
+
+    return _apply_edits(code, sorted(accepted)), findings
+
+
+MAX_PASSES = 4
+
+
+def apply_rules(code: str, filename: str = "<string>") -> RuleResult:
+    """
+    Runs the rule registry over Python source.
+
+    Detect-only rules look at the input; rewrite rules are applied in passes
+    (nested matches, e.g. a has_key inside a print statement, are picked up
+    by the next pass) until nothing changes. Ambiguous findings count only
+    in files with other Python 2 constructs. The result is compiled as
+    Python 3 to tell whether anything is left for the LLM.
+    """
+    toks = _tokens(code)
+    if toks is None:
+        return RuleResult(code, [], [], "tokenize failed")
+
+    detectors = [r for r in RULES if not r.rewrite]
+    rewriters = [r for r in RULES if r.rewrite]
+
+    remaining = [Finding(r, toks[i].start[0]) for i in range(len(toks)) for r in detectors if r.check(toks, i) is not None]
+
+    applied: List[Finding] = []
+    for _ in range(MAX_PASSES):
+        new_code, findings = _rewrite_pass(code, toks, rewriters)
+        if not findings:
+            break
+        new_toks = _tokens(new_code)
+        if new_toks is None:
+            break  # keep the last version that still tokenizes
+        code, toks = new_code, new_toks
+        applied.extend(findings)
+
+    if not applied and all(f.rule.ambiguous for f in remaining):
+        remaining = []  # nothing else marks the file as Python 2
+
+    try:
+        compile(code, filename, "exec")
+        syntax_error = None
+    except SyntaxError as e:
+        syntax_error = f"{e.msg} (line {e.lineno})"
+
+    return RuleResult(code, applied, remaining, syntax_error)
+
+
+def summarize_findings(findings: List[Finding]) -> Dict[str, int]:
+    """Occurrences per rule name."""
+    counts: Dict[str, int] = {}
+    for finding in findings:
+        counts[finding.rule.name] = counts.get(finding.rule.name, 0) + 1
+    return counts
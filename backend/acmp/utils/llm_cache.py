@@ -0,0 +1,359 @@
+# acmp/utils/llm_cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import aclosing, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from langchain_core.messages import AIMessage
+
+from .metrics import record_llm_response
+from .rate_limit import estimate_tokens, get_provider_name, get_rate_limiter
+
+
+# Configuration (overridable through the environment)
+CACHE_DIR = os.getenv("ACMP_LLM_CACHE_DIR", str(Path.home() / ".cache" / "acmp"))
+CACHE_MAX_BYTES = int(os.getenv("ACMP_LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_TTL = float(os.getenv("ACMP_LLM_CACHE_TTL", "0"))  # seconds, 0 = never expires
+CACHE_ENABLED = os.getenv("ACMP_LLM_CACHE", "on").lower() not in ("0", "off", "false", "no")
+
+# When set, lookups are skipped but fresh responses are still written (refresh mode).
+_bypass: ContextVar[bool] = ContextVar("acmp_llm_cache_bypass", default=False)
+
+
+def get_model_name(llm: Any) -> str:
+    """Returns the model identifier of a chat model (or a bound runnable wrapping one)."""
+    target = getattr(llm, "bound", llm)
+    return (
+        getattr(target, "model_name", None)
+        or getattr(target, "model", None)
+        or type(target).__name__
+    )
+
+
+# Client settings that change what a model returns for the same prompt.
+_GENERATION_PARAMS = ("temperature", "max_tokens", "top_p", "stop", "n", "model_kwargs")
+
+
+def get_generation_params(llm: Any) -> Dict[str, Any]:
+    """Generation settings of a chat model, plus the arguments bound to it with `.bind(...)`."""
+    target = getattr(llm, "bound", llm)
+    params = {name: getattr(target, name) for name in _GENERATION_PARAMS if getattr(target, name, None) is not None}
+    params.update(getattr(llm, "kwargs", None) or {})
+    return params
+
+
+def make_cache_key(model: str, template_version: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Content address for a completion: model + generation params + prompt template version + prompt hash."""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    settings = json.dumps(params or {}, sort_keys=True, default=str)
+    raw = f"{model}\x00{settings}\x00{template_version}\x00{prompt_hash}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Disk-backed, content-addressed store for LLM completions.
+
+    Entries live in a single SQLite file. Every hit refreshes the entry's
+    access time, and writes evict least-recently-used entries once the
+    total payload size exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "saved_seconds": 0.0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.directory / "llm_cache.sqlite3", check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    template_version TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    latency REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT payload, latency, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+
+            payload, latency, created_at = row
+            now = time.time()
+            if self.ttl and now - created_at > self.ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                conn.commit()
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.stats["hits"] += 1
+            self.stats["saved_seconds"] += latency
+            return json.loads(payload)
+
+    def put(self, key: str, model: str, template_version: str, value: Dict[str, Any], latency: float) -> None:
+        payload = json.dumps(value, default=str)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, template_version, payload, size, latency, now, now),
+            )
+            self.stats["stores"] += 1
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drops expired entries, then least-recently-used ones until under the size cap."""
+        if self.ttl:
+            cur = conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,))
+            self.stats["evictions"] += cur.rowcount
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries")
+            conn.commit()
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache:
+    """Returns the process-wide cache instance, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
+
+
+@contextmanager
+def cache_bypass():
+    """Skips cache lookups for calls made inside the block (results are still stored)."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the process-wide cache."""
+    stats = dict(get_cache().stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def _to_payload(response: Any) -> Dict[str, Any]:
+    return {
+        "content": response.content,
+        "response_metadata": getattr(response, "response_metadata", {}) or {},
+        "usage_metadata": getattr(response, "usage_metadata", None),
+    }
+
+
+def _from_payload(payload: Dict[str, Any]) -> AIMessage:
+    return AIMessage(
+        content=payload["content"],
+        response_metadata={**payload.get("response_metadata", {}), "cache_hit": True},
+        usage_metadata=payload.get("usage_metadata"),
+    )
+
+
+def _is_cacheable(response: Any) -> bool:
+    # Truncated or abandoned completions would only replay the same failure.
+    metadata = getattr(response, "response_metadata", {}) or {}
+    return bool(response.content) and metadata.get("finish_reason") not in ("length", "invalid")
+
+
+def _streamed_message(message: Any, stopped: bool) -> AIMessage:
+    metadata = dict(getattr(message, "response_metadata", None) or {})
+    if stopped:
+        metadata["finish_reason"] = "invalid"
+    return AIMessage(
+        content=getattr(message, "content", ""),
+        response_metadata=metadata,
+        usage_metadata=getattr(message, "usage_metadata", None),
+    )
+
+
+def _stream_checked(llm: Any, prompt: str, check: Callable[[str], bool]) -> Any:
+    """
+    Streams a completion, calling check(text so far) after every chunk; when
+    it returns False the rest is not read and the response is marked with
+    finish_reason "invalid" (and not cached).
+    """
+    if not hasattr(llm, "stream"):  # e.g. a recording wrapper: the whole completion is read
+        return llm.invoke(prompt)
+    message, stopped = None, False
+    for chunk in llm.stream(prompt):
+        message = chunk if message is None else message + chunk
+        if not check(message.content):
+            stopped = True
+            break
+    return _streamed_message(message, stopped)
+
+
+async def _astream_checked(llm: Any, prompt: str, check: Callable[[str], bool]) -> Any:
+    if not hasattr(llm, "astream"):
+        return await llm.ainvoke(prompt)
+    message, stopped = None, False
+    async with aclosing(llm.astream(prompt)) as chunks:
+        async for chunk in chunks:
+            message = chunk if message is None else message + chunk
+            if not check(message.content):
+                stopped = True
+                break
+    return _streamed_message(message, stopped)
+
+
+def _invoke_limited(llm: Any, prompt: str, check: Optional[Callable[[str], bool]] = None) -> Any:
+    """Calls the model once the provider's rate limiter lets the request through."""
+    limiter = get_rate_limiter(get_provider_name(llm))
+    estimated = estimate_tokens(prompt)
+    limiter.acquire(estimated)
+    response = llm.invoke(prompt) if check is None else _stream_checked(llm, prompt, check)
+    record_llm_response(response)
+    usage = getattr(response, "usage_metadata", None) or {}
+    limiter.settle(estimated, usage.get("total_tokens"))
+    return response
+
+
+async def _ainvoke_limited(llm: Any, prompt: str, check: Optional[Callable[[str], bool]] = None) -> Any:
+    limiter = get_rate_limiter(get_provider_name(llm))
+    estimated = estimate_tokens(prompt)
+    await limiter.aacquire(estimated)
+    response = await llm.ainvoke(prompt) if check is None else await _astream_checked(llm, prompt, check)
+    record_llm_response(response)
+    usage = getattr(response, "usage_metadata", None) or {}
+    limiter.settle(estimated, usage.get("total_tokens"))
+    return response
+
+
+def cached_invoke(llm: Any, prompt: str, template_version: str, bypass: bool = False,
+                  check: Optional[Callable[[str], bool]] = None) -> Any:
+    """
+    Drop-in replacement for `llm.invoke(prompt)` that goes through the disk cache.
+
+    Args:
+        llm: Chat model to call on a miss
+        prompt: Fully rendered prompt
+        template_version: Version tag of the prompt template that produced `prompt`
+        bypass: Skip the lookup for this call (the fresh result is still stored)
+        check: On a miss, stream the completion and stop as soon as check(text
+            so far) returns False (see _stream_checked)
+    """
+    if not CACHE_ENABLED:
+        return _invoke_limited(llm, prompt, check)
+
+    cache = get_cache()
+    model = get_model_name(llm)
+    key = make_cache_key(model, template_version, prompt, get_generation_params(llm))
+
+    if bypass or _bypass.get():
+        cache.stats["bypassed"] += 1
+    else:
+        hit = cache.get(key)
+        if hit is not None:
+            response = _from_payload(hit)
+            record_llm_response(response)
+            return response
+
+    started = time.perf_counter()
+    response = _invoke_limited(llm, prompt, check)
+    latency = time.perf_counter() - started
+
+    if _is_cacheable(response):
+        cache.put(key, model, template_version, _to_payload(response), latency)
+    return response
+
+
+async def acached_invoke(llm: Any, prompt: str, template_version: str, bypass: bool = False,
+                         check: Optional[Callable[[str], bool]] = None) -> Any:
+    """
+    Async counterpart of cached_invoke: the model is called with `ainvoke` and
+    the SQLite lookups run in a worker thread, so the event loop never blocks.
+    """
+    if not CACHE_ENABLED:
+        return await _ainvoke_limited(llm, prompt, check)
+
+    cache = get_cache()
+    model = get_model_name(llm)
+    key = make_cache_key(model, template_version, prompt, get_generation_params(llm))
+
+    if bypass or _bypass.get():
+        cache.stats["bypassed"] += 1
+    else:
+        hit = await asyncio.to_thread(cache.get, key)
+        if hit is not None:
+            response = _from_payload(hit)
+            record_llm_response(response)
+            return response
+
+    started = time.perf_counter()
+    response = await _ainvoke_limited(llm, prompt, check)
+    latency = time.perf_counter() - started
+
+    if _is_cacheable(response):
+        await asyncio.to_thread(cache.put, key, model, template_version, _to_payload(response), latency)
+    return response
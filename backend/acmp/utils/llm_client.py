@@ -0,0 +1,167 @@
+# acmp/utils/llm_client.py
+
+import asyncio
+import os
+import threading
+import weakref
+from contextvars import ContextVar
+from typing import Any, Dict, NamedTuple, Optional
+
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+# Keep-alive pool per HTTP client; sized for a batch of concurrent files.
+HTTP_MAX_CONNECTIONS = int(os.getenv("ACMP_HTTP_MAX_CONNECTIONS", "32"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("ACMP_HTTP_KEEPALIVE_SECONDS", "60"))
+
+# Model the routing policy picked for the node running in this context (see utils/model_router.py).
+routed_model: ContextVar[Optional[str]] = ContextVar("acmp_routed_model", default=None)
+
+
+class LLMConfig(NamedTuple):
+    model: str
+    temperature: Optional[float]  # None keeps the provider default
+    max_tokens: Optional[int]
+
+
+def _env(node: str, name: str) -> Optional[str]:
+    # ACMP_ENGINEER_MODEL overrides ACMP_LLM_MODEL, and so on.
+    return os.getenv(f"ACMP_{node.upper()}_{name}") or os.getenv(f"ACMP_LLM_{name}")
+
+
+def configured_model(node: str) -> Optional[str]:
+    """Model pinned for a node through the environment, if any."""
+    return _env(node, "MODEL")
+
+
+def get_llm_config(node: str, model: Optional[str] = None) -> LLMConfig:
+    """Model settings of a graph node, from the environment."""
+    temperature = _env(node, "TEMPERATURE")
+    max_tokens = _env(node, "MAX_TOKENS")
+    return LLMConfig(
+        model=model or _env(node, "MODEL") or DEFAULT_MODEL,
+        temperature=float(temperature) if temperature else None,
+        max_tokens=int(max_tokens) if max_tokens else None,
+    )
+
+
+_lock = threading.Lock()
+_clients: Dict[LLMConfig, Any] = {}  # created outside any event loop
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[LLMConfig, Any]]" = weakref.WeakKeyDictionary()
+_overrides: Dict[str, Any] = {}
+_http: Optional[Any] = None
+_async_http: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+_dotenv_loaded = False
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _http_limits() -> Any:
+    import httpx
+
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+def _http_client() -> Any:
+    """One sync httpx client, so all models reuse warm TLS connections."""
+    global _http
+    if _http is None:
+        import httpx
+
+        _http = httpx.Client(limits=_http_limits())
+    return _http
+
+
+def _async_http_client(loop: asyncio.AbstractEventLoop) -> Any:
+    """
+    One async httpx client per event loop: its pooled connections belong to
+    the loop that opened them and cannot be awaited from another one.
+    """
+    client = _async_http.get(loop)
+    if client is None:
+        import httpx
+
+        client = _async_http[loop] = httpx.AsyncClient(limits=_http_limits())
+    return client
+
+
+def _create(config: LLMConfig, loop: Optional[asyncio.AbstractEventLoop]) -> Any:
+    global _dotenv_loaded
+    # Imported here: langchain_groq and the groq SDK dominate import time
+    # and are not needed until the first request.
+    from dotenv import load_dotenv
+    from langchain_groq import ChatGroq
+
+    if not _dotenv_loaded:
+        load_dotenv()
+        _dotenv_loaded = True
+
+    kwargs: Dict[str, Any] = {"model": config.model, "http_client": _http_client()}
+    if loop is not None:
+        kwargs["http_async_client"] = _async_http_client(loop)
+    if config.temperature is not None:
+        kwargs["temperature"] = config.temperature
+    if config.max_tokens is not None:
+        kwargs["max_tokens"] = config.max_tokens
+    return ChatGroq(**kwargs)
+
+
+def _clients_for(loop: Optional[asyncio.AbstractEventLoop]) -> Dict[LLMConfig, Any]:
+    if loop is None:
+        return _clients
+    clients = _loop_clients.get(loop)
+    if clients is None:
+        with _lock:
+            # Closed loops are only kept alive by their own clients; drop them.
+            for closed in [l for l in _loop_clients if l.is_closed()]:
+                del _loop_clients[closed]
+                _async_http.pop(closed, None)
+            clients = _loop_clients.setdefault(loop, {})
+    return clients
+
+
+def get_llm(node: str, model: Optional[str] = None) -> Any:
+    """
+    Chat model for a graph node ("auditor", "engineer", "optimizer"): `model`,
+    else the routed model of the running node execution, else the configured one.
+
+    Clients are created on first use and shared between nodes with the same
+    configuration. They share one sync HTTP connection pool; async requests
+    use a pool of the event loop the client was created in.
+    """
+    override = _overrides.get(node) or _overrides.get("*")
+    if override is not None:
+        return override
+
+    config = get_llm_config(node, model or routed_model.get())
+    loop = _running_loop()
+    clients = _clients_for(loop)
+    client = clients.get(config)
+    if client is None:
+        with _lock:
+            client = clients.get(config)
+            if client is None:
+                client = clients[config] = _create(config, loop)
+    return client
+
+
+def set_llm(llm: Any, node: str = "*") -> None:
+    """Makes get_llm(node) return `llm` (every node for "*"), e.g. a fake model for benchmarks."""
+    _overrides[node] = llm
+
+
+def reset_llms() -> None:
+    """Drops overrides and cached clients; the next get_llm() builds fresh ones."""
+    with _lock:
+        _overrides.clear()
+        _clients.clear()
+        _loop_clients.clear()
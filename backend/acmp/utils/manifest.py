@@ -0,0 +1,175 @@
+# acmp/utils/manifest.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+MANIFEST_NAME = ".acmp_manifest.json"
+MANIFEST_FORMAT = 1
+JOURNAL_SUFFIX = ".journal"
+# compact once the journal holds this many updates (or as many as there are
+# files, whichever is larger), so rewrites stay amortized O(1) per update
+COMPACT_AT = 1024
+
+IN_PROGRESS = "in_progress"
+SUCCESS = "success"
+FAILED = "failed"
+
+
+def hash_source(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path: Path, data: str) -> None:
+    """Write-to-temp, fsync, rename: readers see the old file or the new one, never a torn one."""
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+    _fsync_dir(path.parent)  # make the rename itself durable
+
+
+def _fsync_dir(directory: Path) -> None:
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class Manifest:
+    """
+    Per-file record of a repository run, kept in OUTPUT_DIR/.acmp_manifest.json.
+
+    Each entry (keyed by the path relative to the input root) holds the
+    source hash, the pipeline version that produced it, the chosen target
+    versions and the outcome. A file is marked in_progress before its run
+    starts, so entries left in that state after a crash are picked up again.
+
+    Updates are appended (and fsynced) to a journal next to the manifest, one
+    JSON line each, instead of rewriting the whole file. The journal is folded
+    into the manifest by an atomic rewrite on load, when it grows past
+    COMPACT_AT entries, and on compact(); a torn last line from a crash is
+    dropped.
+    """
+
+    def __init__(self, output_dir: str):
+        self.path = Path(output_dir) / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") == MANIFEST_FORMAT:
+                self.files = data.get("files", {})
+        except (OSError, ValueError):
+            pass  # first run (or an unreadable manifest): process everything
+
+        self.journal_path = self.path.with_name(self.path.name + JOURNAL_SUFFIX)
+        self._journal = None
+        self._journaled = 0
+        if self._replay_journal():
+            self.compact()
+
+    def is_done(self, relative_path: str, source_hash: str, pipeline_version: str) -> bool:
+        """Whether the file was already modernized from this exact source by this pipeline."""
+        entry = self.files.get(relative_path)
+        return bool(
+            entry
+            and entry.get("status") == SUCCESS
+            and entry.get("source_hash") == source_hash
+            and entry.get("pipeline_version") == pipeline_version
+            and (self.path.parent / relative_path).exists()
+        )
+
+    def status(self, relative_path: str) -> Optional[str]:
+        entry = self.files.get(relative_path)
+        return entry.get("status") if entry else None
+
+    def mark_started(self, relative_path: str, source_hash: str, pipeline_version: str) -> None:
+        self._update(relative_path, {
+            "source_hash": source_hash,
+            "pipeline_version": pipeline_version,
+            "status": IN_PROGRESS,
+            "error": None,
+        })
+
+    def record_result(self, relative_path: str, source_hash: str, pipeline_version: str,
+                      result: Optional[Dict[str, Any]], ok: bool, error: Optional[str] = None) -> None:
+        result = result or {}
+        self._update(relative_path, {
+            "source_hash": source_hash,
+            "pipeline_version": pipeline_version,
+            "status": SUCCESS if ok else FAILED,
+            "error": None if ok else (error or result.get("error_logs")),
+            "language": result.get("language"),
+            "language_version": result.get("language_version"),
+            "framework": result.get("framework"),
+            "framework_version": result.get("framework_version"),
+            "iterations": result.get("itr"),
+        })
+
+    def compact(self) -> None:
+        """Fold the journal into the manifest: atomic rewrite, then drop the journal."""
+        with self._lock:
+            self._compact()
+
+    def _replay_journal(self) -> bool:
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return False
+        for line in lines:
+            try:
+                record = json.loads(line)
+                self.files.setdefault(record["path"], {}).update(record["fields"])
+            except (ValueError, KeyError, TypeError):
+                continue  # torn write from a crash
+        return True
+
+    def _compact(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(self.path, json.dumps({"format": MANIFEST_FORMAT, "files": self.files}, indent=2, sort_keys=True))
+        # replaying a journal that outlives a crash here is harmless: its updates are already in the manifest
+        try:
+            os.unlink(self.journal_path)
+        except FileNotFoundError:
+            pass
+        self._journaled = 0
+
+    def _update(self, relative_path: str, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            fields = dict(fields, updated_at=time.time())
+            self.files.setdefault(relative_path, {}).update(fields)
+            if self._journal is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+                _fsync_dir(self.path.parent)  # the new journal's directory entry
+            self._journal.write(json.dumps({"path": relative_path, "fields": fields}, sort_keys=True) + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journaled += 1
+            if self._journaled >= max(COMPACT_AT, len(self.files)):
+                self._compact()
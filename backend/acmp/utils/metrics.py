@@ -0,0 +1,247 @@
+# acmp/utils/metrics.py
+
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from prometheus_client import Counter, Histogram
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+NODE_DURATION = Histogram(
+    "acmp_node_duration_seconds",
+    "Wall time of one graph node execution.",
+    ["node"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80),
+)
+NODE_ITERATION = Histogram(
+    "acmp_node_iteration",
+    "Retry iteration (state['itr']) a node ran at.",
+    ["node"],
+    buckets=(0, 1, 2, 3, 4, 5),
+)
+LLM_TOKENS = Histogram(
+    "acmp_llm_tokens",
+    "LLM tokens per call, from the provider's usage metadata (cache hits excluded).",
+    ["node", "direction"],
+    buckets=(64, 256, 1024, 2048, 4096, 8192, 16384, 32768),
+)
+SANDBOX_WALL = Histogram(
+    "acmp_sandbox_wall_seconds",
+    "Wall time of one sandbox execution.",
+    ["language"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+SANDBOX_CPU = Histogram(
+    "acmp_sandbox_cpu_seconds",
+    "User + system CPU time of one sandbox execution.",
+    ["language"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+SANDBOX_RSS = Histogram(
+    "acmp_sandbox_max_rss_bytes",
+    "Peak resident set size of one sandbox execution.",
+    ["language"],
+    buckets=tuple(mb * 1024 * 1024 for mb in (8, 16, 32, 64, 128, 256, 512, 1024)),
+)
+CALLS_SAVED = Counter(
+    "acmp_calls_saved_total",
+    "LLM calls and sandbox runs skipped by the tester memo, syntax checks and early stopping.",
+    ["kind", "reason"],
+)
+OPTIMIZER_PATCHES = Counter(
+    "acmp_optimizer_patches_total",
+    "Optimizer edit completions by outcome (applied, no_match, invalid); the last two regenerate the file.",
+    ["outcome"],
+)
+AUDIT_PLANS = Counter(
+    "acmp_audit_plans_total",
+    "Auditor plan requests by outcome (valid, reasked: valid after a re-ask, fallback: manual review plan).",
+    ["outcome"],
+)
+MODEL_ROUTES = Counter(
+    "acmp_model_routes_total",
+    "Node executions per model tier chosen by the routing policy (see utils/model_router.py).",
+    ["node", "tier"],
+)
+RUN_RESUMES = Counter(
+    "acmp_run_resumes_total",
+    "Interrupted pipeline runs resumed from their last checkpoint, by the node they resumed at.",
+    ["node"],
+)
+
+# Sample of the node execution currently running in this context.
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("acmp_node_sample", default=None)
+
+
+def _new_sample(node: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "node": node,
+        "itr": state.get("itr", 0),
+        "wall_time": 0.0,
+        "llm_calls": 0,
+        "llm_cache_hits": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "sandbox_runs": 0,
+        "sandbox_wall_time": 0.0,
+        "sandbox_cpu_time": 0.0,
+        "sandbox_max_rss_kb": 0,
+    }
+
+
+def _finish(sample: Dict[str, Any], started: float, state: Dict[str, Any], result: Any) -> Any:
+    sample["wall_time"] = time.perf_counter() - started
+    NODE_DURATION.labels(sample["node"]).observe(sample["wall_time"])
+    NODE_ITERATION.labels(sample["node"]).observe(sample["itr"])
+
+    if isinstance(result, dict):
+        result["run_metrics"] = list(state.get("run_metrics") or []) + [sample]
+    return result
+
+
+def instrument_node(name: str, func: Callable) -> Callable:
+    """
+    Wraps a graph node (sync or async) so each execution is timed and the
+    LLM / sandbox usage it triggers is collected into one sample, which is
+    observed in the Prometheus histograms and appended to state["run_metrics"].
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(state: Dict[str, Any]) -> Any:
+            sample = _new_sample(name, state)
+            token = _current.set(sample)
+            started = time.perf_counter()
+            try:
+                result = await func(state)
+            finally:
+                _current.reset(token)
+            return _finish(sample, started, state, result)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(state: Dict[str, Any]) -> Any:
+        sample = _new_sample(name, state)
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            result = func(state)
+        finally:
+            _current.reset(token)
+        return _finish(sample, started, state, result)
+    return wrapper
+
+
+def record_llm_response(response: Any) -> None:
+    """Adds the token usage of an LLM response to the running node sample."""
+    sample = _current.get()
+    if sample is None:
+        return
+
+    sample["llm_calls"] += 1
+    metadata = getattr(response, "response_metadata", None) or {}
+    if metadata.get("cache_hit"):
+        sample["llm_cache_hits"] += 1
+        return
+
+    usage = getattr(response, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens") or 0
+    output_tokens = usage.get("output_tokens") or 0
+    sample["input_tokens"] += input_tokens
+    sample["output_tokens"] += output_tokens
+    LLM_TOKENS.labels(sample["node"], "input").observe(input_tokens)
+    LLM_TOKENS.labels(sample["node"], "output").observe(output_tokens)
+
+
+def _children_cpu_time() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextmanager
+def sandbox_timer(language: str):
+    """
+    Measures one sandbox execution.
+
+    CPU time defaults to the growth of RUSAGE_CHILDREN over the block (an
+    approximation when several runs overlap); code that knows the exact
+    figure sets usage["cpu_time"] on the yielded dict, and the peak RSS in
+    usage["max_rss_kb"] when it has it.
+    """
+    usage: Dict[str, Any] = {"cpu_time": None, "max_rss_kb": None}
+    started = time.perf_counter()
+    cpu_before = _children_cpu_time()
+    try:
+        yield usage
+    finally:
+        wall = time.perf_counter() - started
+        cpu = usage["cpu_time"]
+        if cpu is None:
+            cpu = max(0.0, _children_cpu_time() - cpu_before)
+
+        SANDBOX_WALL.labels(language).observe(wall)
+        SANDBOX_CPU.labels(language).observe(cpu)
+        if usage["max_rss_kb"] is not None:
+            SANDBOX_RSS.labels(language).observe(usage["max_rss_kb"] * 1024)
+
+        sample = _current.get()
+        if sample is not None:
+            sample["sandbox_runs"] += 1
+            sample["sandbox_wall_time"] += wall
+            sample["sandbox_cpu_time"] += cpu
+            sample["sandbox_max_rss_kb"] = max(sample["sandbox_max_rss_kb"], usage["max_rss_kb"] or 0)
+
+
+def record_calls_saved(reason: str, llm_calls: int, sandbox_runs: int) -> None:
+    """Counts work the tester memo / syntax check / early stop made unnecessary (see agents/tester.py)."""
+    if llm_calls:
+        CALLS_SAVED.labels("llm_call", reason).inc(llm_calls)
+    if sandbox_runs:
+        CALLS_SAVED.labels("sandbox_run", reason).inc(sandbox_runs)
+
+
+def record_patch(outcome: str) -> None:
+    OPTIMIZER_PATCHES.labels(outcome).inc()
+
+
+def record_audit_plan(outcome: str) -> None:
+    AUDIT_PLANS.labels(outcome).inc()
+
+
+def record_route(node: str, tier: str) -> None:
+    MODEL_ROUTES.labels(node, tier).inc()
+
+
+def record_resume(node: str) -> None:
+    RUN_RESUMES.labels(node).inc()
+
+
+def summarize_run(run_metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-node totals of a finished run, for the final SSE event / CLI report."""
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for sample in run_metrics:
+        agg = nodes.setdefault(sample["node"], {
+            "runs": 0, "wall_time": 0.0, "input_tokens": 0, "output_tokens": 0,
+            "llm_calls": 0, "llm_cache_hits": 0, "sandbox_wall_time": 0.0, "sandbox_cpu_time": 0.0,
+            "sandbox_max_rss_kb": 0,
+        })
+        agg["runs"] += 1
+        for key in ("wall_time", "input_tokens", "output_tokens", "llm_calls",
+                    "llm_cache_hits", "sandbox_wall_time", "sandbox_cpu_time"):
+            agg[key] += sample[key]
+        agg["sandbox_max_rss_kb"] = max(agg["sandbox_max_rss_kb"], sample.get("sandbox_max_rss_kb", 0))
+
+    return {
+        "nodes": nodes,
+        "total_node_time": sum(agg["wall_time"] for agg in nodes.values()),
+        "iterations": max((s["itr"] for s in run_metrics), default=0),
+    }
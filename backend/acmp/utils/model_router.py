@@ -0,0 +1,197 @@
+# acmp/utils/model_router.py
+
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from .llm_client import DEFAULT_MODEL, configured_model, routed_model
+from .metrics import record_route
+from .rate_limit import estimate_tokens
+from .sandbox import TIMEOUT_MESSAGE
+
+
+# Per-node model choice ("on"/"off"). Nodes with ACMP_<NODE>_MODEL or
+# ACMP_LLM_MODEL set keep that model whatever the policy says.
+ROUTING = os.getenv("ACMP_MODEL_ROUTING", "on").lower() != "off"
+
+FAST_MODEL = os.getenv("ACMP_FAST_MODEL", "llama-3.1-8b-instant")
+STRONG_MODEL = os.getenv("ACMP_STRONG_MODEL", DEFAULT_MODEL)
+
+# A file stays on the fast model while it is under all three limits.
+FAST_MAX_TOKENS = int(os.getenv("ACMP_ROUTING_FAST_MAX_TOKENS", "1500"))
+FAST_MAX_COMPLEXITY = int(os.getenv("ACMP_ROUTING_FAST_MAX_COMPLEXITY", "30"))
+FAST_MAX_PATTERNS = int(os.getenv("ACMP_ROUTING_FAST_MAX_PATTERNS", "8"))
+
+# One JSON line per routed node execution and per test verdict ("off" disables).
+ROUTING_LOG = os.getenv("ACMP_ROUTING_LOG", str(Path.home() / ".cache" / "acmp" / "routing.jsonl"))
+
+ROUTED_NODES = {"auditor", "engineer", "optimizer"}
+
+_BRANCH_RE = re.compile(r"\b(?:if|elif|else if|for|foreach|while|case|catch|except|and|or)\b|&&|\|\||\?")
+
+_log_lock = threading.Lock()
+
+
+def complexity(code: str) -> int:
+    """Rough decision-point count (branches, loops, handlers, boolean operators)."""
+    return len(_BRANCH_RE.findall(code))
+
+
+def _source(state: Dict[str, Any]) -> str:
+    return state.get("current_code") or state.get("preprocessed_code") or state.get("original_code") or ""
+
+
+def _failed(state: Dict[str, Any]) -> bool:
+    """
+    Whether the tester rejected the last attempt of this run. Only the
+    optimizer runs after the tester (see graph.py), so it is the only node
+    this escalates; the auditor and engineer run before the first test.
+    """
+    return state.get("error_logs") not in (None, TIMEOUT_MESSAGE)
+
+
+def route(node: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Model for one execution of `node`: the fast model for small, simple
+    files, the strong one for large or complex files and for optimizer
+    passes that fix an attempt the tester rejected. Returns the decision
+    record.
+    """
+    code = _source(state)
+    plan = state.get("transformation_plan")
+    features = {
+        "tokens": estimate_tokens(code),
+        "complexity": complexity(code),
+        "patterns": len(plan.legacy_patterns) if plan is not None else len(state.get("prefilled_patterns") or []),
+    }
+
+    if configured_model(node):
+        model, tier, reason = None, "configured", "model set in the environment"
+    elif not ROUTING:
+        model, tier, reason = None, "default", "routing disabled"
+    elif _failed(state):
+        model, tier, reason = STRONG_MODEL, "strong", "tester failure"
+    elif features["tokens"] > FAST_MAX_TOKENS:
+        model, tier, reason = STRONG_MODEL, "strong", "large file"
+    elif features["complexity"] > FAST_MAX_COMPLEXITY:
+        model, tier, reason = STRONG_MODEL, "strong", "complex file"
+    elif features["patterns"] > FAST_MAX_PATTERNS:
+        model, tier, reason = STRONG_MODEL, "strong", "many legacy patterns"
+    else:
+        model, tier, reason = FAST_MODEL, "fast", "small file"
+
+    previous = state.get("routing") or []
+    return {
+        "run": previous[0]["run"] if previous else uuid.uuid4().hex[:12],
+        "node": node,
+        "itr": state.get("itr", 0),
+        "model": model or configured_model(node) or DEFAULT_MODEL,
+        "tier": tier,
+        "reason": reason,
+        **features,
+    }
+
+
+def write_log(entry: Dict[str, Any]) -> None:
+    if ROUTING_LOG.lower() == "off":
+        return
+    line = json.dumps(entry, default=str) + "\n"
+    try:
+        with _log_lock:
+            Path(ROUTING_LOG).parent.mkdir(parents=True, exist_ok=True)
+            with open(ROUTING_LOG, "a", encoding="utf-8") as f:
+                f.write(line)
+    except OSError:
+        pass  # the log is for tuning only; never fail a run over it
+
+
+def _outcome(decision: Dict[str, Any], state: Dict[str, Any], result: Any) -> Any:
+    if not isinstance(result, dict):
+        return result
+    sample = (result.get("run_metrics") or [{}])[-1]
+    if not sample.get("llm_calls"):
+        return result  # the node had nothing to ask (e.g. planned by the batched audit)
+
+    record_route(decision["node"], decision["tier"])
+    write_log({
+        "ts": time.time(),
+        "file_path": result.get("file_path"),
+        **decision,
+        "wall_time": sample.get("wall_time"),
+        "llm_calls": sample.get("llm_calls"),
+        "llm_cache_hits": sample.get("llm_cache_hits"),
+        "input_tokens": sample.get("input_tokens"),
+        "output_tokens": sample.get("output_tokens"),
+    })
+    result["routing"] = list(state.get("routing") or []) + [decision]
+    return result
+
+
+def _verdict(result: Any) -> Any:
+    """Logs a test verdict against the models that produced the code under test."""
+    if isinstance(result, dict) and result.get("routing"):
+        decisions = result["routing"]
+        write_log({
+            "ts": time.time(),
+            "file_path": result.get("file_path"),
+            "run": decisions[0]["run"],
+            "node": "tester",
+            "itr": result.get("itr", 0),
+            "passed": result.get("error_logs") in (None, TIMEOUT_MESSAGE),
+            "stop_reason": result.get("stop_reason"),
+            "models": [d["model"] for d in decisions],
+        })
+    return result
+
+
+def routed_node(name: str, func: Callable) -> Callable:
+    """
+    Wraps an (instrumented) graph node: LLM nodes run with the model chosen
+    by route(), which get_llm() picks up, and decisions that led to LLM
+    calls are appended to state["routing"] and logged with the node's
+    latency and token usage. Tester executions log their verdict.
+    """
+    if name == "tester":
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_tester(state: Dict[str, Any]) -> Any:
+                return _verdict(await func(state))
+            return async_tester
+
+        @functools.wraps(func)
+        def tester(state: Dict[str, Any]) -> Any:
+            return _verdict(func(state))
+        return tester
+
+    if name not in ROUTED_NODES:
+        return func
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(state: Dict[str, Any]) -> Any:
+            decision = route(name, state)
+            token = routed_model.set(decision["model"])
+            try:
+                result = await func(state)
+            finally:
+                routed_model.reset(token)
+            return _outcome(decision, state, result)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(state: Dict[str, Any]) -> Any:
+        decision = route(name, state)
+        token = routed_model.set(decision["model"])
+        try:
+            result = func(state)
+        finally:
+            routed_model.reset(token)
+        return _outcome(decision, state, result)
+    return wrapper
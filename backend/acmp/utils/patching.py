@@ -0,0 +1,129 @@
+# acmp/utils/patching.py
+
+import os
+import re
+import tempfile
+from typing import List, Optional, Tuple
+
+from .build_cache import BUILD_CACHE_DIR
+
+
+# Source locations in tracebacks and compiler output:
+#   File "/tmp/tmpab12.py", line 12         (Python)
+#   /tmp/tmpab12.js:12 / main.c:12:5:        (node, gcc, rustc, go, ruby...)
+#   ... in /tmp/tmpab12.php on line 12      (PHP)
+_LOCATION_RES = [
+    re.compile(r'File "([^"]+)", line (\d+)'),
+    re.compile(r"([^\s:'\"()]+\.[A-Za-z]{1,6}):(\d+)"),
+    re.compile(r"in (\S+) on line (\d+)"),
+]
+
+_SEARCH_REPLACE_RE = re.compile(
+    r"^<{5,9} ?SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} ?REPLACE[^\n]*$", re.M | re.S
+)
+_LINE_NUMBER_PREFIX_RE = re.compile(r"^\s*\d+\s?\| ?")
+
+Window = Tuple[int, int]  # 1-based, inclusive
+
+
+def _is_program_path(path: str) -> bool:
+    """Whether a path in an error report is the tested program (not a library or the runtime)."""
+    return (
+        path.startswith(tempfile.gettempdir())
+        or path.startswith(BUILD_CACHE_DIR)
+        or os.path.basename(path).startswith("main.")
+        or path == "<string>"
+    )
+
+
+def error_lines(error: str, line_count: int) -> List[int]:
+    """Line numbers of the tested program named in an error report, in order of appearance."""
+    lines: List[int] = []
+    for pattern in _LOCATION_RES:
+        for match in pattern.finditer(error or ""):
+            number = int(match.group(2))
+            if _is_program_path(match.group(1)) and 1 <= number <= line_count and number not in lines:
+                lines.append(number)
+    return lines
+
+
+def windows_around(lines: List[int], line_count: int, context: int) -> List[Window]:
+    """Merged windows of `context` lines around each line number."""
+    windows: List[Window] = []
+    for number in sorted(lines):
+        start, end = max(1, number - context), min(line_count, number + context)
+        if windows and start <= windows[-1][1] + 1:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    return windows
+
+
+def excerpt(code: str, windows: List[Window]) -> str:
+    """The windows of `code` with line numbers, "..." between them."""
+    lines = code.splitlines()
+    width = len(str(len(lines)))
+    parts = []
+    for start, end in windows:
+        parts.append("\n".join(f"{n:>{width}}| {lines[n - 1]}" for n in range(start, end + 1)))
+    return "\n...\n".join(parts)
+
+
+def parse_edits(text: str) -> List[Tuple[str, str]]:
+    """(search, replace) pairs of the SEARCH/REPLACE blocks in a completion."""
+    return [(search, replace) for search, replace in _SEARCH_REPLACE_RE.findall(text or "")]
+
+
+def _strip_line_numbers(block: str) -> str:
+    # models sometimes copy the "12| " prefixes of the excerpt
+    lines = block.splitlines()
+    if lines and all(_LINE_NUMBER_PREFIX_RE.match(line) for line in lines):
+        return "\n".join(_LINE_NUMBER_PREFIX_RE.sub("", line, count=1) for line in lines) + "\n"
+    return block
+
+
+def _whole_lines_at(code: str, start: int, search: str) -> bool:
+    end = start + len(search)
+    return (start == 0 or code[start - 1] == "\n") and (
+        search.endswith("\n") or end == len(code) or code[end] in "\r\n"
+    )
+
+
+def _apply_one(code: str, search: str, replace: str) -> Optional[str]:
+    if not search.strip():
+        return None
+    # a block replaces whole lines: "x = 10" must not edit "max = 10"
+    if code.count(search) == 1 and _whole_lines_at(code, code.index(search), search):
+        return code.replace(search, replace, 1)
+
+    # same lines up to trailing whitespace, still required to match exactly once
+    code_lines = code.splitlines(keepends=True)
+    wanted = [line.rstrip() for line in search.splitlines()]
+    size = len(wanted)
+    matches = [
+        i for i in range(len(code_lines) - size + 1)
+        if [line.rstrip() for line in code_lines[i:i + size]] == wanted
+    ]
+    if len(matches) != 1:
+        return None
+    i = matches[0]
+    if replace and not replace.endswith("\n") and i + size < len(code_lines):
+        replace += "\n"
+    return "".join(code_lines[:i]) + replace + "".join(code_lines[i + size:])
+
+
+def apply_edits(code: str, edits: List[Tuple[str, str]]) -> Optional[str]:
+    """
+    `code` with every edit applied in order, or None when one of them does
+    not match exactly one place (the caller then regenerates the file).
+    """
+    if not edits:
+        return None
+    for search, replace in edits:
+        patched = _apply_one(code, search, replace)
+        if patched is None:
+            patched = _apply_one(code, _strip_line_numbers(search), _strip_line_numbers(replace))
+        if patched is None:
+            return None
+        code = patched
+    return code
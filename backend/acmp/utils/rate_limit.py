@@ -0,0 +1,107 @@
+# acmp/utils/rate_limit.py
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for one LLM provider.
+
+    Tracks two budgets refilled continuously over a minute: requests and
+    tokens. Callers reserve capacity up front (the balance may go negative)
+    and sleep for however long it takes the bucket to pay the debt back,
+    so concurrent callers are spaced out fairly instead of bursting.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests_per_minute = requests_per_minute or None
+        self.tokens_per_minute = tokens_per_minute or None
+        self._lock = threading.Lock()
+        self._requests = float(self.requests_per_minute or 0)
+        self._tokens = float(self.tokens_per_minute or 0)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _reserve(self, tokens: int) -> float:
+        """Takes one request and `tokens` tokens from the buckets; returns the seconds to wait."""
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = 0.0
+            if self.requests_per_minute:
+                self._requests -= 1
+                if self._requests < 0:
+                    wait = max(wait, -self._requests * 60 / self.requests_per_minute)
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens * 60 / self.tokens_per_minute)
+            return wait
+
+    def acquire(self, tokens: int = 0) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Corrects the token bucket once the real usage of a request is known."""
+        if not self.tokens_per_minute or actual is None:
+            return
+        with self._lock:
+            self._tokens -= actual - estimated
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_provider_name(llm: Any) -> str:
+    """Maps a chat model to its provider name, e.g. ChatGroq ("groq-chat") -> "groq"."""
+    target = getattr(llm, "bound", llm)
+    llm_type = getattr(target, "_llm_type", None) or type(target).__name__
+    return llm_type.split("-")[0].lower()
+
+
+def configure_rate_limit(provider: str, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None) -> RateLimiter:
+    """Installs the limits for `provider`; 0 / None means unlimited."""
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    with _limiters_lock:
+        _limiters[provider] = limiter
+    return limiter
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """
+    Returns the limiter for `provider`, creating it from the environment on first use.
+    e.g. ACMP_GROQ_RPM=30 ACMP_GROQ_TPM=6000
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            prefix = f"ACMP_{provider.upper()}"
+            limiter = RateLimiter(
+                float(os.getenv(f"{prefix}_RPM", "0")),
+                float(os.getenv(f"{prefix}_TPM", "0")),
+            )
+            _limiters[provider] = limiter
+        return limiter
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt size (~4 characters per token), good enough for budgeting."""
+    return max(1, len(text) // 4)
@@ -0,0 +1,120 @@
+# acmp/utils/resource_limits.py
+
+import errno
+import json
+import os
+import shutil
+import signal
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, runs are only bounded by the timeout
+    resource = None
+
+
+class ResourceLimits(NamedTuple):
+    """Per-run rlimits of sandboxed programs; 0 disables a limit."""
+    cpu_seconds: int     # RLIMIT_CPU (SIGXCPU, then SIGKILL a second later)
+    memory_mb: int       # RLIMIT_AS
+    processes: int       # RLIMIT_NPROC (counted per user, not per run)
+    file_size_mb: int    # RLIMIT_FSIZE (SIGXFSZ)
+
+
+SANDBOX_LIMITS = ResourceLimits(
+    cpu_seconds=int(os.getenv("ACMP_SANDBOX_CPU_SECONDS", "10")),
+    memory_mb=int(os.getenv("ACMP_SANDBOX_MEMORY_MB", "1024")),
+    # RLIMIT_NPROC caps every process of the user, the server and its other
+    # runs included, so it is off unless sandboxes run as a dedicated user.
+    processes=int(os.getenv("ACMP_SANDBOX_MAX_PROCS", "0")),
+    file_size_mb=int(os.getenv("ACMP_SANDBOX_FILE_SIZE_MB", "16")),
+)
+
+# Optional pre-created cgroup (v1 or v2) that every sandboxed program joins,
+# e.g. one with memory.max / pids.max set as an aggregate cap for all runs.
+SANDBOX_CGROUP = os.getenv("ACMP_SANDBOX_CGROUP") or None
+
+# Runtimes that reserve far more address space than they use.
+_NO_ADDRESS_SPACE_LIMIT = {"java", "kotlin", "scala", "csharp", "go"}
+
+_SIGNAL_NOTES = {
+    getattr(signal, "SIGXCPU", None): "CPU time limit exceeded ({cpu}s).",
+    getattr(signal, "SIGXFSZ", None): "File size limit exceeded ({fsize} MB).",
+    getattr(signal, "SIGKILL", None): "Process was killed (CPU or memory limit).",
+}
+
+
+def limits_for(language_lower: str, limits: ResourceLimits = SANDBOX_LIMITS) -> ResourceLimits:
+    if language_lower in _NO_ADDRESS_SPACE_LIMIT:
+        return limits._replace(memory_mb=0)
+    return limits
+
+
+def rlimits(limits: ResourceLimits) -> List[List[Any]]:
+    """[[RLIMIT name, soft, hard], ...] for the enabled limits (JSON friendly for the pool)."""
+    if resource is None:
+        return []
+    pairs = [
+        ("RLIMIT_CPU", limits.cpu_seconds, limits.cpu_seconds + 1),
+        ("RLIMIT_AS", limits.memory_mb * 1024 * 1024, limits.memory_mb * 1024 * 1024),
+        ("RLIMIT_NPROC", limits.processes, limits.processes),
+        ("RLIMIT_FSIZE", limits.file_size_mb * 1024 * 1024, limits.file_size_mb * 1024 * 1024),
+    ]
+    return [[name, soft, hard] for name, soft, hard in pairs if soft > 0 and hasattr(resource, name)]
+
+
+# Runs in the spawned child: applies the limits, joins the cgroup and execs
+# the program. A preexec_fn would do the same between fork and exec, which
+# is unsafe in the threaded parent.
+_LIMIT_WRAPPER = """
+import json, os, resource, sys
+cgroup, limits = json.loads(sys.argv[1])
+if cgroup:
+    with open(os.path.join(cgroup, "cgroup.procs"), "w") as f:
+        f.write(str(os.getpid()))
+for name, soft, hard in limits:
+    resource.setrlimit(getattr(resource, name), (soft, hard))
+os.execv(sys.argv[2], sys.argv[3:])
+"""
+
+
+def limited_command(cmd: List[str], limits: Optional[ResourceLimits]) -> List[str]:
+    """
+    `cmd` prefixed with a small exec wrapper that applies `limits` (and the
+    cgroup) to itself before becoming the program; `cmd` as is when there is
+    nothing to apply. Raises FileNotFoundError for an unknown executable,
+    like Popen would.
+    """
+    if limits is None or resource is None:
+        return cmd
+    pairs = rlimits(limits)
+    if not pairs and SANDBOX_CGROUP is None:
+        return cmd
+    executable = shutil.which(cmd[0])
+    if executable is None:
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), cmd[0])
+    return [sys.executable, "-I", "-S", "-c", _LIMIT_WRAPPER, json.dumps([SANDBOX_CGROUP, pairs]), executable, *cmd]
+
+
+def usage_from_rusage(rusage: Any, wall_time: float) -> Dict[str, float]:
+    """Accounting of one run from the rusage returned by wait4."""
+    return {
+        "wall_time": wall_time,
+        "user_time": rusage.ru_utime,
+        "sys_time": rusage.ru_stime,
+        "max_rss_kb": rusage.ru_maxrss,  # kilobytes on Linux
+    }
+
+
+def signal_note(returncode: Optional[int], limits: ResourceLimits = SANDBOX_LIMITS) -> Optional[str]:
+    """Explanation of a run killed by a signal (negative return code), if any."""
+    if returncode is None or returncode >= 0:
+        return None
+    note = _SIGNAL_NOTES.get(-returncode)
+    if note is None:
+        try:
+            return f"Process killed by {signal.Signals(-returncode).name}."
+        except ValueError:
+            return f"Process killed by signal {-returncode}."
+    return note.format(cpu=limits.cpu_seconds, fsize=limits.file_size_mb)
@@ -1,13 +1,41 @@
 # acmp/utils/sandbox.py
 
+import asyncio
+import re
+import select
+import signal
 import subprocess
 import tempfile
 import os
-from typing import Tuple, Optional
+import threading
+import time
+import traceback
+import weakref
+from typing import Dict, NamedTuple, Tuple, Optional
+
+from .build_cache import BuildEntry, get_build_cache, make_build_key
+from .interpreter_pool import PoolUnavailable, get_python_pool
+from .metrics import sandbox_timer
+from .resource_limits import SANDBOX_CGROUP, ResourceLimits, limited_command, limits_for, rlimits, signal_note, usage_from_rusage
 
 
 EXECUTION_TIMEOUT = 5  # seconds
 
+# Captured output per stream; the rest is read and discarded.
+MAX_OUTPUT = 1024 * 1024
+
+# Warm interpreters used for Python runs (0 disables the pool and always spawns).
+PYTHON_POOL_SIZE = int(os.getenv("ACMP_PYTHON_POOL_SIZE", "2")) if hasattr(os, "fork") else 0
+
+# Syntax-only first test tier ("on"/"off"), see check_syntax.
+SYNTAX_CHECK = os.getenv("ACMP_SYNTAX_CHECK", "on").lower() != "off"
+
+# Upper bound on programs executing at the same time, shared by all callers.
+SANDBOX_CONCURRENCY = int(os.getenv("ACMP_SANDBOX_CONCURRENCY", str(os.cpu_count() or 4)))
+
+_sync_slots = threading.BoundedSemaphore(SANDBOX_CONCURRENCY)
+_async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
 
 def get_file_extension(language: str) -> str:
     """Returns the appropriate file extension for a given language."""
@@ -42,12 +70,7 @@ def get_execution_command(language: str, file_path: str) -> Optional[list]:
         "python": ["python", file_path],
         "javascript": ["node", file_path],
         "typescript": ["ts-node", file_path],  # Requires ts-node
-        "java": ["javac", file_path, "&&", "java", os.path.splitext(os.path.basename(file_path))[0]],
         "go": ["go", "run", file_path],
-        "rust": ["rustc", file_path, "&&", os.path.splitext(file_path)[0]],
-        "cpp": ["g++", file_path, "-o", os.path.splitext(file_path)[0] + ".exe", "&&", os.path.splitext(file_path)[0] + ".exe"],
-        "c": ["gcc", file_path, "-o", os.path.splitext(file_path)[0] + ".exe", "&&", os.path.splitext(file_path)[0] + ".exe"],
-        "csharp": ["csc", file_path, "&&", os.path.splitext(os.path.basename(file_path))[0] + ".exe"],
         "php": ["php", file_path],
         "ruby": ["ruby", file_path],
         "r": ["Rscript", file_path],
@@ -59,6 +82,290 @@ def get_execution_command(language: str, file_path: str) -> Optional[list]:
     return commands.get(language_lower)
 
 
+# Parse-only modes: report syntax errors without building or running the
+# program. Python is checked in-process (see _python_syntax_error).
+SYNTAX_CHECK_COMMANDS = {
+    "javascript": ["node", "--check", "{src}"],
+    "c": ["gcc", "-fsyntax-only", "{src}"],
+    "cpp": ["g++", "-fsyntax-only", "{src}"],
+    "php": ["php", "-l", "{src}"],
+    "ruby": ["ruby", "-c", "{src}"],
+    "bash": ["bash", "-n", "{src}"],
+    "go": ["gofmt", "-l", "-e", "{src}"],
+}
+
+
+class BuildSpec(NamedTuple):
+    """
+    Build + run steps of a compiled language.
+    Placeholders: {src} source file, {dir} build directory, {main} entry class.
+    """
+    source_name: str
+    build: list
+    run: list
+
+
+BUILD_SPECS = {
+    "java": BuildSpec("{main}.java", ["javac", "-d", "{dir}", "{src}"], ["java", "-cp", "{dir}", "{main}"]),
+    "rust": BuildSpec("main.rs", ["rustc", "-o", "{dir}/main", "{src}"], ["{dir}/main"]),
+    "cpp": BuildSpec("main.cpp", ["g++", "{src}", "-o", "{dir}/main.exe"], ["{dir}/main.exe"]),
+    "c": BuildSpec("main.c", ["gcc", "{src}", "-o", "{dir}/main.exe"], ["{dir}/main.exe"]),
+    "csharp": BuildSpec("main.cs", ["csc", "-out:{dir}/main.exe", "{src}"], ["{dir}/main.exe"]),
+}
+
+
+def _java_main_class(code: str) -> str:
+    """javac wants the public class in a file of the same name."""
+    match = re.search(r"public\s+(?:(?:final|abstract)\s+)*class\s+(\w+)", code) or re.search(r"\bclass\s+(\w+)", code)
+    return match.group(1) if match else "Main"
+
+
+class _Build(NamedTuple):
+    spec: BuildSpec
+    key: str
+    source_name: str
+    main: str
+    limits: ResourceLimits
+
+    def command(self, template: list, build_dir: str) -> list:
+        src = os.path.join(build_dir, self.source_name)
+        return [arg.format(src=src, dir=build_dir, main=self.main) for arg in template]
+
+
+def _plan_build(code: str, language_lower: str) -> Optional[_Build]:
+    spec = BUILD_SPECS.get(language_lower)
+    if spec is None:
+        return None
+    main = _java_main_class(code) if language_lower == "java" else "main"
+    source_name = spec.source_name.format(main=main)
+    key = make_build_key(language_lower, spec.build, source_name, code)
+    return _Build(spec, key, source_name, main, limits_for(language_lower))
+
+
+def _write_build_source(build: _Build, workdir: str, code: str) -> None:
+    with open(os.path.join(workdir, build.source_name), "w", encoding="utf-8") as f:
+        f.write(code)
+
+
+def _write_source(code: str, language_lower: str) -> str:
+    """Writes code to a temporary file with the language's extension; returns its path."""
+    temp_file = tempfile.NamedTemporaryFile(
+        mode="w",
+        suffix=get_file_extension(language_lower),
+        delete=False,
+        encoding="utf-8"
+    )
+    temp_file.write(code)
+    temp_file.close()
+    return temp_file.name
+
+
+TIMEOUT_MESSAGE = "Execution timed out (possible infinite loop)."
+
+
+class ExecutionResult(NamedTuple):
+    """Raw outcome of one program run; run_code reduces it to pass/fail."""
+    returncode: Optional[int]    # None when the program did not run to completion
+    stdout: str = ""
+    stderr: str = ""
+    timed_out: bool = False
+    error: Optional[str] = None  # compile failure, missing runtime or sandbox error
+    supported: bool = True       # False when there is no way to execute the language
+    usage: Optional[Dict[str, float]] = None  # wall/user/sys time and peak RSS of the run
+
+
+def _failure_message(returncode: int, stdout: str, stderr: str) -> str:
+    # Never report an empty error: the graph treats "" as "nothing to fix".
+    message = stderr.strip() or stdout.strip()
+    note = signal_note(returncode)
+    if note is not None:
+        return f"{message}\n{note}".strip()
+    return message or f"Process exited with code {returncode} and no output."
+
+
+def verdict(result: ExecutionResult) -> Tuple[bool, str | None]:
+    """(True, None) if the run succeeded, (False, error_log) otherwise."""
+    if not result.supported:
+        return True, None  # Assume success if we can't test it
+    if result.timed_out:
+        return False, TIMEOUT_MESSAGE
+    if result.error is not None:
+        return False, result.error
+    if result.returncode != 0:
+        return False, _failure_message(result.returncode, result.stdout, result.stderr)
+    return True, None
+
+
+def _drain(pipe, sink: list) -> None:
+    sink.append(pipe.read(MAX_OUTPUT))
+    while pipe.read(65536):
+        pass
+    pipe.close()
+
+
+def _wait4(pid: int, timeout: float):
+    """Reaps the child (killing its session on timeout); returns (status, rusage, timed_out)."""
+    deadline = time.monotonic() + timeout
+    pidfd = os.pidfd_open(pid) if hasattr(os, "pidfd_open") else None
+    try:
+        while True:
+            wpid, status, rusage = os.wait4(pid, os.WNOHANG)
+            if wpid:
+                return status, rusage, False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                _, status, rusage = os.wait4(pid, 0)
+                return status, rusage, True
+            if pidfd is not None:
+                select.select([pidfd], [], [], remaining)
+            else:
+                time.sleep(min(remaining, 0.002))
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+
+def _spawn(cmd: list, cwd: Optional[str], limits: Optional[ResourceLimits]) -> Tuple[int, str, str, Dict[str, float]]:
+    """
+    Runs a program in its own session under `limits` and returns
+    (returncode, stdout, stderr, usage), usage coming from wait4 so it
+    covers exactly this child. Raises subprocess.TimeoutExpired after
+    killing the session when EXECUTION_TIMEOUT passes.
+    """
+    if not hasattr(os, "wait4"):  # Windows: no rusage, no rlimits
+        started = time.perf_counter()
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=EXECUTION_TIMEOUT, cwd=cwd)
+        return result.returncode, result.stdout, result.stderr, {"wall_time": time.perf_counter() - started}
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        limited_command(cmd, limits),
+        # never written to and closed once the program is reaped: a program
+        # waiting for input times out, like in a pooled run (not EOF at once)
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        start_new_session=True,  # so a timeout kills whatever the program forked
+    )
+    stdout: list = []
+    stderr: list = []
+    readers = [
+        threading.Thread(target=_drain, args=(proc.stdout, stdout), daemon=True),
+        threading.Thread(target=_drain, args=(proc.stderr, stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    try:
+        status, rusage, timed_out = _wait4(proc.pid, EXECUTION_TIMEOUT)
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        proc.stdin.close()
+    proc.returncode = os.waitstatus_to_exitcode(status)  # reaped here, Popen must not wait again
+    for reader in readers:
+        reader.join(1)  # a detached grandchild may still hold the pipes
+    if timed_out:
+        raise subprocess.TimeoutExpired(cmd, EXECUTION_TIMEOUT)
+
+    decode = lambda chunks: (chunks[0] if chunks else b"").decode("utf-8", errors="replace")
+    return proc.returncode, decode(stdout), decode(stderr), usage_from_rusage(rusage, time.perf_counter() - started)
+
+
+def _python_syntax_error(code: str) -> Optional[str]:
+    try:
+        compile(code, "main.py", "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as e:  # ValueError: source contains null bytes
+        return "".join(traceback.format_exception_only(type(e), e)).rstrip()
+    except (RecursionError, MemoryError):
+        pass  # too deeply nested to parse here; the full run will tell
+    return None
+
+
+def _syntax_check_command(code: str, language_lower: str) -> Optional[list]:
+    template = SYNTAX_CHECK_COMMANDS.get(language_lower)
+    if template is None:
+        return None
+    build = _plan_build(code, language_lower)
+    if build is not None and get_build_cache().lookup(build.key) is not None:
+        return None  # already compiled once: the build cache answers faster
+    return template
+
+
+def _syntax_failure(error: Optional[str], started: float) -> Optional[ExecutionResult]:
+    if error is None:
+        return None
+    return ExecutionResult(None, error=error, usage={"wall_time": time.perf_counter() - started, "stage": "syntax"})
+
+
+def check_syntax(code: str, language: str = "python") -> Optional[ExecutionResult]:
+    """
+    Cheap first test tier: an ExecutionResult carrying the syntax error when
+    the code does not parse, None when it does (or cannot be checked here,
+    e.g. the checker is not installed), in which case the program has to run.
+    """
+    language_lower = language.lower()
+    if not SYNTAX_CHECK:
+        return None
+    started = time.perf_counter()
+    if language_lower == "python":
+        return _syntax_failure(_python_syntax_error(code), started)
+
+    template = _syntax_check_command(code, language_lower)
+    if template is None:
+        return None
+    temp_path = _write_source(code, language_lower)
+    try:
+        with _sync_slots:
+            returncode, stdout, stderr, _ = _spawn([arg.format(src=temp_path) for arg in template], None,
+                                                   limits_for(language_lower))
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+    finally:
+        _cleanup(temp_path)
+    return _syntax_failure(None if returncode == 0 else _failure_message(returncode, stdout, stderr), started)
+
+
+def _record_usage(usage: dict, run_usage: Dict[str, float]) -> None:
+    """Hands the exact figures of a run to sandbox_timer (see metrics.py)."""
+    if "user_time" in run_usage:
+        usage["cpu_time"] = run_usage["user_time"] + run_usage["sys_time"]
+        usage["max_rss_kb"] = run_usage["max_rss_kb"]
+
+
+def _cleanup(temp_path: Optional[str]) -> None:
+    # Clean up temp file
+    if temp_path and os.path.exists(temp_path):
+        try:
+            os.remove(temp_path)
+        except:
+            pass
+
+
+def _build_sync(build: _Build, code: str) -> BuildEntry:
+    """Returns the cached build for this source, compiling it on a miss."""
+    cache = get_build_cache()
+    entry = cache.lookup(build.key)
+    if entry is not None:
+        return entry
+
+    workdir = cache.new_workdir()
+    try:
+        _write_build_source(build, workdir, code)
+        # the compiler gets the same limits and session as the program
+        returncode, stdout, stderr, _ = _spawn(build.command(build.spec.build, workdir), workdir, build.limits)
+    except BaseException:
+        cache.discard(workdir)
+        raise
+    ok = returncode == 0
+    return cache.commit(build.key, workdir, ok, None if ok else _failure_message(returncode, stdout, stderr))
+
+
 def run_code(code: str, language: str = "python", framework: Optional[str] = None) -> Tuple[bool, str | None]:
     """
     Executes code in a temporary file for the specified language.
@@ -72,88 +379,209 @@ def run_code(code: str, language: str = "python", framework: Optional[str] = Non
         (True, None) if execution succeeds
         (False, error_log) if execution fails
     """
+    return verdict(execute(code, language, framework))
+
+
+def execute(code: str, language: str = "python", framework: Optional[str] = None,
+            interpreter: Optional[str] = None) -> ExecutionResult:
+    """
+    Like run_code, but returns the program's exit code, output and resource
+    usage. Programs run under SANDBOX_LIMITS (see resource_limits.py).
+    `interpreter` replaces the default runtime of interpreted languages
+    (e.g. a Python 2 binary for legacy sources).
+    """
+    with _sync_slots, sandbox_timer(language.lower()) as usage:
+        return _execute(code, language, usage, interpreter)
+
+
+def _execute(code: str, language: str, usage: dict, interpreter: Optional[str] = None) -> ExecutionResult:
     language_lower = language.lower()
-    temp_file = None
+    temp_path = None
 
-    try:
-        # Get appropriate file extension
-        extension = get_file_extension(language_lower)
-        
-        # Create temporary file
-        temp_file = tempfile.NamedTemporaryFile(
-            mode="w",
-            suffix=extension,
-            delete=False,
-            encoding="utf-8"
-        )
+    if language_lower == "python" and PYTHON_POOL_SIZE > 0 and interpreter is None:
+        try:
+            return _run_pooled(code, usage)
+        except (PoolUnavailable, OSError):
+            pass  # fall back to spawning a fresh interpreter
 
-        temp_file.write(code)
-        temp_file.close()
-
-        # Get execution command
-        cmd = get_execution_command(language_lower, temp_file.name)
-        
-        if not cmd:
-            # Language not supported for execution
-            return True, None  # Assume success if we can't test it
-
-        # Handle compound commands (e.g., "javac file && java Class")
-        if "&&" in cmd:
-            # Split and run sequentially
-            parts = " && ".join(cmd).split(" && ")
-            for i, part in enumerate(parts):
-                part_cmd = part.strip().split()
-                result = subprocess.run(
-                    part_cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=EXECUTION_TIMEOUT,
-                    cwd=os.path.dirname(temp_file.name) if i == 0 else None
+    try:
+        build = _plan_build(code, language_lower)
+        if build is not None:
+            # Compiled language: build once per distinct source, then run the artifact
+            entry = _build_sync(build, code)
+            if not entry.ok:
+                return ExecutionResult(None, error=entry.error)
+            with tempfile.TemporaryDirectory() as run_dir:
+                returncode, stdout, stderr, run_usage = _spawn(
+                    build.command(build.spec.run, entry.path), run_dir, limits_for(language_lower)
                 )
-                if result.returncode != 0:
-                    return False, result.stderr.strip() or result.stdout.strip()
-            return True, None
         else:
-            # Simple command
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=EXECUTION_TIMEOUT
-            )
+            temp_path = _write_source(code, language_lower)
 
-            if result.returncode == 0:
-                return True, None
-            else:
-                return False, result.stderr.strip() or result.stdout.strip()
+            # Get execution command
+            cmd = get_execution_command(language_lower, temp_path)
+
+            if not cmd:
+                # Language not supported for execution
+                return ExecutionResult(None, supported=False)
+            if interpreter:
+                cmd = [interpreter] + cmd[1:]
+
+            returncode, stdout, stderr, run_usage = _spawn(cmd, None, limits_for(language_lower))
+
+        _record_usage(usage, run_usage)
+        return ExecutionResult(returncode, stdout, stderr, usage=run_usage)
 
     except subprocess.TimeoutExpired:
-        return False, "Execution timed out (possible infinite loop)."
+        return ExecutionResult(None, timed_out=True)
 
     except FileNotFoundError:
         # Interpreter/compiler not found
-        return False, f"Runtime environment for {language} not found. Please ensure the necessary interpreter/compiler is installed."
+        return ExecutionResult(None, error=f"Runtime environment for {language} not found. Please ensure the necessary interpreter/compiler is installed.")
 
     except Exception as e:
-        return False, f"Sandbox error: {str(e)}"
+        return ExecutionResult(None, error=f"Sandbox error: {str(e)}")
 
     finally:
-        # Clean up temp file
-        if temp_file and os.path.exists(temp_file.name):
-            try:
-                os.remove(temp_file.name)
-            except:
-                pass
-        # Clean up compiled executables if any
-        if temp_file:
-            base_name = os.path.splitext(temp_file.name)[0]
-            for ext in [".exe", ".class", ".out"]:
-                exe_path = base_name + ext
-                if os.path.exists(exe_path):
-                    try:
-                        os.remove(exe_path)
-                    except:
-                        pass
+        _cleanup(temp_path)
+
+
+def _get_async_slots() -> asyncio.Semaphore:
+    """One semaphore per event loop, all sized by SANDBOX_CONCURRENCY."""
+    loop = asyncio.get_running_loop()
+    slots = _async_slots.get(loop)
+    if slots is None:
+        slots = _async_slots[loop] = asyncio.Semaphore(SANDBOX_CONCURRENCY)
+    return slots
+
+
+async def _build_async(build: _Build, code: str) -> BuildEntry:
+    cache = get_build_cache()
+    entry = cache.lookup(build.key)
+    if entry is not None:
+        return entry
+
+    workdir = cache.new_workdir()
+    try:
+        _write_build_source(build, workdir, code)
+        returncode, stdout, stderr, _ = await asyncio.to_thread(
+            _spawn, build.command(build.spec.build, workdir), workdir, build.limits
+        )
+    except BaseException:
+        cache.discard(workdir)
+        raise
+    ok = returncode == 0
+    return await asyncio.to_thread(cache.commit, build.key, workdir, ok, None if ok else _failure_message(returncode, stdout, stderr))
+
+
+async def arun_code(code: str, language: str = "python", framework: Optional[str] = None) -> Tuple[bool, str | None]:
+    """
+    Non-blocking variant of run_code for use inside an event loop.
+
+    Programs and compilers run through the same _spawn as run_code (Python
+    programs on the warm pool), waited for on worker threads, and at most
+    SANDBOX_CONCURRENCY programs run at once per loop. Same arguments,
+    limits, stdin policy and result contract as run_code.
+    """
+    return verdict(await aexecute(code, language, framework))
+
+
+async def aexecute(code: str, language: str = "python", framework: Optional[str] = None,
+                   interpreter: Optional[str] = None) -> ExecutionResult:
+    """Non-blocking variant of execute."""
+    async with _get_async_slots():
+        with sandbox_timer(language.lower()) as usage:
+            return await _aexecute(code, language, usage, interpreter)
+
+
+async def _aexecute(code: str, language: str, usage: dict, interpreter: Optional[str] = None) -> ExecutionResult:
+    language_lower = language.lower()
+    temp_path = None
+
+    if language_lower == "python" and PYTHON_POOL_SIZE > 0 and interpreter is None:
+        try:
+            return await asyncio.to_thread(_run_pooled, code, usage)
+        except (PoolUnavailable, OSError):
+            pass  # fall back to spawning a fresh interpreter
+
+    try:
+        build = _plan_build(code, language_lower)
+        if build is not None:
+            entry = await _build_async(build, code)
+            if not entry.ok:
+                return ExecutionResult(None, error=entry.error)
+            with tempfile.TemporaryDirectory() as run_dir:
+                returncode, stdout, stderr, run_usage = await asyncio.to_thread(
+                    _spawn, build.command(build.spec.run, entry.path), run_dir, limits_for(language_lower)
+                )
+        else:
+            temp_path = _write_source(code, language_lower)
+            cmd = get_execution_command(language_lower, temp_path)
+
+            if not cmd:
+                return ExecutionResult(None, supported=False)
+            if interpreter:
+                cmd = [interpreter] + cmd[1:]
+
+            # a worker thread waits for the program so wait4 can report its usage
+            returncode, stdout, stderr, run_usage = await asyncio.to_thread(_spawn, cmd, None, limits_for(language_lower))
+
+        _record_usage(usage, run_usage)
+        return ExecutionResult(returncode, stdout, stderr, usage=run_usage)
+
+    except (asyncio.TimeoutError, subprocess.TimeoutExpired):
+        return ExecutionResult(None, timed_out=True)
+
+    except FileNotFoundError:
+        return ExecutionResult(None, error=f"Runtime environment for {language} not found. Please ensure the necessary interpreter/compiler is installed.")
+
+    except Exception as e:
+        return ExecutionResult(None, error=f"Sandbox error: {str(e)}")
+
+    finally:
+        _cleanup(temp_path)
+
+
+async def acheck_syntax(code: str, language: str = "python") -> Optional[ExecutionResult]:
+    """Non-blocking variant of check_syntax."""
+    language_lower = language.lower()
+    if not SYNTAX_CHECK:
+        return None
+    started = time.perf_counter()
+    if language_lower == "python":
+        return _syntax_failure(_python_syntax_error(code), started)
+
+    template = _syntax_check_command(code, language_lower)
+    if template is None:
+        return None
+    temp_path = _write_source(code, language_lower)
+    try:
+        async with _get_async_slots():
+            returncode, stdout, stderr, _ = await asyncio.to_thread(
+                _spawn, [arg.format(src=temp_path) for arg in template], None, limits_for(language_lower)
+            )
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+    finally:
+        _cleanup(temp_path)
+    return _syntax_failure(None if returncode == 0 else _failure_message(returncode, stdout, stderr), started)
+
+
+def _run_pooled(code: str, usage: Optional[dict] = None) -> ExecutionResult:
+    result = get_python_pool(PYTHON_POOL_SIZE).run(code, EXECUTION_TIMEOUT, rlimits(limits_for("python")), SANDBOX_CGROUP)
+    run_usage = {key: result[key] for key in ("wall_time", "user_time", "sys_time", "max_rss_kb")}
+    if usage is not None:
+        _record_usage(usage, run_usage)
+    return ExecutionResult(result["returncode"], result["stdout"], result["stderr"], result["timed_out"], usage=run_usage)
+
+
+def run_python_pooled(code: str, usage: Optional[dict] = None) -> Tuple[bool, str | None]:
+    """
+    Executes Python code in a child forked from a pre-started interpreter.
+    Same result contract as run_code; the child's exact CPU time is written
+    to usage["cpu_time"] when a dict is given.
+    """
+    return verdict(_run_pooled(code, usage))
 
 
 def run_python_code(code: str) -> Tuple[bool, str | None]:
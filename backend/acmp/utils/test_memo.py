@@ -0,0 +1,86 @@
+# acmp/utils/test_memo.py
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+TEST_MEMO_SIZE = int(os.getenv("ACMP_TEST_MEMO_SIZE", "1024"))
+
+_TEMP_PATH_RE = re.compile(re.escape(tempfile.gettempdir()) + r"/[^\s\"',:]+")
+_LINE_RE = re.compile(r"\bline \d+")
+_POSITION_RE = re.compile(r":\d+(?::\d+)?(?=[:\s)]|$)")  # file.c:12:5: / Main.java:7 / (file.js:3:9)
+_ADDRESS_RE = re.compile(r"0x[0-9a-fA-F]+")
+_ERROR_LINE_RE = re.compile(r"(Error|Exception|error:|error\[|panicked|Traceback)")
+
+
+def memo_key(code: str, language: Optional[str], framework: Optional[str]) -> str:
+    h = hashlib.sha256()
+    for part in (language or "", framework or "", code):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def error_signature(error: Optional[str]) -> Optional[str]:
+    """
+    What an error "is", independent of where the sandbox happened to put the
+    file and which line it ended up on: temp paths, line/column numbers and
+    addresses are masked, and only the lines naming an error are kept
+    (the last line when none do).
+    """
+    if error is None:
+        return None
+    text = _TEMP_PATH_RE.sub("<tmp>", error)
+    text = _LINE_RE.sub("line N", text)
+    text = _POSITION_RE.sub(":N", text)
+    text = _ADDRESS_RE.sub("0xADDR", text)
+
+    lines = [" ".join(line.split()) for line in text.splitlines() if line.strip()]
+    errors = [line for line in lines if _ERROR_LINE_RE.search(line) and line != "Traceback (most recent call last):"]
+    return "\n".join(errors or lines[-1:])
+
+
+class TestMemo:
+    """
+    Bounded LRU of sandbox results keyed by memo_key(code, language,
+    framework): an optimizer that hands back code that was already tested
+    gets the earlier result without another run. Callers decide what is
+    worth storing (see agents/tester.py).
+    """
+
+    def __init__(self, max_entries: int = TEST_MEMO_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+test_memo = TestMemo()
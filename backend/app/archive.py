@@ -0,0 +1,243 @@
+import asyncio
+import json
+import os
+import tarfile
+import tempfile
+import time
+import uuid
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Any, AsyncGenerator, Dict, Iterator, List, Optional, Tuple
+
+from acmp.utils.file_loader import LANGUAGE_BY_EXTENSION, is_supported_file
+from services import modernization_events, result_from_events
+
+# Whole-project uploads.
+#
+# A zip or tar archive is read member by member (never unpacked to disk),
+# supported source files are run through the graph concurrently, and the
+# per-file events are multiplexed into one stream, each tagged with its
+# "file_path". The modernized files are then packed into a zip that can be
+# downloaded from /api/projects/{project_id}/download.
+
+ARCHIVE_WORKERS = int(os.getenv("ACMP_ARCHIVE_WORKERS", "4"))
+MAX_UPLOAD_BYTES = int(os.getenv("ACMP_ARCHIVE_MAX_BYTES", str(200 * 1024 * 1024)))
+MAX_FILE_BYTES = int(os.getenv("ACMP_ARCHIVE_MAX_FILE_BYTES", str(1024 * 1024)))
+MAX_FILES = int(os.getenv("ACMP_ARCHIVE_MAX_FILES", "2000"))
+RESULT_RETENTION = float(os.getenv("ACMP_ARCHIVE_RETENTION", "3600"))  # seconds a result zip is kept
+
+REPORT_NAME = "acmp_report.json"
+
+# (path inside the archive, source code or None, reason the file was skipped or None)
+Member = Tuple[str, Optional[str], Optional[str]]
+
+
+def safe_member_path(name: str) -> Optional[str]:
+    """
+    Normalized relative path of an archive member, or None when the name
+    could escape the output tree (absolute paths, drive letters, "..").
+    """
+    path = PurePosixPath(name.replace("\\", "/"))
+    if path.is_absolute() or not path.parts or ".." in path.parts or ":" in path.parts[0]:
+        return None
+    parts = [p for p in path.parts if p not in ("", ".")]
+    return "/".join(parts) or None
+
+
+def _read_limited(fileobj) -> Optional[bytes]:
+    # sizes in archive headers can lie, so the limit is enforced on the data itself
+    data = fileobj.read(MAX_FILE_BYTES + 1)
+    return None if len(data) > MAX_FILE_BYTES else data
+
+
+def _member(name: str, read) -> Optional[Member]:
+    if not is_supported_file(name):
+        return None
+    path = safe_member_path(name)
+    if path is None:
+        return (name, None, "unsafe path")
+    data = read()
+    if data is None:
+        return (path, None, f"larger than {MAX_FILE_BYTES} bytes")
+    try:
+        return (path, data.decode("utf-8"), None)
+    except UnicodeDecodeError:
+        return (path, None, "not UTF-8 text")
+
+
+def _zip_members(path: str) -> Iterator[Member]:
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            if (info.external_attr >> 16) & 0o170000 == 0o120000:
+                continue  # symlink
+            with archive.open(info) as f:
+                member = _member(info.filename, lambda: _read_limited(f))
+            if member is not None:
+                yield member
+
+
+def _tar_members(path: str) -> Iterator[Member]:
+    # "r|*" reads the tar as a stream (any compression), one member at a time
+    with tarfile.open(path, mode="r|*") as archive:
+        for info in archive:
+            if not info.isfile():
+                continue  # directories, links, devices
+            member = _member(info.name, lambda: _read_limited(archive.extractfile(info)))
+            if member is not None:
+                yield member
+
+
+def iter_archive(path: str) -> Iterator[Member]:
+    """Supported source files of a zip/tar archive, at most MAX_FILES of them."""
+    if zipfile.is_zipfile(path):
+        members = _zip_members(path)
+    elif tarfile.is_tarfile(path):
+        members = _tar_members(path)
+    else:
+        raise ValueError("Unsupported archive: expected a .zip or .tar(.gz/.bz2/.xz) file.")
+
+    count = 0
+    for member in members:
+        if member[1] is not None:
+            count += 1
+            if count > MAX_FILES:
+                yield (member[0], None, f"over the limit of {MAX_FILES} files per archive")
+                continue
+        yield member
+
+
+# project_id -> (result zip path, created at)
+_results: Dict[str, Tuple[str, float]] = {}
+
+
+def _purge_results() -> None:
+    cutoff = time.time() - RESULT_RETENTION
+    for project_id, (path, created) in list(_results.items()):
+        if created < cutoff:
+            _results.pop(project_id, None)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def result_archive_path(project_id: str) -> Optional[str]:
+    _purge_results()
+    entry = _results.get(project_id)
+    return entry[0] if entry else None
+
+
+def _write_result_archive(project_id: str, results: List[Dict[str, Any]], skipped: List[Dict[str, str]]) -> str:
+    fd, path = tempfile.mkstemp(prefix=f"acmp-project-{project_id}-", suffix=".zip")
+    with os.fdopen(fd, "wb") as f, zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as archive:
+        for result in results:
+            if result["success"] and result["current_code"] is not None:
+                archive.writestr(result["file_name"], result["current_code"])
+        report = {
+            "files": [{key: value for key, value in result.items() if key != "current_code"} for result in results],
+            "skipped": skipped,
+        }
+        archive.writestr(REPORT_NAME, json.dumps(report, indent=2))
+    return path
+
+
+async def project_events(archive_path: str, language: Optional[str], framework: str,
+                         workers: int = ARCHIVE_WORKERS) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Modernizes every supported file of an archive, `workers` files at a
+    time, and yields their events interleaved. Besides the per-file
+    "token"/"update"/"summary" events it emits "file_result" when a file is
+    done and a final "project" event with the download location.
+
+    Members are only read from the archive when a worker is free, so memory
+    stays bounded by `workers` files however large the upload is.
+    """
+    project_id = uuid.uuid4().hex
+    events: asyncio.Queue = asyncio.Queue()
+    slots = asyncio.Semaphore(max(1, workers))
+    results: List[Dict[str, Any]] = []
+    skipped: List[Dict[str, str]] = []
+    done = object()
+
+    async def run_file(file_path: str, code: str) -> None:
+        file_language = language or LANGUAGE_BY_EXTENSION.get(Path(file_path).suffix)
+        request = {"file_name": file_path, "language": file_language, "framework": framework}
+        seen = []
+        error = None
+        try:
+            async for event in modernization_events(file_path, code, file_language, framework):
+                if "error" in event:
+                    error = event["error"]
+                    break
+                if event.get("event") != "token":
+                    seen.append(event)
+                await events.put(event)
+        finally:
+            slots.release()
+        result = result_from_events(seen, request)
+        result["error"] = error
+        if error is not None:
+            result["success"] = False
+        results.append(result)
+        await events.put({
+            "event": "file_result",
+            "file_path": file_path,
+            "success": result["success"],
+            "error": error or (None if result["success"] else result["error_logs"]),
+        })
+
+    async def produce() -> None:
+        tasks = []
+        try:
+            members = iter_archive(archive_path)
+            while True:
+                await slots.acquire()
+                member = await asyncio.to_thread(next, members, None)
+                if member is None:
+                    slots.release()
+                    break
+                file_path, code, reason = member
+                if reason is not None:
+                    slots.release()
+                    skipped.append({"file_path": file_path, "reason": reason})
+                    await events.put({"event": "file_skipped", "file_path": file_path, "reason": reason})
+                    continue
+                tasks.append(asyncio.create_task(run_file(file_path, code)))
+            await asyncio.gather(*tasks)
+        except Exception as e:
+            await events.put({"error": str(e)})
+        finally:
+            for task in tasks:
+                task.cancel()
+        await events.put(done)
+
+    yield {"event": "project_started", "project_id": project_id}
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            event = await events.get()
+            if event is done:
+                break
+            yield event
+            if "error" in event and "file_path" not in event:
+                return
+    finally:
+        # the client went away (or the archive was unreadable): stop all runs
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+    path = await asyncio.to_thread(_write_result_archive, project_id, results, skipped)
+    _purge_results()
+    _results[project_id] = (path, time.time())
+    succeeded = sum(1 for result in results if result["success"])
+    yield {
+        "event": "project",
+        "project_id": project_id,
+        "files": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "skipped": skipped,
+        "download": f"/api/projects/{project_id}/download",
+    }
@@ -0,0 +1,472 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, AsyncGenerator, AsyncIterable, Dict, List, Optional
+
+from services import discard_run, modernization_events, result_from_events
+
+# Background modernization jobs.
+#
+# POST /api/jobs puts a request on a JobQueue and returns its id at once; a
+# JobWorkerPool running inside the API process executes queued jobs through
+# the same event generator the /modernize stream uses and appends every
+# event to the job's log, which clients can read (and re-read) from any
+# sequence number. Token events are logged in batches and dropped once the
+# job finishes. The job id is the pipeline's checkpoint run ID: with the SQLite
+# queue, a job interrupted by a shutdown or crash is queued again when the
+# API starts and resumes after its last completed graph node; a job that
+# ends FAILED has its checkpoints dropped.
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"  # the pipeline ran to the end (see result["success"])
+FAILED = "failed"        # the pipeline raised
+
+FINISHED = (COMPLETED, FAILED)
+
+JOB_QUEUE = os.getenv("ACMP_JOB_QUEUE", "memory")  # "memory" | "sqlite"
+JOB_DB = os.getenv("ACMP_JOB_DB", str(Path.home() / ".cache" / "acmp" / "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("ACMP_JOB_WORKERS", "4"))
+JOB_RETENTION = float(os.getenv("ACMP_JOB_RETENTION", "3600"))  # seconds a finished job is kept
+# Consecutive LLM tokens of one node are logged as one event per this many seconds.
+JOB_TOKEN_INTERVAL = float(os.getenv("ACMP_JOB_TOKEN_INTERVAL", "0.1"))
+# Requeue jobs left running by a stopped process on startup ("on"/"off"). Turn
+# off when several processes share the SQLite queue: another live process's
+# running jobs look the same.
+JOB_RECOVER = os.getenv("ACMP_JOB_RECOVER", "on").lower() != "off"
+
+
+def _new_job(request: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "request": request,
+        "result": None,
+        "error": None,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+    }
+
+
+class JobQueue(ABC):
+    """
+    Storage and hand-off of jobs. Workers claim queued jobs, append events
+    and finish them; API handlers submit, inspect and read event logs.
+    """
+
+    durable = False  # whether jobs outlive the API process
+
+    async def requeue_interrupted(self) -> int:
+        """Puts jobs left running by a stopped process back on the queue; returns how many."""
+        return 0
+
+    @abstractmethod
+    async def submit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Stores a new queued job and returns it."""
+
+    @abstractmethod
+    async def claim(self) -> Dict[str, Any]:
+        """Waits for a queued job, marks it running and returns it."""
+
+    @abstractmethod
+    async def append_event(self, job_id: str, event: Dict[str, Any]) -> int:
+        """Appends to the job's event log and returns the event's sequence number."""
+
+    @abstractmethod
+    async def finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        """Records the outcome and drops the job's token events."""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job, with "events" set to the sequence number its next event gets."""
+
+    @abstractmethod
+    async def events(self, job_id: str, start: int) -> List[Dict[str, Any]]:
+        """Events with sequence number >= start, each with its "seq" (numbers may have gaps)."""
+
+    @abstractmethod
+    async def wait_for_events(self, job_id: str, start: int, timeout: float) -> None:
+        """Returns once the job has an event >= start, has finished, or `timeout` passed."""
+
+
+class InProcessJobQueue(JobQueue):
+    """Single-node queue: everything lives in this process's memory."""
+
+    def __init__(self, retention: float = JOB_RETENTION):
+        self.retention = retention
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._events: Dict[str, List[Dict[str, Any]]] = {}
+        self._next_seq: Dict[str, int] = {}
+        self._pending: Optional[asyncio.Queue] = None
+        self._changed: Dict[str, asyncio.Event] = {}
+
+    def _queue(self) -> asyncio.Queue:
+        if self._pending is None:
+            self._pending = asyncio.Queue()
+        return self._pending
+
+    def _notify(self, job_id: str) -> None:
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.retention
+        for job_id in [j for j, job in self._jobs.items() if job["finished_at"] and job["finished_at"] < cutoff]:
+            self._jobs.pop(job_id, None)
+            self._events.pop(job_id, None)
+            self._next_seq.pop(job_id, None)
+
+    async def submit(self, request):
+        self._purge()
+        job = _new_job(request)
+        self._jobs[job["job_id"]] = job
+        self._events[job["job_id"]] = []
+        self._next_seq[job["job_id"]] = 0
+        self._queue().put_nowait(job["job_id"])
+        return dict(job)
+
+    async def claim(self):
+        while True:
+            job = self._jobs.get(await self._queue().get())
+            if job is not None and job["status"] == QUEUED:
+                job.update(status=RUNNING, started_at=time.time())
+                return dict(job)
+
+    async def append_event(self, job_id, event):
+        seq = self._next_seq[job_id]
+        self._next_seq[job_id] = seq + 1
+        self._events[job_id].append({**event, "seq": seq})
+        self._notify(job_id)
+        return seq
+
+    async def finish(self, job_id, status, result, error):
+        self._jobs[job_id].update(status=status, result=result, error=error, finished_at=time.time())
+        self._events[job_id] = [e for e in self._events[job_id] if e.get("event") != "token"]
+        self._notify(job_id)
+
+    async def get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return {**job, "events": self._next_seq.get(job_id, 0)}
+
+    async def events(self, job_id, start):
+        log = self._events.get(job_id, [])
+        return log[bisect_left(log, start, key=lambda e: e["seq"]):]
+
+    async def wait_for_events(self, job_id, start, timeout):
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] in FINISHED or self._next_seq.get(job_id, 0) > start:
+            return
+        changed = self._changed.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Queue in a SQLite file. Several API processes (or hosts sharing the
+    file) can submit to and work off the same queue, which makes it the
+    local stand-in for a real broker in multi-node deployments; readers
+    poll for new events.
+    """
+
+    POLL_INTERVAL = 0.25
+    durable = True
+
+    def __init__(self, path: str = JOB_DB, retention: float = JOB_RETENTION):
+        self.path = Path(path)
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, created_at);
+                CREATE TABLE IF NOT EXISTS events (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                );
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def _run(self, func, *args):
+        return asyncio.to_thread(self._locked, func, *args)
+
+    def _locked(self, func, *args):
+        with self._lock:
+            return func(self._connect(), *args)
+
+    @staticmethod
+    def _row(row) -> Dict[str, Any]:
+        job_id, status, request, result, error, created_at, started_at, finished_at = row
+        return {
+            "job_id": job_id,
+            "status": status,
+            "request": json.loads(request),
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+
+    def _submit(self, conn, job):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cutoff = time.time() - self.retention
+            conn.execute("DELETE FROM events WHERE job_id IN (SELECT job_id FROM jobs WHERE finished_at < ?)", (cutoff,))
+            conn.execute("DELETE FROM jobs WHERE finished_at < ?", (cutoff,))
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, request, created_at) VALUES (?, ?, ?, ?)",
+                (job["job_id"], job["status"], json.dumps(job["request"]), job["created_at"]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def submit(self, request):
+        job = _new_job(request)
+        await self._run(self._submit, job)
+        return job
+
+    def _claim(self, conn):
+        # BEGIN IMMEDIATE takes the write lock, so two workers never claim the same job
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute("UPDATE jobs SET status = ?, started_at = ? WHERE job_id = ?", (RUNNING, time.time(), row[0]))
+            job = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row[0],)).fetchone()
+            conn.execute("COMMIT")
+            return self._row(job)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _requeue(self, conn):
+        cur = conn.execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING))
+        return cur.rowcount
+
+    async def requeue_interrupted(self):
+        return await self._run(self._requeue)
+
+    async def claim(self):
+        while True:
+            job = await self._run(self._claim)
+            if job is not None:
+                return job
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+    @staticmethod
+    def _next_seq(conn, job_id):
+        # the (job_id, seq) primary key answers this without scanning the log
+        return conn.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM events WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+    def _append(self, conn, job_id, event):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            seq = self._next_seq(conn, job_id)
+            conn.execute("INSERT INTO events (job_id, seq, payload) VALUES (?, ?, ?)", (job_id, seq, json.dumps(event)))
+            conn.execute("COMMIT")
+            return seq
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def append_event(self, job_id, event):
+        return await self._run(self._append, job_id, event)
+
+    def _finish(self, conn, job_id, status, result, error):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE job_id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+            )
+            conn.execute("DELETE FROM events WHERE job_id = ? AND json_extract(payload, '$.event') = 'token'", (job_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def finish(self, job_id, status, result, error):
+        await self._run(self._finish, job_id, status, result, error)
+
+    def _get(self, conn, job_id):
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {**self._row(row), "events": self._next_seq(conn, job_id)}
+
+    async def get(self, job_id):
+        return await self._run(self._get, job_id)
+
+    def _events(self, conn, job_id, start):
+        rows = conn.execute(
+            "SELECT seq, payload FROM events WHERE job_id = ? AND seq >= ? ORDER BY seq", (job_id, start)
+        ).fetchall()
+        return [{**json.loads(payload), "seq": seq} for seq, payload in rows]
+
+    async def events(self, job_id, start):
+        return await self._run(self._events, job_id, start)
+
+    async def wait_for_events(self, job_id, start, timeout):
+        await asyncio.sleep(min(timeout, self.POLL_INTERVAL))
+
+
+class JobWorkerPool:
+    """`workers` asyncio tasks that each run one job at a time."""
+
+    def __init__(self, queue: JobQueue, workers: int = JOB_WORKERS):
+        self.queue = queue
+        self.workers = max(1, workers)
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work(), name=f"acmp-job-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        while True:
+            job = await self.queue.claim()
+            await self.run(job)
+
+    async def run(self, job: Dict[str, Any]) -> None:
+        request = job["request"]
+        job_id = job["job_id"]
+        # a requeued job resumes its run: keep what the interrupted attempt logged
+        seen = [e for e in await self.queue.events(job_id, 0) if e.get("event") not in (None, "token")]
+        events = modernization_events(
+            request["file_name"], request["code"], request["language"], request.get("framework"), run_id=job_id
+        )
+        try:
+            # tokens are logged too, so a reader that reattaches mid-run can rebuild drafts
+            async for event in coalesce_tokens(events):
+                if "error" in event:
+                    raise RuntimeError(event["error"])
+                event = {**event, "job_id": job_id}
+                await self.queue.append_event(job_id, event)
+                if event.get("event") != "token":
+                    seen.append(event)
+        except asyncio.CancelledError:
+            if not (self.queue.durable and JOB_RECOVER):
+                await self.queue.finish(job_id, FAILED, None, "Server shut down while the job was running.")
+                await discard_run(job_id)
+            raise  # else left running, so the next start requeues and resumes it
+        except Exception as e:
+            await self.queue.append_event(job_id, {"error": str(e), "job_id": job_id})
+            await self.queue.finish(job_id, FAILED, None, str(e))
+            await discard_run(job_id)  # a failed job is never resumed
+            return
+        await self.queue.finish(job_id, COMPLETED, result_from_events(seen, request), None)
+
+
+async def coalesce_tokens(events: AsyncIterable[Dict[str, Any]], interval: float = JOB_TOKEN_INTERVAL) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    `events` with consecutive token events of the same node (and chunk)
+    merged into one per `interval` seconds, so a job's log grows with its
+    updates rather than with every generated token.
+    """
+    pending: Optional[Dict[str, Any]] = None
+    deltas: List[str] = []
+    started = 0.0
+
+    def merged() -> Dict[str, Any]:
+        return {**pending, "delta": "".join(deltas)}
+
+    async for event in events:
+        if event.get("event") != "token":
+            if pending is not None:
+                yield merged()
+                pending = None
+            yield event
+            continue
+        if pending is not None and (pending["node"], pending.get("chunk")) != (event["node"], event.get("chunk")):
+            yield merged()
+            pending = None
+        if pending is None:
+            pending, deltas, started = event, [], time.monotonic()
+        deltas.append(event["delta"])
+        if time.monotonic() - started >= interval:
+            yield merged()
+            pending = None
+    if pending is not None:
+        yield merged()
+
+
+async def job_events(queue: JobQueue, job_id: str, start: int = 0) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Events of a job from sequence number `start` on, following the log
+    live until the job finishes. Safe to call again after a disconnect.
+    """
+    position = start
+    while True:
+        events = await queue.events(job_id, position)
+        for event in events:
+            yield event
+            position = event["seq"] + 1
+        if events:
+            continue
+        job = await queue.get(job_id)
+        if job is None or (job["status"] in FINISHED and job["events"] <= position):
+            return
+        await queue.wait_for_events(job_id, position, timeout=15)
+
+
+def create_job_queue(kind: str = JOB_QUEUE) -> JobQueue:
+    if kind == "sqlite":
+        return SQLiteJobQueue()
+    if kind == "memory":
+        return InProcessJobQueue()
+    raise ValueError(f"Unknown job queue backend: {kind!r} (expected 'memory' or 'sqlite')")
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        _queue = create_job_queue()
+    return _queue
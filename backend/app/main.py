@@ -11,11 +11,30 @@ if ROOT_PATH not in sys.path:
     sys.path.append(ROOT_PATH)
 
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from jobs import JOB_RECOVER, JobWorkerPool, get_job_queue
 from routes import router
 
-app = FastAPI(title="ACMP Backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background workers for /api/jobs (ACMP_JOB_WORKERS of them)
+    queue = get_job_queue()
+    if JOB_RECOVER:
+        # jobs interrupted by the last shutdown/crash resume from their checkpoints
+        await queue.requeue_interrupted()
+    pool = JobWorkerPool(queue)
+    pool.start()
+    try:
+        yield
+    finally:
+        await pool.stop()
+
+
+app = FastAPI(title="ACMP Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,6 +46,12 @@ app.add_middleware(
 
 app.include_router(router, prefix="/api")
 
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus scrape endpoint (node latency, LLM tokens, sandbox time histograms)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
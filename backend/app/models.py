@@ -6,6 +6,9 @@ class ModernizeRequest(BaseModel):
     code: str  # The raw source code from the frontend
     language : str
     framework : Optional[str] = "None"
+    # Stream options: diffs instead of full code on updates, gzip the SSE body
+    delta : bool = False
+    compress : bool = False
 
 class SaveRequest(BaseModel):
     file_path: str
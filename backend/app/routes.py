@@ -1,14 +1,138 @@
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+from fastapi import APIRouter, File, Form, Header, HTTPException, Query, Request, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
+from archive import MAX_UPLOAD_BYTES, project_events, result_archive_path
+from jobs import FINISHED, get_job_queue, job_events
 from models import ModernizeRequest
 from services import run_modernization_stream
+from streaming import SSE_HEADERS, encode_events, gzip_stream
 
 router = APIRouter()
 
 @router.post("/modernize")
-async def modernize_code(request: ModernizeRequest):
+async def modernize_code(request: ModernizeRequest, http_request: Request):
     # We pass file_name and code directly to the service
+    stream = run_modernization_stream(request.file_name, request.code, request.language, request.framework, delta=request.delta)
+    headers = dict(SSE_HEADERS)
+
+    if request.compress and "gzip" in http_request.headers.get("accept-encoding", ""):
+        stream = gzip_stream(stream)
+        headers["Content-Encoding"] = "gzip"
+
     return StreamingResponse(
-        run_modernization_stream(request.file_name, request.code, request.language, request.framework),
-        media_type="text/event-stream"
-    )
\ No newline at end of file
+        stream,
+        media_type="text/event-stream",
+        headers=headers
+    )
+
+
+def _public(job):
+    return {key: job[key] for key in ("job_id", "status", "error", "created_at", "started_at", "finished_at", "events") if key in job}
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(request: ModernizeRequest):
+    # Returns immediately; progress is read from /jobs/{id}/events
+    job = await get_job_queue().submit({
+        "file_name": request.file_name,
+        "code": request.code,
+        "language": request.language,
+        "framework": request.framework,
+    })
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+
+async def _get_job(job_id: str):
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job (it may have expired).")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    return _public(await _get_job(job_id))
+
+
+@router.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = await _get_job(job_id)
+    if job["status"] not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}.")
+    return {**_public(job), "result": job["result"]}
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    http_request: Request,
+    start: int = Query(0, alias="from", ge=0),
+    delta: bool = False,
+    compress: bool = False,
+    last_event_id: Optional[str] = Header(None),
+):
+    await _get_job(job_id)
+    # EventSource reconnects send the id of the last frame they saw
+    if last_event_id is not None and last_event_id.isdigit():
+        start = max(start, int(last_event_id) + 1)
+
+    stream = encode_events(job_events(get_job_queue(), job_id, start), delta=delta)
+    headers = dict(SSE_HEADERS)
+
+    if compress and "gzip" in http_request.headers.get("accept-encoding", ""):
+        stream = gzip_stream(stream)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(stream, media_type="text/event-stream", headers=headers)
+
+
+async def _remove_after(events, path: str):
+    try:
+        async for event in events:
+            yield event
+    finally:
+        os.unlink(path)
+
+
+@router.post("/projects")
+async def modernize_project(
+    http_request: Request,
+    archive: UploadFile = File(...),
+    language: Optional[str] = Form(None),
+    framework: Optional[str] = Form("None"),
+    delta: bool = Form(False),
+    compress: bool = Form(False),
+):
+    # Copy the upload out in chunks; it is read member by member while the stream runs
+    suffix = "".join(Path(archive.filename or "").suffixes[-2:])
+    fd, path = tempfile.mkstemp(prefix="acmp-upload-", suffix=suffix)
+    size = 0
+    with os.fdopen(fd, "wb") as f:
+        while chunk := await archive.read(1024 * 1024):
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                f.close()
+                os.unlink(path)
+                raise HTTPException(status_code=413, detail=f"Archive is larger than {MAX_UPLOAD_BYTES} bytes.")
+            f.write(chunk)
+
+    events = _remove_after(project_events(path, language, framework), path)
+    stream = encode_events(events, delta=delta)
+    headers = dict(SSE_HEADERS)
+
+    if compress and "gzip" in http_request.headers.get("accept-encoding", ""):
+        stream = gzip_stream(stream)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(stream, media_type="text/event-stream", headers=headers)
+
+
+@router.get("/projects/{project_id}/download")
+async def download_project(project_id: str):
+    path = result_archive_path(project_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Unknown project (it may have expired).")
+    return FileResponse(path, media_type="application/zip", filename=f"modernized_{project_id}.zip")
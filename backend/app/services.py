@@ -1,12 +1,34 @@
-import json
-import asyncio
-from typing import AsyncGenerator, cast
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional, cast
 from acmp.graph import graph
 from acmp.state import AgentState
+from acmp.utils.checkpoint import afinish_run, astart_input, new_run_id, run_config
+from acmp.utils.metrics import summarize_run
+from streaming import encode_events
+
+# Nodes whose LLM output is code worth showing while it is being generated.
+TOKEN_STREAM_NODES = {"engineer", "optimizer"}
+
+TIMEOUT_MESSAGE = "Execution timed out (possible infinite loop)."
+
+
+async def modernization_events(file_name: str, code: str, language: str, framework: str,
+                               run_id: Optional[str] = None) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Runs the graph for a single uploaded file string and yields its events.
+
+    With a `run_id`, an earlier run under that ID that was interrupted is
+    resumed after its last completed node (only the remaining nodes yield
+    events) and its checkpoints are kept until it finishes; without one
+    the run is checkpointed under a throwaway ID.
+
+    Emits two kinds of events:
+      - "update": a node finished (full node output, as before)
+      - "token":  an incremental slice of the engineer/optimizer completion
+                  (with a "chunk" index when a large file is split)
+    and a final "summary" event with per-node timings of the run.
+    """
 
-async def run_modernization_stream(file_name: str, code: str, language: str, framework:str) -> AsyncGenerator[str, None]:
-    """Streams graph updates for a single uploaded file string."""
-    
     # Initial state using the code provided by the frontend
     state: AgentState = {
         "file_path": file_name,
@@ -15,18 +37,57 @@ async def run_modernization_stream(file_name: str, code: str, language: str, fra
         "framework" : framework,
         "language_version": None,
         "framework_version": None,
+        "preprocessed_code": None,
+        "prefilled_patterns": None,
         "transformation_plan": None,
         "current_code": None,
         "error_logs": None,
         "itr": 0,
+        "test_attempts": [],
+        "stop_reason": None,
+        "calls_saved": None,
+        "baseline": None,
+        "execution_stats": None,
+        "routing": [],
+        "run_metrics": [],
     }
 
+    started = time.perf_counter()
+    run_metrics = []
+    stop_reason = None
+    calls_saved = None
+    resumable = run_id is not None
+    run_id = run_id or new_run_id()
+    finished = False
+
     try:
-        # Stream node updates using LangGraph
-        async for chunk in graph.astream(cast(AgentState, state), stream_mode="updates"):
+        inputs = await astart_input(graph, cast(AgentState, state), run_id)
+        # "updates" gives whole node outputs, "messages" the LLM tokens as they arrive
+        async for mode, chunk in graph.astream(inputs, run_config(run_id), stream_mode=["updates", "messages"]):
+            if mode == "messages":
+                message, metadata = chunk
+                node_name = metadata.get("langgraph_node")
+                if node_name in TOKEN_STREAM_NODES and message.content:
+                    payload = {
+                        "event": "token",
+                        "node": node_name,
+                        "file_path": file_name,
+                        "delta": message.content,
+                    }
+                    if "acmp_chunk" in metadata:
+                        # large files stream several sections at once
+                        payload["chunk"] = metadata["acmp_chunk"]
+                    yield payload
+                continue
+
             # print("UPDATE : \n",chunk)
             for node_name, node_data in chunk.items():
+                run_metrics = node_data.get("run_metrics") or run_metrics
+                if node_name == "tester":
+                    stop_reason = node_data.get("stop_reason")
+                    calls_saved = node_data.get("calls_saved") or calls_saved
                 payload = {
+                    "event": "update",
                     "node": node_name,
                     "file_path": file_name,
                     "current_code": node_data.get("current_code"),
@@ -35,9 +96,61 @@ async def run_modernization_stream(file_name: str, code: str, language: str, fra
                     "language": node_data.get("language", language),
                     "language_version": node_data.get("language_version"),
                     "framework": node_data.get("framework", framework),
-                    "framework_version": node_data.get("framework_version")
+                    "framework_version": node_data.get("framework_version"),
+                    "execution_stats": node_data.get("execution_stats") if node_name == "tester" else None,
                 }
-                yield f"data: {json.dumps(payload)}\n\n"
-                await asyncio.sleep(0.1)
+                yield payload
+
+        finished = True
+        yield {
+            "event": "summary",
+            "file_path": file_name,
+            "total_time": time.perf_counter() - started,
+            "stop_reason": stop_reason,
+            "calls_saved": calls_saved,
+            **summarize_run(run_metrics),
+        }
     except Exception as e:
-        yield f"data: {json.dumps({'error': str(e)})}\n\n"
\ No newline at end of file
+        yield {"error": str(e)}
+    finally:
+        if finished or not resumable:
+            await afinish_run(graph, run_id)
+
+
+async def discard_run(run_id: str) -> None:
+    """Drops the checkpoints of a run that will not be resumed (e.g. a job that failed)."""
+    await afinish_run(graph, run_id)
+
+
+def result_from_events(events: List[Dict[str, Any]], request: Dict[str, Any]) -> Dict[str, Any]:
+    """Final outcome of a run, folded from its update events."""
+    result: Dict[str, Any] = {
+        "file_name": request["file_name"],
+        "current_code": None,
+        "error_logs": None,
+        "language": request.get("language"),
+        "language_version": None,
+        "framework": request.get("framework"),
+        "framework_version": None,
+        "summary": None,
+    }
+    tested = False
+    for event in events:
+        if event.get("event") == "update":
+            if event.get("current_code") is not None:
+                result["current_code"] = event["current_code"]
+            for key in ("language", "language_version", "framework", "framework_version"):
+                if event.get(key) is not None:
+                    result[key] = event[key]
+            if event["node"] == "tester":
+                tested = True
+                result["error_logs"] = event.get("error_logs")
+        elif event.get("event") == "summary":
+            result["summary"] = event
+    result["success"] = tested and result["error_logs"] in (None, TIMEOUT_MESSAGE)
+    return result
+
+
+def run_modernization_stream(file_name: str, code: str, language: str, framework: str, delta: bool = False) -> AsyncGenerator[str, None]:
+    """Streams graph updates for a single uploaded file string as SSE frames."""
+    return encode_events(modernization_events(file_name, code, language, framework), delta=delta)
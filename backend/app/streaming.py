@@ -0,0 +1,102 @@
+import difflib
+import json
+import re
+import zlib
+from typing import Any, AsyncGenerator, AsyncIterable, Dict, List, Optional
+
+# SSE helpers shared by the streaming endpoints.
+#
+# Code deltas are line based: a list of ops applied to the previous version
+#   ["=", n]     keep the next n lines
+#   ["-", n]     drop the next n lines
+#   ["+", text]  insert text (whole lines, newlines included)
+
+
+# Only "\n" ends a line, exactly like the regex used by the dashboard
+# (str.splitlines would also break on "\r", "\x0c", ...).
+_LINE_RE = re.compile(r"[^\n]*\n|[^\n]+\Z")
+
+
+def _split_lines(text: str) -> List[str]:
+    return _LINE_RE.findall(text)
+
+
+def encode_code_delta(previous: str, current: str) -> List[list]:
+    """Ops that turn `previous` into `current`."""
+    old_lines = _split_lines(previous)
+    new_lines = _split_lines(current)
+    ops: List[list] = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i2 - i1])
+            continue
+        if tag in ("replace", "delete"):
+            ops.append(["-", i2 - i1])
+        if tag in ("replace", "insert"):
+            ops.append(["+", "".join(new_lines[j1:j2])])
+    return ops
+
+
+def apply_code_delta(previous: str, ops: List[list]) -> str:
+    """Reference decoder (the dashboard has the same logic in services/api.js)."""
+    old_lines = _split_lines(previous)
+    out: List[str] = []
+    pos = 0
+    for op, arg in ops:
+        if op == "=":
+            out.extend(old_lines[pos:pos + arg])
+            pos += arg
+        elif op == "-":
+            pos += arg
+        elif op == "+":
+            out.append(arg)
+    return "".join(out)
+
+
+def sse_event(payload: Dict[str, Any], event_id: Optional[Any] = None) -> str:
+    # with an id, a reconnecting EventSource sends it back as Last-Event-ID
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+
+async def encode_events(events: AsyncIterable[Dict[str, Any]], delta: bool = False) -> AsyncGenerator[str, None]:
+    """
+    Serializes event dicts as SSE frames.
+
+    With `delta`, "update" events carry `code_delta` against the last code
+    this client received instead of the full `current_code`, and
+    `original_code` is dropped (the client uploaded it). Deltas are kept
+    per "file_path", so streams multiplexing several files work too.
+    Events with a "seq" (job event logs) get it as their SSE id.
+    """
+    last_code: Dict[Any, str] = {}
+    async for event in events:
+        if delta and event.get("event") == "update":
+            event = dict(event)
+            event.pop("original_code", None)
+            code = event.get("current_code")
+            if code is not None:
+                key = event.get("file_path")
+                event["code_delta"] = encode_code_delta(last_code.get(key, ""), code)
+                del event["current_code"]
+                last_code[key] = code
+        yield sse_event(event, event.get("seq"))
+
+
+async def gzip_stream(chunks: AsyncIterable[str]) -> AsyncGenerator[bytes, None]:
+    """
+    Gzip-compresses a text stream, sync-flushing after every chunk so each
+    event still reaches the client immediately.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    async for chunk in chunks:
+        yield compressor.compress(chunk.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+# Ask proxies (nginx) not to buffer the stream; every event is flushed as it is produced.
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
@@ -0,0 +1,17 @@
+# backend/conftest.py
+#
+# Tests live in backend/tests and import the code the way the API does:
+# `acmp.*` from this directory, the FastAPI modules (services, jobs, ...)
+# flat from app/.
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+for path in (BACKEND_DIR, os.path.join(BACKEND_DIR, "app")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Only backend/tests holds tests (acmp/utils/test_memo.py is the tester's memo).
+collect_ignore = ["acmp", "app"]
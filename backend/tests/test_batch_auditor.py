@@ -0,0 +1,38 @@
+# tests/test_batch_auditor.py
+
+import json
+
+import pytest
+
+from acmp.agents.batch_auditor import parse_batch
+
+BATCH = [{"file_path": "a.py"}, {"file_path": "b.py"}]
+
+
+def _plan(number=None, **extra) -> dict:
+    item = {"language": "python", "legacy_patterns": [], "modernization_steps": ["step [1]"], **extra}
+    if number is not None:
+        item["file"] = number
+    return item
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps([_plan(1), _plan(2)]),
+    "Plans: " + json.dumps([_plan(1), _plan(2)]) + " (see [1] above)",
+    "```json\n" + json.dumps([_plan(2), _plan(1)]) + "\n```\nNotes: [done]",
+    "[draft] " + json.dumps([_plan(), _plan()]),
+])
+def test_plans_are_found_among_stray_brackets(text):
+    plans = parse_batch(text, BATCH)
+    assert sorted(plans) == [0, 1]
+    assert plans[0].modernization_steps == ["step [1]"]
+
+
+def test_invalid_plans_fall_back_one_by_one():
+    text = json.dumps([_plan(1), {"file": 2, "language": "python"}, _plan(7)])
+    assert sorted(parse_batch(text, BATCH)) == [0]
+
+
+@pytest.mark.parametrize("text", ["", "no plans", "[1, 2", json.dumps({"file": 1})])
+def test_output_without_an_array_has_no_plans(text):
+    assert parse_batch(text, BATCH) == {}
@@ -0,0 +1,103 @@
+# tests/test_checkpoint.py
+
+import asyncio
+from typing import Any, Optional, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from acmp.state import LegacyPattern, TransformationPlan
+from acmp.utils.checkpoint import SQLiteCheckpointer, ainvoke_resumable, invoke_resumable, run_config
+
+
+class _State(TypedDict):
+    value: int
+    plan: Optional[Any]
+
+
+class _Pipeline:
+    """plan -> flaky -> done; `flaky` raises on its first call."""
+
+    def __init__(self, saver: SQLiteCheckpointer):
+        self.calls = {"plan": 0, "flaky": 0}
+        builder = StateGraph(_State)
+        builder.add_node("plan", self.plan)
+        builder.add_node("flaky", self.flaky)
+        builder.add_edge(START, "plan")
+        builder.add_edge("plan", "flaky")
+        builder.add_edge("flaky", END)
+        self.graph = builder.compile(checkpointer=saver)
+
+    def plan(self, state: _State) -> dict:
+        self.calls["plan"] += 1
+        pattern = LegacyPattern(pattern="print statement", recommended_fix="print()")
+        plan = TransformationPlan(language="python", legacy_patterns=[pattern], modernization_steps=["use print()"])
+        return {"value": state["value"] + 1, "plan": plan}
+
+    def flaky(self, state: _State) -> dict:
+        self.calls["flaky"] += 1
+        if self.calls["flaky"] == 1:
+            raise RuntimeError("interrupted")
+        return {"value": state["value"] * 10}
+
+
+@pytest.fixture
+def saver(tmp_path):
+    return SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite3"))
+
+
+def _threads(saver: SQLiteCheckpointer) -> set:
+    return {item.config["configurable"]["thread_id"] for item in saver.list(None)}
+
+
+def test_interrupted_run_resumes_after_its_last_node(saver):
+    pipeline = _Pipeline(saver)
+    with pytest.raises(RuntimeError):
+        invoke_resumable(pipeline.graph, {"value": 1, "plan": None}, "run-1")
+    assert _threads(saver) == {"run-1"}
+    assert pipeline.graph.get_state(run_config("run-1")).next == ("flaky",)
+
+    result = invoke_resumable(pipeline.graph, {"value": 1, "plan": None}, "run-1")
+    assert result["value"] == 20
+    assert result["plan"].legacy_patterns[0].pattern == "print statement"
+    assert pipeline.calls == {"plan": 1, "flaky": 2}
+    assert _threads(saver) == set()
+
+
+def test_async_run_resumes_and_cleans_up(saver):
+    pipeline = _Pipeline(saver)
+    with pytest.raises(RuntimeError):
+        asyncio.run(ainvoke_resumable(pipeline.graph, {"value": 2, "plan": None}, "run-2"))
+    result = asyncio.run(ainvoke_resumable(pipeline.graph, {"value": 2, "plan": None}, "run-2"))
+    assert result["value"] == 30
+    assert pipeline.calls == {"plan": 1, "flaky": 2}
+    assert _threads(saver) == set()
+
+
+def test_checkpoints_round_trip_and_stay_per_thread(saver):
+    for run_id in ("a", "b"):
+        with pytest.raises(RuntimeError):
+            _Pipeline(saver).graph.invoke({"value": 1, "plan": None}, run_config(run_id))
+    latest = saver.get_tuple(run_config("a"))
+    assert latest.checkpoint["channel_values"]["value"] == 2
+    assert isinstance(latest.checkpoint["channel_values"]["plan"], TransformationPlan)
+    assert [item.config for item in saver.list(run_config("a"), limit=1)] == [latest.config]
+    assert saver.get_tuple(latest.parent_config).config == latest.parent_config
+
+    saver.delete_thread("a")
+    assert saver.get_tuple(run_config("a")) is None
+    assert _threads(saver) == {"b"}
+
+
+def test_cleanup_drops_only_expired_runs(saver):
+    pipeline = _Pipeline(saver)
+    with pytest.raises(RuntimeError):
+        pipeline.graph.invoke({"value": 1, "plan": None}, run_config("old"))
+    assert saver.cleanup(max_age=3600) == 0
+    assert saver.cleanup(max_age=1e-9) == 1
+    assert saver.get_tuple(run_config("old")) is None
+
+
+def test_missing_checkpoint_is_none(saver):
+    assert saver.get_tuple(run_config("never-ran")) is None
+    assert list(saver.list(run_config("never-ran"))) == []
@@ -0,0 +1,60 @@
+# tests/test_chunker.py
+
+import ast
+
+import pytest
+
+from acmp.utils.chunker import reassemble, split_source
+
+
+def _function(name: str, body_lines: int) -> str:
+    body = "".join(f"    total += {i}\n" for i in range(body_lines))
+    return f"# {name} documentation\ndef {name}():\n    total = 0\n{body}    return total\n"
+
+
+MODULE = "import os\nLIMIT = 10\n\n" + "\n".join(_function(f"f{i}", 20) for i in range(6)) + "\nif __name__ == '__main__':\n    f0()\n"
+
+
+def test_small_files_are_not_split():
+    assert split_source(MODULE, max_lines=1000) is None
+    assert split_source(_function("big", 200), max_lines=50) is None  # one definition, no boundary
+
+
+def test_chunks_cover_the_file_in_order_at_statement_boundaries():
+    source = split_source(MODULE, max_lines=60)
+    lines = MODULE.splitlines()
+    assert len(source.chunks) > 1
+    assert [c.index for c in source.chunks] == list(range(len(source.chunks)))
+    assert "\n".join(c.code for c in source.chunks).splitlines() == lines
+    for chunk in source.chunks:
+        assert len(chunk.code.splitlines()) <= 60
+        assert chunk.code.splitlines()[0] == lines[chunk.start_line - 1]
+        assert chunk.start_line == 1 or lines[chunk.start_line - 1].startswith("# ")  # comments stay attached
+    assert source.context == "import os\nLIMIT = 10"
+
+
+def test_python2_sources_split_on_column_zero_definitions():
+    code = "import string\n" + "\n".join(
+        f"def f{i}():\n" + "".join(f"    print 'line {j}'\n" for j in range(30)) for i in range(4)
+    )
+    source = split_source(code, max_lines=40)
+    assert all(c.code.startswith(("import", "def ")) for c in source.chunks)
+    assert "\n".join(c.code for c in source.chunks) == code.rstrip("\n")
+    assert source.context == "import string"
+
+
+def test_reassembled_chunks_are_the_same_module():
+    source = split_source(MODULE, max_lines=60)
+    code = reassemble([c.code for c in source.chunks])
+    assert ast.dump(ast.parse(code)) == ast.dump(ast.parse(MODULE))
+
+
+@pytest.mark.parametrize("parts, expected_head", [
+    (["import os\n\nx = 1\n", "import re\nimport os\n\ny = re.escape('a')\n"], ["import os", "import re", "", "x = 1"]),
+    (["x = 1\n", "from typing import List\n\ny: List[int] = []\n"], ["from typing import List", "x = 1"]),
+])
+def test_imports_added_by_later_chunks_are_hoisted_once(parts, expected_head):
+    code = reassemble(parts)
+    assert code.splitlines()[:len(expected_head)] == expected_head
+    assert code.count("import os") <= 1
+    ast.parse(code)
@@ -0,0 +1,75 @@
+# tests/test_interpreter_pool.py
+
+import os
+import sys
+
+import pytest
+
+from acmp.utils import sandbox
+from acmp.utils.interpreter_pool import InterpreterPool
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="the pool forks its children")
+
+PROGRAM = '''
+import pickle
+import sys
+import typing
+from dataclasses import dataclass
+
+
+@dataclass
+class Point:
+    x: int
+    y: "int"
+
+
+def area(p: Point) -> int:
+    return p.x * p.y
+
+
+point = pickle.loads(pickle.dumps(Point(2, 3)))
+print(point, area(point))
+print(typing.get_type_hints(Point))
+print(typing.get_type_hints(area))
+print(__name__, sys.modules["__main__"].Point is Point, __file__ == sys.argv[0])
+'''
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = InterpreterPool(size=1, python=sys.executable)
+    yield pool
+    pool.shutdown()
+
+
+def _spawned(code: str, tmp_path) -> tuple:
+    path = tmp_path / "main.py"
+    path.write_text(code)
+    returncode, stdout, stderr, _ = sandbox._spawn([sys.executable, str(path)], None, None)
+    return returncode, stdout, stderr
+
+
+def test_script_module_matches_a_spawned_interpreter(pool, tmp_path):
+    result = pool.run(PROGRAM, timeout=10)
+    returncode, stdout, stderr = _spawned(PROGRAM, tmp_path)
+    assert returncode == 0, stderr
+    assert (result["returncode"], result["stdout"], result["stderr"]) == (returncode, stdout, stderr)
+
+
+def test_main_module_is_fresh_for_every_run(pool):
+    first = pool.run("import sys\nsys.modules['__main__'].leak = 1\n", timeout=10)
+    second = pool.run("import sys\nprint(hasattr(sys.modules['__main__'], 'leak'))\n", timeout=10)
+    assert first["returncode"] == 0 and second["stdout"] == "False\n"
+
+
+def test_uncaught_exception_reports_like_python(pool, tmp_path):
+    code = "def boom():\n    raise ValueError('bad')\n\nboom()\n"
+    result = pool.run(code, timeout=10)
+    returncode, _, stderr = _spawned(code, tmp_path)
+    assert result["returncode"] == returncode == 1
+    assert result["stderr"].splitlines()[-1] == stderr.splitlines()[-1] == "ValueError: bad"
+
+
+def test_reading_stdin_waits_until_the_timeout(pool):
+    result = pool.run("name = input('Name: ')\nprint(name)\n", timeout=0.5)
+    assert result["timed_out"] and result["returncode"] is None
@@ -0,0 +1,151 @@
+# tests/test_jobs.py
+
+import asyncio
+
+import pytest
+
+import jobs
+from jobs import COMPLETED, FAILED, InProcessJobQueue, JobWorkerPool, SQLiteJobQueue, coalesce_tokens, job_events
+
+REQUEST = {"file_name": "a.py", "code": "print 'x'\n", "language": "python", "framework": None}
+
+
+def _token(node: str, delta: str, **extra) -> dict:
+    return {"event": "token", "node": node, "file_path": "a.py", "delta": delta, **extra}
+
+
+def _update(node: str) -> dict:
+    return {"event": "update", "node": node, "file_path": "a.py", "current_code": None, "error_logs": None}
+
+
+async def _fake_pipeline(*args, **kwargs):
+    yield _update("auditor")
+    for delta in ("print", "(", "'x'", ")"):
+        yield _token("engineer", delta)
+    yield _update("engineer")
+    yield _update("tester")
+    yield {"event": "summary", "file_path": "a.py"}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def queue(request, tmp_path):
+    return InProcessJobQueue() if request.param == "memory" else SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+async def _collect(events) -> list:
+    return [event async for event in events]
+
+
+def test_tokens_of_one_node_are_merged():
+    async def events():
+        for event in (_token("engineer", "a"), _token("engineer", "b"), _token("optimizer", "c"),
+                      _token("optimizer", "d", chunk=1), _update("optimizer"), _token("engineer", "e")):
+            yield event
+
+    merged = asyncio.run(_collect(coalesce_tokens(events(), interval=60)))
+    assert [(e.get("node"), e.get("delta"), e.get("chunk")) for e in merged] == [
+        ("engineer", "ab", None), ("optimizer", "c", None), ("optimizer", "d", 1), ("optimizer", None, None),
+        ("engineer", "e", None),
+    ]
+
+
+def test_tokens_are_flushed_every_interval():
+    async def events():
+        for delta in "abc":
+            yield _token("engineer", delta)
+
+    assert [e["delta"] for e in asyncio.run(_collect(coalesce_tokens(events(), interval=0)))] == ["a", "b", "c"]
+
+
+def test_finished_job_keeps_its_updates_and_drops_its_tokens(queue, monkeypatch):
+    live = []
+
+    async def pipeline(*args, run_id, **kwargs):
+        async for event in _fake_pipeline():
+            if event.get("node") == "tester":
+                live.extend(await queue.events(run_id, 0))  # what a reader attached mid-run sees
+            yield event
+
+    monkeypatch.setattr(jobs, "modernization_events", pipeline)
+
+    async def scenario():
+        job = await queue.submit(REQUEST)
+        await JobWorkerPool(queue, workers=1).run(await queue.claim())
+        return await queue.get(job["job_id"]), await _collect(job_events(queue, job["job_id"]))
+
+    job, replay = asyncio.run(scenario())
+    assert [(e["seq"], e["event"], e.get("delta")) for e in live] == [
+        (0, "update", None), (1, "token", "print('x')"), (2, "update", None),
+    ]
+    assert job["status"] == COMPLETED and job["result"]["success"]
+    assert job["events"] == 5
+    assert [(e["seq"], e["event"]) for e in replay] == [(0, "update"), (2, "update"), (3, "update"), (4, "summary")]
+    assert all(e["job_id"] == job["job_id"] for e in replay)
+
+
+def test_reader_resumes_after_the_last_sequence_number(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "modernization_events", _fake_pipeline)
+
+    async def scenario():
+        job = await queue.submit(REQUEST)
+        await JobWorkerPool(queue, workers=1).run(await queue.claim())
+        return await _collect(job_events(queue, job["job_id"], start=1)), await queue.events("missing", 0)
+
+    resumed, missing = asyncio.run(scenario())
+    assert [e["seq"] for e in resumed] == [2, 3, 4]
+    assert missing == []
+
+
+def test_failed_job_drops_its_checkpoints(queue, monkeypatch):
+    discarded = []
+
+    async def pipeline(*args, **kwargs):
+        yield _update("auditor")
+        yield {"error": "boom"}
+
+    async def discard_run(run_id):
+        discarded.append(run_id)
+
+    monkeypatch.setattr(jobs, "modernization_events", pipeline)
+    monkeypatch.setattr(jobs, "discard_run", discard_run)
+
+    async def scenario():
+        failed = await queue.submit(REQUEST)
+        await JobWorkerPool(queue, workers=1).run(await queue.claim())
+        monkeypatch.setattr(jobs, "modernization_events", _fake_pipeline)
+        await queue.submit(REQUEST)
+        await JobWorkerPool(queue, workers=1).run(await queue.claim())
+        return await queue.get(failed["job_id"])
+
+    job = asyncio.run(scenario())
+    assert job["status"] == FAILED and job["error"] == "boom"
+    assert discarded == [job["job_id"]]  # the completed job's run finished (and was dropped) on its own
+
+
+def test_job_failed_by_a_shutdown_drops_its_checkpoints(monkeypatch):
+    queue = InProcessJobQueue()
+    discarded = []
+
+    async def pipeline(*args, **kwargs):
+        yield _update("auditor")
+        await asyncio.sleep(60)
+        yield _update("engineer")
+
+    async def discard_run(run_id):
+        discarded.append(run_id)
+
+    monkeypatch.setattr(jobs, "modernization_events", pipeline)
+    monkeypatch.setattr(jobs, "discard_run", discard_run)
+
+    async def scenario():
+        job = await queue.submit(REQUEST)
+        task = asyncio.ensure_future(JobWorkerPool(queue, workers=1).run(await queue.claim()))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await queue.get(job["job_id"])
+
+    job = asyncio.run(scenario())
+    assert job["status"] == FAILED
+    assert discarded == [job["job_id"]]
@@ -0,0 +1,91 @@
+# tests/test_legacy_rules.py
+
+import pytest
+
+from acmp.utils.legacy_rules import apply_rules
+
+
+def _rewrite(code: str) -> str:
+    result = apply_rules(code)
+    assert result.syntax_error is None, result.syntax_error
+    return result.code
+
+
+def _names(findings):
+    return [f.rule.name for f in findings]
+
+
+# --- print statement ---------------------------------------------------------
+
+@pytest.mark.parametrize("code, expected", [
+    ("print 'a'\n", "print('a')\n"),
+    ("print\n", "print()\n"),
+    ("print x,\n", 'print(x, end=" ")\n'),
+    ("print >>f, x\n", "print(x, file=f)\n"),
+    ("if x: print 'a'\n", "if x: print('a')\n"),
+    ("for i in y: print i\n", "for i in y: print(i)\n"),
+    ("x = 1; print x\n", "x = 1; print(x)\n"),
+    ("try: print 1\nexcept: print 2\n", "try: print(1)\nexcept: print(2)\n"),
+    ("while d[1:2]: print 'a'\n", "while d[1:2]: print('a')\n"),
+])
+def test_print_statement_rewritten(code, expected):
+    assert _rewrite(code) == expected
+
+
+@pytest.mark.parametrize("code", [
+    "d = {'info': print, 'err': print}\n",
+    "f = lambda: print\n",
+    "if x: f = lambda: print\n",
+    "handlers = [print, log]\n",
+    "call(print)\n",
+    "x = y if z else print\n",
+    "print('already a call')\n",
+])
+def test_print_as_a_value_is_left_alone(code):
+    result = apply_rules(code)
+    assert result.code == code
+    assert result.applied == []
+
+
+# --- string module and renamed builtins --------------------------------------
+
+@pytest.mark.parametrize("code, expected", [
+    ("import string\ndef f(s): return string.split(s, ',')\n", "import string\ndef f(s): return s.split(',')\n"),
+    ("import string\nn = string.atoi(s)\n", "import string\nn = int(s)\n"),
+    ("import string\nx = string.join(parts, ', ')\n", "import string\nx = ', '.join(parts)\n"),
+    ("import os, string\nx = string.letters\n", "import os, string\nx = string.ascii_letters\n"),
+    ("def f(n): return xrange(n)\n", "def f(n): return range(n)\n"),
+    ("name = raw_input('> ')\n", "name = input('> ')\n"),
+    ("import sys\nx = sys.maxint\n", "import sys\nx = sys.maxsize\n"),
+])
+def test_module_functions_and_builtins_rewritten(code, expected):
+    assert _rewrite(code) == expected
+
+
+@pytest.mark.parametrize("code", [
+    "def f(string): return string.split(',')\n",          # a parameter, not the module
+    "string = get()\nparts = string.split(',')\n",        # never imported
+    "import string\nfor string in xs: string.upper()\n",  # rebound by a for loop
+    "import string as s\nstring.upper(x)\n",              # imported under another name
+    "def f(xrange=1): return xrange\n",
+    "from compat import xrange\nxrange(3)\n",
+    "unicode = str\nvalue = unicode(3)\n",
+    "def f(sys): return sys.maxint\n",
+])
+def test_local_names_are_not_rewritten(code):
+    result = apply_rules(code)
+    assert result.code == code
+    assert result.applied == []
+
+
+# --- ambiguous findings ------------------------------------------------------
+
+def test_input_in_python3_file_is_not_a_finding():
+    result = apply_rules("name = input('> ')\nprint(name)\n")
+    assert result.remaining == [] and result.applied == []
+
+
+def test_input_in_python2_file_is_flagged():
+    result = apply_rules("x = input('> ')\nprint x\n")
+    assert _names(result.remaining) == ["input_eval"]
+    assert _names(result.applied) == ["print_statement"]
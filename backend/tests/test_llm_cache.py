@@ -0,0 +1,50 @@
+# tests/test_llm_cache.py
+
+import pytest
+
+from acmp.bench.fake_llm import ScriptedLLM
+from acmp.utils import llm_cache
+from acmp.utils.llm_cache import LLMCache, cached_invoke, get_generation_params, make_cache_key
+
+
+class _SampledLLM(ScriptedLLM):
+    temperature: float = 0.7
+    max_tokens: int = 512
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch, tmp_path):
+    cache = LLMCache(str(tmp_path))
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+    monkeypatch.setattr(llm_cache, "CACHE_ENABLED", True)
+    return cache
+
+
+def _llm(**params) -> _SampledLLM:
+    return _SampledLLM(responder=lambda prompt: f"answer to {prompt}", **params)
+
+
+def test_same_settings_hit_the_cache(cache):
+    assert cached_invoke(_llm(), "q", "v1").content == "answer to q"
+    response = cached_invoke(_llm(), "q", "v1")
+    assert response.response_metadata["cache_hit"]
+    assert cache.stats["hits"] == 1
+
+
+@pytest.mark.parametrize("llm", [
+    _llm(temperature=0.0),
+    _llm(max_tokens=64),
+    _llm().bind(max_tokens=64),
+])
+def test_other_generation_settings_miss(cache, llm):
+    cached_invoke(_llm(), "q", "v1")
+    response = cached_invoke(llm, "q", "v1")
+    assert not response.response_metadata.get("cache_hit")
+    assert cache.stats["hits"] == 0
+
+
+def test_generation_params_are_part_of_the_key():
+    assert get_generation_params(_llm(temperature=0.2)) == {"temperature": 0.2, "max_tokens": 512}
+    assert get_generation_params(_llm().bind(stop=["\n"]))["stop"] == ["\n"]
+    assert make_cache_key("m", "v1", "q") == make_cache_key("m", "v1", "q", {})
+    assert make_cache_key("m", "v1", "q", {"temperature": 0.2}) != make_cache_key("m", "v1", "q", {"temperature": 0.3})
@@ -0,0 +1,32 @@
+# tests/test_llm_client.py
+
+import asyncio
+
+import pytest
+
+from acmp.utils import llm_client
+
+
+@pytest.fixture(autouse=True)
+def _fresh_clients(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    llm_client.reset_llms()
+    yield
+    llm_client.reset_llms()
+
+
+async def _loop_client():
+    return llm_client.get_llm("engineer"), llm_client.get_llm("engineer")
+
+
+def test_each_event_loop_gets_its_own_async_pool():
+    first, again = asyncio.run(_loop_client())
+    second, _ = asyncio.run(_loop_client())
+    assert first is again
+    assert first is not second
+    assert first.http_async_client is not second.http_async_client
+    assert first.http_client is second.http_client
+
+
+def test_clients_outside_a_loop_are_shared():
+    assert llm_client.get_llm("engineer") is llm_client.get_llm("engineer")
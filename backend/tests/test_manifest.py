@@ -0,0 +1,53 @@
+# tests/test_manifest.py
+
+import json
+
+from acmp.utils import manifest as manifest_module
+from acmp.utils.manifest import IN_PROGRESS, SUCCESS, Manifest
+
+
+def _record(manifest: Manifest, name: str) -> None:
+    manifest.mark_started(name, "hash", "v1")
+    manifest.record_result(name, "hash", "v1", {"language": "python", "itr": 1}, ok=True)
+
+
+def test_updates_are_journaled_not_rewritten(tmp_path):
+    manifest = Manifest(str(tmp_path))
+    for i in range(5):
+        _record(manifest, f"f{i}.py")
+
+    assert not manifest.path.exists()
+    assert len(manifest.journal_path.read_text().splitlines()) == 10
+
+    manifest.compact()
+    assert not manifest.journal_path.exists()
+    files = json.loads(manifest.path.read_text())["files"]
+    assert {entry["status"] for entry in files.values()} == {SUCCESS}
+    assert files["f0.py"]["language"] == "python"
+
+
+def test_journal_is_replayed_and_compacted_on_load(tmp_path):
+    first = Manifest(str(tmp_path))
+    _record(first, "done.py")
+    first.compact()
+    first.mark_started("crashed.py", "hash", "v1")
+    with open(first.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"path": "torn.py", "fie')  # write cut short by the crash
+
+    second = Manifest(str(tmp_path))
+    assert second.status("done.py") == SUCCESS
+    assert second.status("crashed.py") == IN_PROGRESS
+    assert second.status("torn.py") is None
+    assert not second.journal_path.exists()
+    assert json.loads(second.path.read_text())["files"]["crashed.py"]["status"] == IN_PROGRESS
+
+
+def test_long_journals_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest_module, "COMPACT_AT", 4)
+    manifest = Manifest(str(tmp_path))
+    for i in range(3):
+        _record(manifest, f"f{i}.py")
+
+    assert len(json.loads(manifest.path.read_text())["files"]) == 2
+    assert len(manifest.journal_path.read_text().splitlines()) == 2
+    assert Manifest(str(tmp_path)).status("f2.py") == SUCCESS
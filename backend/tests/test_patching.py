@@ -0,0 +1,55 @@
+# tests/test_patching.py
+
+import pytest
+
+from acmp.utils.patching import apply_edits, error_lines, parse_edits
+
+CODE = "def limits():\n    max = 10\n    x = 10\n    return max, x\n"
+
+
+def test_search_replace_blocks_round_trip():
+    completion = (
+        "Fix:\n<<<<<<< SEARCH\n    x = 10\n=======\n    x = 11\n>>>>>>> REPLACE\n"
+        "<<<<<<< SEARCH\n    return max, x\n=======\n    return max + x\n>>>>>>> REPLACE\n"
+    )
+    edits = parse_edits(completion)
+    assert edits == [("    x = 10\n", "    x = 11\n"), ("    return max, x\n", "    return max + x\n")]
+    assert apply_edits(CODE, edits) == "def limits():\n    max = 10\n    x = 11\n    return max + x\n"
+
+
+@pytest.mark.parametrize("search, replace, expected", [
+    # the fast path must not edit "max = 10"
+    ("x = 10\n", "x = 11\n", None),
+    ("x = 10", "x = 11", None),
+    ("    x = 10\n", "    x = 11\n", "def limits():\n    max = 10\n    x = 11\n    return max, x\n"),
+    ("    max = 10   \n", "    max = 5\n", "def limits():\n    max = 5\n    x = 10\n    return max, x\n"),
+    ("  2|     x = 10\n", "  2|     x = 12\n", "def limits():\n    max = 10\n    x = 12\n    return max, x\n"),
+])
+def test_edits_replace_whole_lines(search, replace, expected):
+    assert apply_edits(CODE, [(search, replace)]) == expected
+
+
+@pytest.mark.parametrize("search", ["x = 10\n", "x = 10", "max = 1", "= 10\nprint"])
+def test_a_unique_match_inside_a_line_is_not_an_edit(search):
+    assert apply_edits("max = 10\nprint(max)\n", [(search, "x = 11\n")]) is None
+
+
+@pytest.mark.parametrize("code, edits", [
+    (CODE, []),
+    (CODE, [("   \n", "pass\n")]),
+    (CODE, [("    y = 10\n", "    y = 11\n")]),
+    (CODE + "    x = 10\n", [("    x = 10\n", "    x = 11\n")]),
+    (CODE, [("    x = 10\n", "    x = 11\n"), ("    x = 10\n", "    x = 12\n")]),
+])
+def test_edits_that_do_not_match_once_are_rejected(code, edits):
+    assert apply_edits(code, edits) is None
+
+
+def test_error_lines_only_name_the_program():
+    error = (
+        'Traceback (most recent call last):\n'
+        '  File "/usr/lib/python3.11/json/__init__.py", line 346, in loads\n'
+        '  File "/tmp/tmpab12.py", line 3, in <module>\n'
+        '  File "/tmp/tmpab12.py", line 99, in <module>\n'
+    )
+    assert error_lines(error, line_count=4) == [3]
@@ -0,0 +1,33 @@
+# tests/test_preauditor.py
+
+from acmp.agents.preauditor import preauditor_node
+
+
+def _state(code: str) -> dict:
+    return {"file_path": "module.py", "original_code": code, "transformation_plan": None, "current_code": None}
+
+
+def test_rule_only_file_skips_the_llm():
+    state = preauditor_node(_state("print 'hello'\n"))
+    assert state["current_code"] == "print('hello')\n"
+    assert state["transformation_plan"] is not None
+
+
+def test_file_without_findings_goes_to_the_auditor():
+    state = preauditor_node(_state("def greet(name: str) -> str:\n    return f'hi {name}'\n"))
+    assert state["current_code"] is None
+    assert state["transformation_plan"] is None
+    assert state["preprocessed_code"] is None
+    assert state["prefilled_patterns"] == []
+
+
+def test_detect_only_findings_go_to_the_auditor_with_rewritten_code():
+    state = preauditor_node(_state("print `x`\n"))
+    assert state["current_code"] is None
+    assert state["preprocessed_code"] is not None
+    assert any("backtick" in p.pattern for p in state["prefilled_patterns"])
+
+
+def test_non_python_files_are_untouched():
+    state = {"file_path": "main.js", "original_code": "var x = 1;", "transformation_plan": None}
+    assert preauditor_node(dict(state)) == state
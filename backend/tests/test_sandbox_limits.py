@@ -0,0 +1,55 @@
+# tests/test_sandbox_limits.py
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+from acmp.utils import sandbox
+from acmp.utils.build_cache import BuildCache
+from acmp.utils.resource_limits import SANDBOX_LIMITS
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "wait4"), reason="rlimits need a POSIX host")
+
+SHOW_LIMITS = (
+    "import os, resource, sys\n"
+    "print(resource.getrlimit(resource.RLIMIT_CPU)[0], os.getsid(0) == os.getpid(), file=sys.stderr)\n"
+    "sys.exit(1)\n"
+)
+
+
+@pytest.fixture
+def fake_compiler(monkeypatch, tmp_path):
+    """A "c" compiler that reports its CPU limit and session, then fails."""
+    script = tmp_path / "cc.py"
+    script.write_text(SHOW_LIMITS)
+    spec = sandbox.BuildSpec("main.c", [sys.executable, str(script), "{src}"], ["{dir}/main.exe"])
+    monkeypatch.setitem(sandbox.BUILD_SPECS, "c", spec)
+    monkeypatch.setattr(sandbox, "get_build_cache", lambda: BuildCache(str(tmp_path / "builds")))
+
+
+def test_programs_run_under_the_limits_in_their_own_session():
+    result = sandbox.execute(SHOW_LIMITS, "python", interpreter=sys.executable)
+    assert result.stderr.split() == [str(SANDBOX_LIMITS.cpu_seconds), "True"]
+
+
+def test_compilers_run_under_the_limits_in_their_own_session(fake_compiler):
+    result = sandbox.execute("int main() { return 0; }", "c")
+    assert result.error.split() == [str(SANDBOX_LIMITS.cpu_seconds), "True"]
+
+
+def test_async_compilers_run_under_the_limits_in_their_own_session(fake_compiler):
+    result = asyncio.run(sandbox.aexecute("int main() { return 1; }", "c"))
+    assert result.error.split() == [str(SANDBOX_LIMITS.cpu_seconds), "True"]
+
+
+def test_missing_runtime_is_reported():
+    result = sandbox.execute("print('x')", "python", interpreter="acmp-no-such-python")
+    assert result.error.startswith("Runtime environment for python not found")
+
+
+def test_programs_waiting_for_input_time_out(monkeypatch):
+    monkeypatch.setattr(sandbox, "EXECUTION_TIMEOUT", 0.5)
+    result = sandbox.execute("import sys\nsys.stdin.readline()\n", "python", interpreter=sys.executable)
+    assert result.timed_out
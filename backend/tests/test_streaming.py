@@ -0,0 +1,77 @@
+# tests/test_streaming.py
+
+import asyncio
+import json
+import zlib
+
+import pytest
+
+from streaming import apply_code_delta, encode_code_delta, encode_events, gzip_stream
+
+VERSIONS = [
+    "",
+    "print 'a'\n",
+    "print('a')\n",
+    "print('a')\nprint('b')",
+    "import sys\nprint('a')\nprint('b')\n",
+    "import sys\r\nx = '\x0c'\nprint('b')\n",
+    "\n\n\n",
+]
+
+
+@pytest.mark.parametrize("previous", VERSIONS)
+@pytest.mark.parametrize("current", VERSIONS)
+def test_delta_round_trip(previous, current):
+    assert apply_code_delta(previous, encode_code_delta(previous, current)) == current
+
+
+def test_unchanged_lines_are_not_resent():
+    previous = "".join(f"line {i}\n" for i in range(100))
+    current = previous.replace("line 50\n", "line fifty\n")
+    assert encode_code_delta(previous, current) == [["=", 50], ["-", 1], ["+", "line fifty\n"], ["=", 49]]
+    assert encode_code_delta(previous, previous) == [["=", 100]]
+
+
+def test_delta_applied_to_another_base_does_not_reproduce_the_code():
+    ops = encode_code_delta("a\nb\n", "a\nc\n")
+    assert apply_code_delta("x\nb\n", ops) != "a\nc\n"
+
+
+async def _frames(events, **kwargs) -> list:
+    async def source():
+        for event in events:
+            yield event
+
+    return [frame async for frame in encode_events(source(), **kwargs)]
+
+
+def _payload(frame: str) -> dict:
+    return json.loads(frame.split("data: ", 1)[1])
+
+
+def test_update_events_carry_deltas_per_file():
+    events = [
+        {"event": "update", "file_path": "a.py", "current_code": "x = 1\n", "original_code": "x=1"},
+        {"event": "update", "file_path": "b.py", "current_code": "y = 2\n"},
+        {"event": "update", "file_path": "a.py", "current_code": "x = 1\nz = 3\n"},
+        {"event": "token", "file_path": "a.py", "delta": "z", "seq": 7},
+    ]
+    frames = asyncio.run(_frames(events, delta=True))
+    payloads = [_payload(frame) for frame in frames]
+    assert "current_code" not in payloads[0] and "original_code" not in payloads[0]
+    assert apply_code_delta("", payloads[1]["code_delta"]) == "y = 2\n"
+    assert apply_code_delta("x = 1\n", payloads[2]["code_delta"]) == "x = 1\nz = 3\n"
+    assert frames[3].startswith("id: 7\n")
+    assert events[0]["current_code"] == "x = 1\n"  # the caller's events are not modified
+
+
+def test_gzip_stream_decompresses_to_the_frames():
+    frames = asyncio.run(_frames([{"event": "update", "current_code": "x\n" * 100}] * 3))
+
+    async def compressed():
+        async def chunks():
+            for frame in frames:
+                yield frame
+        return b"".join([chunk async for chunk in gzip_stream(chunks())])
+
+    assert zlib.decompress(asyncio.run(compressed()), 31).decode("utf-8") == "".join(frames)
@@ -0,0 +1,44 @@
+# tests/test_tester.py
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from acmp.agents.preauditor import preauditor_node
+from acmp.agents import tester
+from acmp.utils import sandbox
+from acmp.utils.differential import baseline_cache
+from acmp.utils.sandbox import TIMEOUT_MESSAGE
+from acmp.utils.test_memo import test_memo
+
+SAMPLES = Path(__file__).resolve().parents[1] / "acmp" / "dummy_test"
+
+
+@pytest.fixture
+def interactive_state(monkeypatch):
+    """The rule-only rewrite of the interactive t1.py sample, ready for the tester."""
+    monkeypatch.setattr(sandbox, "EXECUTION_TIMEOUT", 1)
+    monkeypatch.setattr(test_memo, "get", lambda key: None)
+    monkeypatch.setattr(baseline_cache, "get", lambda key: None)
+    code = (SAMPLES / "t1.py").read_text()
+    state = preauditor_node({"file_path": "t1.py", "original_code": code, "transformation_plan": None, "current_code": None})
+    assert state["current_code"] is not None  # finished by the rules, no LLM involved
+    return {**state, "language": "python", "framework": None, "itr": 0}
+
+
+@pytest.mark.parametrize("pool_size", [2, 0])
+def test_interactive_program_times_out_instead_of_failing(interactive_state, monkeypatch, pool_size):
+    monkeypatch.setattr(sandbox, "PYTHON_POOL_SIZE", pool_size)
+    state = tester.tester_node(interactive_state)
+    assert state["error_logs"] == TIMEOUT_MESSAGE
+    assert not state["baseline"]["usable"]
+
+
+
+@pytest.mark.parametrize("pool_size", [2, 0])
+def test_async_tester_gives_the_same_verdict(interactive_state, monkeypatch, pool_size):
+    monkeypatch.setattr(sandbox, "PYTHON_POOL_SIZE", pool_size)
+    state = asyncio.run(tester.atester_node(interactive_state))
+    assert state["error_logs"] == TIMEOUT_MESSAGE
+    assert not state["baseline"]["usable"]
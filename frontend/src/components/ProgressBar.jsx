@@ -1,7 +1,7 @@
 // frontend/src/components/ProgressBar.jsx
 import React from 'react';
 
-const steps = ["auditor", "engineer", "tester", "optimizer"];
+const steps = ["preauditor", "auditor", "engineer", "tester", "optimizer"];
 
 export default function ProgressBar({ activeNode, status = "idle" }) {
   const activeIndex = activeNode ? steps.indexOf(activeNode) : -1;
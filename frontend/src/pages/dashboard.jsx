@@ -1,6 +1,6 @@
 // frontend/src/pages/Dashboard.jsx
 import React, { useState, useEffect, useRef } from 'react';
-import { modernizeStream } from '../services/api';
+import { modernizeJob } from '../services/api';
 import ProgressBar from '../components/ProgressBar';
 import { Save, Terminal, PenTool, Copy, Check, AlertCircle, ArrowUp, Upload, FileCode } from 'lucide-react';
 
@@ -23,6 +23,10 @@ export default function Dashboard() {
   });
 
   const feedbackRef = useRef(null);
+  // Node whose tokens are currently being appended to the modernized pane
+  const streamingNodeRef = useRef(null);
+  // Per-chunk drafts while a large file is modernized in parallel sections
+  const chunkDraftsRef = useRef([]);
 
   // --- Auto-Scroll to Results ---
   useEffect(() => {
@@ -119,8 +123,9 @@ export default function Dashboard() {
     setStatus("processing");
     setErrorLogs(null);
     setActiveNode(null);
+    streamingNodeRef.current = null;
 
-    modernizeStream(
+    modernizeJob(
       {
         code: originalCode,
         fileName: selectedFile.name,
@@ -128,6 +133,7 @@ export default function Dashboard() {
         framework: framework.trim() ? framework.trim() : "None",
       },
       (update) => {
+        streamingNodeRef.current = null;
         setActiveNode(update.node);
         if (update.current_code) setModernizedCode(update.current_code);
         if (
@@ -159,6 +165,25 @@ export default function Dashboard() {
       (err) => {
         setStatus("fail");
         setErrorLogs(err);
+      },
+      (token) => {
+        // First token of a new engineer/optimizer pass replaces the previous draft
+        if (token.chunk != null) {
+          if (streamingNodeRef.current !== token.node) {
+            streamingNodeRef.current = token.node;
+            chunkDraftsRef.current = [];
+            setActiveNode(token.node);
+          }
+          const drafts = chunkDraftsRef.current;
+          drafts[token.chunk] = (drafts[token.chunk] || "") + token.delta;
+          setModernizedCode(drafts.filter(Boolean).join("\n\n\n"));
+        } else if (streamingNodeRef.current !== token.node) {
+          streamingNodeRef.current = token.node;
+          setActiveNode(token.node);
+          setModernizedCode(token.delta);
+        } else {
+          setModernizedCode((prev) => prev + token.delta);
+        }
       }
     );
   };
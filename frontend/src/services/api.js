@@ -1,14 +1,35 @@
-export const modernizeStream = async (fileData, onUpdate, onError) => {
+// Rebuilds the full text from a line-based delta sent by the backend:
+// ["=", n] keep n lines, ["-", n] drop n lines, ["+", text] insert text.
+const applyCodeDelta = (previous, ops) => {
+  const oldLines = previous.match(/[^\n]*\n|[^\n]+$/g) || [];
+  let out = "";
+  let pos = 0;
+  ops.forEach(([op, arg]) => {
+    if (op === "=") {
+      out += oldLines.slice(pos, pos + arg).join("");
+      pos += arg;
+    } else if (op === "-") {
+      pos += arg;
+    } else if (op === "+") {
+      out += arg;
+    }
+  });
+  return out;
+};
+
+export const modernizeStream = async (fileData, onUpdate, onError, onToken) => {
   try {
     const response = await fetch("http://localhost:8000/api/modernize", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       // fileData: { code: "...", fileName: "...", language: "...", framework?: "..." }
-      body: JSON.stringify({ 
-        file_name: fileData.fileName, 
+      body: JSON.stringify({
+        file_name: fileData.fileName,
         code: fileData.code,
         language: fileData.language,
         framework: fileData.framework ?? "None",
+        delta: true,
+        compress: true,
       }),
     });
 
@@ -16,19 +37,33 @@ export const modernizeStream = async (fileData, onUpdate, onError) => {
 
     const reader = response.body.getReader();
     const decoder = new TextDecoder();
+    // Token events are small and frequent, so one read can end mid-event:
+    // keep the unfinished tail around until the rest arrives.
+    let buffer = "";
+    let lastCode = "";
 
     while (true) {
       const { value, done } = await reader.read();
       if (done) break;
 
-      const chunk = decoder.decode(value);
-      const lines = chunk.split("\n").filter((line) => line.startsWith("data: "));
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split("\n\n");
+      buffer = events.pop();
 
-      lines.forEach((line) => {
+      events.forEach((event) => {
+        const line = event.split("\n").find((l) => l.startsWith("data: "));
+        if (!line) return;
         try {
           const payload = JSON.parse(line.replace("data: ", ""));
           if (payload.error) onError(payload.error);
-          else onUpdate(payload);
+          else if (payload.event === "token") onToken?.(payload);
+          else {
+            if (payload.code_delta) {
+              lastCode = applyCodeDelta(lastCode, payload.code_delta);
+              payload.current_code = lastCode;
+            }
+            onUpdate(payload);
+          }
         } catch (e) {
           console.error("Error parsing JSON chunk", e);
         }
@@ -37,4 +72,87 @@ export const modernizeStream = async (fileData, onUpdate, onError) => {
   } catch (err) {
     onError(err.message);
   }
-};
\ No newline at end of file
+};
+
+const API_URL = "http://localhost:8000/api";
+
+// Reads one SSE response of a job's event log. Returns the seq of the last
+// event seen, so a dropped connection can pick up right after it.
+const readJobEvents = async (response, lastSeq, state, onUpdate, onError, onToken) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) return lastSeq;
+
+    buffer += decoder.decode(value, { stream: true });
+    const events = buffer.split("\n\n");
+    buffer = events.pop();
+
+    events.forEach((event) => {
+      const line = event.split("\n").find((l) => l.startsWith("data: "));
+      if (!line) return;
+      try {
+        const payload = JSON.parse(line.replace("data: ", ""));
+        if (payload.seq !== undefined) lastSeq = payload.seq;
+        if (payload.error) onError(payload.error);
+        else if (payload.event === "token") onToken?.(payload);
+        else {
+          if (payload.code_delta) {
+            state.lastCode = applyCodeDelta(state.lastCode, payload.code_delta);
+            payload.current_code = state.lastCode;
+          }
+          onUpdate(payload);
+        }
+      } catch (e) {
+        console.error("Error parsing JSON chunk", e);
+      }
+    });
+  }
+};
+
+// Same callbacks as modernizeStream, but the run is a background job on the
+// server: if the connection drops, the stream is reattached from the last
+// event received instead of starting the pipeline over.
+export const modernizeJob = async (fileData, onUpdate, onError, onToken, { retries = 5 } = {}) => {
+  try {
+    const submitted = await fetch(`${API_URL}/jobs`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        file_name: fileData.fileName,
+        code: fileData.code,
+        language: fileData.language,
+        framework: fileData.framework ?? "None",
+      }),
+    });
+    if (!submitted.ok) throw new Error("Failed to connect to backend");
+    const { job_id: jobId } = await submitted.json();
+
+    const state = { lastCode: "" };
+    let lastSeq = -1;
+    let attempt = 0;
+
+    while (true) {
+      try {
+        const response = await fetch(
+          `${API_URL}/jobs/${jobId}/events?from=${lastSeq + 1}&delta=true&compress=true`
+        );
+        if (!response.ok) throw new Error(`Job stream failed (${response.status})`);
+        lastSeq = await readJobEvents(response, lastSeq, state, onUpdate, onError, onToken);
+      } catch (err) {
+        if (++attempt > retries) throw err;
+        await new Promise((resolve) => setTimeout(resolve, 500 * attempt));
+        continue;
+      }
+
+      // the server closes the stream once the job is finished
+      const status = await fetch(`${API_URL}/jobs/${jobId}`).then((r) => r.json());
+      if (status.status === "completed" || status.status === "failed") return jobId;
+    }
+  } catch (err) {
+    onError(err.message);
+  }
+};